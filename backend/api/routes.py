@@ -1,11 +1,13 @@
 import shutil
+import hmac
 import json
 import os
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Query, Request
 from fastapi.responses import JSONResponse, StreamingResponse
-from typing import List
-from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import datetime, timezone
 from tempfile import NamedTemporaryFile
 from pathlib import Path
 from uuid import uuid4
@@ -15,17 +17,29 @@ import tempfile
 import uuid
 from services.GCS_service import GCSService
 from services.file_service import validate_file
-from services.model_service import run_model_on_images
 from schemas.response import ImageResult
 from core.logger import setup_logger
+from core.telemetry import span
 from schemas.request import MoveImageRequest
 from schemas.response import ImageResult
 from services.GCS_service import GCSService
 from services.file_service import validate_file
-from services.model_service import run_model_on_images
-from schemas.request import MoveImageRequest
-from pymongo import MongoClient
-from dotenv import load_dotenv
+from services.result_service import store_detection_result
+from services.detections_store import append_detections, detections_blob_path, stream_session_export
+from services.rendition_service import rendition_prefix, signed_tile_urls, thumbnail_url
+from services.backfill_service import backfill_status, run_backfill, request_backfill, BackfillInProgress
+from services.exif_service import extract_geo
+from services.geo_index import index_images, query_density, remove_session, set_image_class
+from services.false_positive_service import move_to_false_positives
+from services.signed_url_service import persist_refreshed_urls, refresh_session_urls
+from services.session_metadata import merge_file_records, update_session_metadata
+from services.direct_upload_service import (
+    issue_upload_urls, parse_storage_event, session_of_image_blob, verify_uploads
+)
+from core.config import BACKFILL_BATCH_SIZE, INFERENCE_RETRY_AFTER, STORAGE_EVENTS_TOKEN, UPLOAD_BATCH_SIZE
+from schemas.request import MoveImageRequest, MoveImagesRequest, UploadCompleteRequest, UploadUrlsRequest
+from core.database import get_users_collection
+from auth.jwt_auth import get_token_claims, require_email, resolve_session_id
 from google.cloud import storage
 
 
@@ -33,78 +47,54 @@ from google.cloud import storage
 logger = setup_logger("api", "logs/api.log")
 router = APIRouter()
 
-def download_blob_to_tempfile(blob_path: str) -> Path:
-    client = storage.Client.from_service_account_json(GCSService.KEY_PATH)
-    bucket = client.bucket(GCSService.BUCKET_NAME)
-    blob = bucket.blob(blob_path)
-
-    if not blob.exists():
-        raise FileNotFoundError(f"GCS blob not found: {blob_path}")
-
-    suffix = Path(blob_path).suffix
-    tmp_file = NamedTemporaryFile(delete=False, suffix=suffix)
-    blob.download_to_filename(tmp_file.name)
-    logger.info(f"Downloaded blob for inference: {blob_path} --> {tmp_file.name}")
-    return Path(tmp_file.name)
-
 def upload_json_to_gcs(data: dict, blob_path: str):
-    from google.cloud import storage
-    import json
-
-    bucket = GCSService.get_bucket()
-    blob = bucket.blob(blob_path)
-    blob.upload_from_string(json.dumps(data, indent=2), content_type="application/json")
+    GCSService.upload_json(blob_path, data)
 
 def get_signed_url_from_gcs(blob_path: str, hours_valid: int = 24) -> str:
     """
     Generate a signed URL for a GCS blob valid for the given number of hours.
     """
-    from google.cloud import storage
-    from datetime import timedelta
-
-    bucket = GCSService.get_bucket()
-    blob = bucket.blob(blob_path)
-
-    url = blob.generate_signed_url(
-        version="v4",
-        expiration=timedelta(hours=hours_valid),
-        method="GET"
-    )
-    return url
+    return GCSService.generate_signed_url(blob_path, hours_valid)
 
 def upload_bytes_to_gcs(file_bytes: bytes, blob_path: str, content_type: str = "application/octet-stream"):
     """
     Uploads raw bytes to a blob in GCS using the given path.
     """
-    from google.cloud import storage
-    import os
-
-    bucket = GCSService.get_bucket()
-    blob = bucket.blob(blob_path)
-    blob.upload_from_string(file_bytes, content_type=content_type)
+    GCSService.upload_bytes(blob_path, file_bytes, content_type=content_type)
 
 def download_json(blob_path: str) -> dict:
     """
     Downloads and parses a JSON file from GCS using its blob path.
     """
-    from google.cloud import storage
-    bucket = GCSService.get_bucket()
-    blob = bucket.blob(blob_path)
-    if not blob.exists():
-        raise FileNotFoundError(f"Blob not found: {blob_path}")
-    content = blob.download_as_string()
-    return json.loads(content)
+    return GCSService.download_json(blob_path)
 
 @router.post("/upload-multiple/", response_model=dict)
 async def upload_multiple(
     files: List[UploadFile] = File(...),
-    session_id: str = Form(...)
+    session_id: Optional[str] = Form(None),
+    duplicates: Optional[str] = Form(None, pattern="^(off|flag|skip)$"),
+    claims: Optional[dict] = Depends(get_token_claims)
 ):
+    session_id = resolve_session_id(claims, session_id)
+    from services.batch_scheduler import SchedulerBusy
+    from services.inference_client import InferenceError, inference_backend
+
+    # Refuse early, before reading or storing anything, when inference is at
+    # capacity or the inference server cannot be reached
+    backend = inference_backend()
+    try:
+        ticket = await run_in_threadpool(backend.admit, session_id, len(files))
+    except SchedulerBusy as err:
+        raise HTTPException(status_code=429, detail=str(err), headers={"Retry-After": str(err.retry_after)})
+    except InferenceError as err:
+        logger.error(f"[Admission Error] {session_id}: {err}")
+        raise HTTPException(status_code=503, detail=f"Inference unavailable: {err}",
+                            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)})
     try:
         # Load or initialize session metadata
         metadata_path = f"{session_id}/session_metadata.json"
         try:
-            metadata = download_json(metadata_path)
+            metadata = await run_in_threadpool(download_json, metadata_path)
             logger.info(f"Loaded existing metadata for session: {session_id}")
         except Exception:
             metadata = {}
@@ -114,6 +104,8 @@ async def upload_multiple(
         new_file_results = []
         results = []
         gcs_blob_paths = []
+        raw_contents = []
+        geo_by_name = {}
 
         # Step 1: Upload raw images to GCS
         for file in files:
@@ -121,16 +113,22 @@ async def upload_multiple(
                 if not (file.content_type and file.content_type.startswith("image/")):
                     continue
                 if file.filename in existing_files:
-                    logger.info(f"Skipping duplicate upload: {file.filename}")
+                    logger.debug(f"Skipping duplicate upload: {file.filename}")
                     continue
 
-                content = await file.read()
-                validate_file(file, content)
+                with span("read"):
+                    content = await file.read()
+                with span("validate"):
+                    validate_file(file, content)
+                with span("exif"):
+                    geo_by_name[file.filename] = extract_geo(content)
 
                 blob_path = f"{session_id}/images/{file.filename}"
-                upload_bytes_to_gcs(content, blob_path, content_type=file.content_type)
-                logger.info(f"Uploaded raw image to GCS: {blob_path}")
+                with span("gcs_upload", bytes=len(content)):
+                    await run_in_threadpool(upload_bytes_to_gcs, content, blob_path, content_type=file.content_type)
+                logger.debug(f"Uploaded raw image to GCS: {blob_path}")
                 gcs_blob_paths.append((file.filename, blob_path))
+                raw_contents.append(content)
 
             except HTTPException:
                 raise
@@ -138,92 +136,105 @@ async def upload_multiple(
                 logger.error(f"[Raw Upload Error] {file.filename}: {err}")
                 raise HTTPException(status_code=400, detail=f"Raw upload failed for {file.filename}: {err}")
 
-        # Step 2: Download images for model inference
-        temp_paths = []
-        for filename, blob_path in gcs_blob_paths:
+        # Inference modules (cv2, torch, ultralytics) load on the first upload
+        from services.image_prefetch import decode_image_bytes
+
+        def infer_chunk(chunk):
+            decoded_images = []
+            for (filename, _), content in chunk:
+                try:
+                    with span("decode"):
+                        decoded_images.append((filename, decode_image_bytes(content)))
+                except Exception as err:
+                    logger.error(f"[Decode Error] {filename}: {err}")
+                    raise HTTPException(status_code=400, detail=f"Could not decode image: {filename}")
             try:
-                temp_paths.append(download_blob_to_tempfile(blob_path))
+                return backend.run_model_on_images(decoded_images, session_id, duplicates=duplicates)
             except Exception as err:
-                logger.error(f"[Download Error] {blob_path}: {err}")
-                raise HTTPException(status_code=500, detail=f"Failed to download image for inference: {filename}")
-
-        # Step 3: Run inference
-        try:
-            detection_results = run_model_on_images(temp_paths, session_id)
-            logger.info(f"Model inference completed for {len(temp_paths)} image(s)")
-        except Exception as err:
-            logger.error(f"[Inference Error]: {err}")
-            raise HTTPException(status_code=500, detail=f"Model inference failed: {err}")
-
-        # Step 4: Upload result images and build response
+                logger.error(f"[Inference Error]: {err}")
+                raise HTTPException(status_code=500, detail=f"Model inference failed: {err}")
+
+        # Steps 2-3: Decode the uploaded bytes (no GCS round trip) and run
+        # inference, UPLOAD_BATCH_SIZE images at a time and off the event loop,
+        # so a large upload holds little decoded memory and takes turns with
+        # other sessions in the batch scheduler
+        pending = list(zip(gcs_blob_paths, raw_contents))
+        raw_contents.clear()
+        detection_results = []
+        for start in range(0, len(pending), UPLOAD_BATCH_SIZE):
+            chunk = pending[start:start + UPLOAD_BATCH_SIZE]
+            pending[start:start + UPLOAD_BATCH_SIZE] = [None] * len(chunk)
+            detection_results.extend(await run_in_threadpool(infer_chunk, chunk))
+        logger.info(f"Model inference completed for {len(detection_results)} image(s)")
+
+        # Step 4: Upload result images and build response; the renditions and
+        # tile pyramid are many blocking GCS writes per image, so off the event loop
         for idx, ((filename, _), result) in enumerate(zip(gcs_blob_paths, detection_results)):
             try:
-                dugong_count, calf_count, image_class, result_image_bytes, label_content, image_name = result
-                total_count = dugong_count + 2 * calf_count
-
-                result_blob_path = f"{session_id}/results/{filename}"
-                upload_bytes_to_gcs(result_image_bytes, result_blob_path, content_type="image/jpeg")
-                signed_url = get_signed_url_from_gcs(result_blob_path)
-
-                # Upload label file to GCS
-                label_blob_path = f"{session_id}/labels/{Path(filename).stem}.txt"
-                upload_bytes_to_gcs(label_content.encode("utf-8"), label_blob_path, content_type="text/plain")
-
-                file_record = {
-                    "filename": filename,
-                    "imageUrl": signed_url,
-                    "dugongCount": dugong_count,
-                    "calfCount": calf_count,
-                    "totalCount": total_count,
-                    "imageClass": image_class,
-                    "createdAt": datetime.utcnow().isoformat()
-                }
+                with span("result_upload"):
+                    file_record = await run_in_threadpool(
+                        store_detection_result, session_id, filename, result, geo_by_name.get(filename)
+                    )
                 new_file_results.append(file_record)
 
                 results.append(ImageResult(
                     imageId=idx,
-                    imageUrl=signed_url,
-                    dugongCount=dugong_count,
-                    calfCount=calf_count,
-                    imageClass=image_class,
+                    imageUrl=file_record["imageUrl"],
+                    previewUrl=file_record["previewUrl"],
+                    thumbnailUrl=file_record["thumbnailUrl"],
+                    tiles=file_record["tiles"],
+                    labelUrl=file_record["labelUrl"],
+                    annotated=file_record["annotated"],
+                    dugongCount=file_record["dugongCount"],
+                    calfCount=file_record["calfCount"],
+                    imageClass=file_record["imageClass"],
                     createdAt=file_record["createdAt"]
                 ))
 
-                logger.info(f"Uploaded processed image and generated URL: {result_blob_path}")
+                logger.debug(f"Uploaded processed image and generated URL: {session_id}/results/{filename}")
 
             except Exception as err:
                 logger.error(f"[Result Upload Error] {filename}: {err}")
                 raise HTTPException(status_code=500, detail=f"Failed uploading result for {filename}: {err}")
 
-        # Step 5: Update session metadata
-        merged_files = metadata.get("files", [])
-        existing_filenames = {f["filename"] for f in merged_files}
-        # Only append new files that are not already present
-        for new_file in new_file_results:
-            if new_file["filename"] not in existing_filenames:
-                merged_files.append(new_file)
-                existing_filenames.add(new_file["filename"])
-
-        updated_metadata = {
-            "session_id": session_id,
-            "created_at": metadata.get("created_at", datetime.utcnow().isoformat()),
-            "last_activity": datetime.utcnow().isoformat(),
-            "files": merged_files,
-            "file_count": len(merged_files)
-        }
+        # Step 4b: Append boxes to the session's columnar detections store
+        try:
+            with span("metadata_write", target="detections"):
+                await run_in_threadpool(append_detections, session_id, detection_results)
+        except Exception as err:
+            logger.error(f"[Detections Store Error]: {err}")
+            raise HTTPException(status_code=500, detail=f"Failed to update detections store: {err}")
+
+        # Step 5: Merge the new files into the latest session metadata (only
+        # those not already present), guarded against concurrent writers
+        def merge_new_files(latest: dict):
+            now = datetime.utcnow().isoformat()
+            merge_file_records(latest, new_file_results)
+            latest.update({
+                "session_id": session_id,
+                "created_at": latest.get("created_at", now),
+                "last_activity": now
+            })
 
         try:
-            upload_json_to_gcs(updated_metadata, metadata_path)
+            with span("metadata_write", target="session_metadata"):
+                await run_in_threadpool(update_session_metadata, session_id, merge_new_files)
             logger.info(f"Updated session metadata in GCS for: {session_id}")
         except Exception as err:
             logger.error(f"[Metadata Upload Error]: {err}")
             raise HTTPException(status_code=500, detail=f"Failed to update session metadata: {err}")
 
+        # Step 6: Add geotagged images to the spatial index (logged, not raised, on failure)
+        with span("geo_index"):
+            await run_in_threadpool(index_images, session_id, new_file_results)
+
         return {
             "success": True,
             "sessionId": session_id,
             "results": results,
             "filesUploaded": len(new_file_results),
+            "duplicates": sum(1 for f in new_file_results if f["duplicateOf"]),
+            "inferenceSkipped": sum(1 for f in new_file_results if f["inferenceSkipped"]),
             "files": new_file_results,
             "message": f"Processed {len(new_file_results)} image(s)"
         }
@@ -233,21 +244,101 @@ async def upload_multiple(
     except Exception as err:
         logger.error(f"[Unknown Error in upload-multiple]: {err}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {err}")
+    finally:
+        try:
+            await run_in_threadpool(backend.release, ticket)
+        except InferenceError as err:
+            # The server's admission state died with it
+            logger.error(f"[Release Error] {session_id}: {err}")
+
+
+@router.post("/upload-urls/")
+def create_upload_urls(request: UploadUrlsRequest, claims: Optional[dict] = Depends(get_token_claims)):
+    """
+    Signed resumable-upload URLs for sending raw images straight to GCS
+    instead of through /upload-multiple/; report them with /upload-complete/.
+    """
+    session_id = resolve_session_id(claims, request.sessionId)
+    try:
+        issued = issue_upload_urls(session_id, [spec.model_dump() for spec in request.files])
+    except Exception as err:
+        logger.error(f"[Upload URL Error] {session_id}: {err}")
+        raise HTTPException(status_code=500, detail=f"Could not issue upload URLs: {err}")
+    return {"success": True, "sessionId": session_id, **issued}
+
+
+@router.post("/upload-complete/")
+def complete_direct_upload(
+    request: UploadCompleteRequest,
+    background_tasks: BackgroundTasks,
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    """
+    Check that direct uploads arrived and queue their inference in the
+    background; results appear in /session-status as they are stored.
+    """
+    session_id = resolve_session_id(claims, request.sessionId)
+    try:
+        verified = verify_uploads(session_id, request.filenames)
+    except Exception as err:
+        logger.error(f"[Upload Complete Error] {session_id}: {err}")
+        raise HTTPException(status_code=500, detail=f"Could not verify uploads: {err}")
+    if verified["accepted"]:
+        background_tasks.add_task(_run_backfill_logged, session_id, UPLOAD_BATCH_SIZE, request.duplicates)
+    return {
+        "success": True,
+        "sessionId": session_id,
+        **verified,
+        "message": f"Processing {len(verified['accepted'])} image(s)."
+    }
+
+
+@router.post("/storage-events/")
+async def storage_event(request: Request, background_tasks: BackgroundTasks, token: str = Query("")):
+    """
+    Pub/Sub push endpoint for GCS OBJECT_FINALIZE notifications: a finished
+    direct upload queues inference even if the browser never called
+    /upload-complete/. The blob goes through the same checks as there
+    (oversized uploads are deleted, not processed). Any 2xx reply
+    acknowledges the message; a 500 has Pub/Sub redeliver it.
+    """
+    if not STORAGE_EVENTS_TOKEN:
+        raise HTTPException(status_code=404, detail="Storage events are not enabled")
+    if not hmac.compare_digest(token.encode(), STORAGE_EVENTS_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid token")
+    try:
+        envelope = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Expected a Pub/Sub push message")
+    name = parse_storage_event(envelope) if isinstance(envelope, dict) else None
+    session_id = session_of_image_blob(name) if name else None
+    if not session_id:
+        return {"success": True, "scheduled": False}
+    try:
+        verified = await run_in_threadpool(verify_uploads, session_id, [name.rsplit("/", 1)[1]])
+    except Exception as err:
+        logger.error(f"[Storage Event Error] {name}: {err}")
+        raise HTTPException(status_code=500, detail=f"Could not verify upload: {err}")
+    if verified["accepted"]:
+        background_tasks.add_task(_run_backfill_logged, session_id, UPLOAD_BATCH_SIZE)
+    return {"success": True, "scheduled": bool(verified["accepted"]), **verified}
 
     
 @router.post("/cleanup-sessions/{user_email}")
-def cleanup_sessions(user_email: str, session_id: str = Query(None)):
+def cleanup_sessions(
+    user_email: str,
+    session_id: str = Query(None),
+    claims: Optional[dict] = Depends(get_token_claims)
+):
     """
     Deletes all contents of the session folder (images, results, metadata) from GCS
     for the given session_id (or the user's current session_id if not provided).
     Also clears session_id field in MongoDB user document.
     """
-    # Load environment and connect to MongoDB
-    load_dotenv()
-    MONGO_URL = os.getenv("MONGO_URI")
-    client = MongoClient(MONGO_URL)
-    db = client["DugongMonitoring"]
-    user_collection = db["users"]
+    require_email(claims, user_email)
+    if claims and claims.get("session_id"):
+        session_id = resolve_session_id(claims, session_id)
+    user_collection = get_users_collection()
 
     # Fetch user document
     user = user_collection.find_one({"email": user_email})
@@ -261,6 +352,7 @@ def cleanup_sessions(user_email: str, session_id: str = Query(None)):
 
     # Delete session folder from GCS
     gcs_result = GCSService.delete_session_folder(session_id_to_delete)
+    remove_session(session_id_to_delete)
 
     # Remove session_id from user document
     user_collection.update_one({"email": user_email}, {"$unset": {"session_id": ""}})
@@ -273,7 +365,11 @@ def cleanup_sessions(user_email: str, session_id: str = Query(None)):
     }
 
 @router.post("/move-to-false-positive/")
-async def move_to_false_positive(request: MoveImageRequest):
+async def move_to_false_positive(
+    request: MoveImageRequest,
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    session_id = resolve_session_id(claims, request.sessionId)
     try:
         # Always extract the filename without query parameters
         image_name = request.imageName.split("?")[0]
@@ -288,126 +384,183 @@ async def move_to_false_positive(request: MoveImageRequest):
 
         # Move image to false positive folder INSIDE the sessionId
         # Patch: call GCSService.move_image_to_false_positive with a new target path
-        # Instead of relying on the default, we do the move manually here
-        bucket = GCSService.get_bucket()
-        source_path = f"{request.sessionId}/images/{image_name}"
-        destination_path = f"{request.sessionId}/False positives/{opposite_class}/{image_name}"
-        source_blob = bucket.blob(source_path)
-        if not source_blob.exists():
-            raise HTTPException(status_code=404, detail=f"Image not found in GCS: {source_path}")
-        # Copy the image to the destination path
-        bucket.copy_blob(source_blob, bucket, destination_path)
-        # Delete the original image
-        source_blob.delete()
-
-        # Update session_metadata.json in GCS
-        metadata_path = f"{request.sessionId}/session_metadata.json"
-        metadata = download_json(metadata_path)
-
-        # Update imageClass in metadata
-        updated = False
-        for file in metadata.get("files", []):
-            if file["filename"] == image_name:
-                file["imageClass"] = opposite_class
-                file["updatedAt"] = datetime.utcnow().isoformat()
-                updated = True
-                break
-
-        if not updated:
+        # Instead of relying on the default, we do the move manually here.
+        # The exists/copy/delete and metadata round trips block, so they run
+        # off the event loop
+        def move_image():
+            bucket = GCSService.get_bucket()
+            source_path = f"{session_id}/images/{image_name}"
+            destination_path = f"{session_id}/False positives/{opposite_class}/{image_name}"
+            source_blob = bucket.blob(source_path)
+            if not source_blob.exists():
+                raise HTTPException(status_code=404, detail=f"Image not found in GCS: {source_path}")
+            # Copy the image to the destination path
+            bucket.copy_blob(source_blob, bucket, destination_path)
+            # Delete the original image
+            source_blob.delete()
+
+        def reclassify(metadata: dict):
+            # Update imageClass in the latest session_metadata.json
+            for file in metadata.get("files", []):
+                if file["filename"] == image_name:
+                    file["imageClass"] = opposite_class
+                    file["updatedAt"] = datetime.utcnow().isoformat()
+                    return True
             raise HTTPException(status_code=404, detail="Image not found in session metadata.")
 
-        # Re-upload updated metadata
-        upload_json_to_gcs(metadata, metadata_path)
+        await run_in_threadpool(move_image)
+        await run_in_threadpool(update_session_metadata, session_id, reclassify)
+        await run_in_threadpool(set_image_class, session_id, image_name, opposite_class)
 
         return {
             "message": f"Image '{image_name}' moved to '{opposite_class}' in False positives and metadata updated."
         }
 
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to move image: {str(e)}")
     
 
-@router.post("/backfill-detections/{session_id}")
-def backfill_detections(session_id: str):
+@router.post("/move-to-false-positive/bulk/")
+def move_many_to_false_positive(
+    request: MoveImagesRequest,
+    claims: Optional[dict] = Depends(get_token_claims)
+):
     """
-    Run detection on unprocessed images in GCS session folder and update session_metadata.json.
+    move-to-false-positive for many images: the moves run concurrently and
+    session_metadata.json is written once. Images missing from the session
+    are reported in notFound rather than failing the batch.
     """
-    metadata_path = f"{session_id}/session_metadata.json"
-
+    session_id = resolve_session_id(claims, request.sessionId)
     try:
-        metadata = download_json(metadata_path)
-    except FileNotFoundError:
-        metadata = {}
-
-    existing_files = metadata.get("files", [])
-    existing_filenames = {f["filename"] for f in existing_files}
+        summary = move_to_false_positives(
+            session_id, [(image.imageName, image.targetClass) for image in request.images]
+        )
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"[Bulk False Positive Error] {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to move images: {str(e)}")
 
-    bucket = GCSService.get_bucket()
-    all_blobs = list(bucket.list_blobs(prefix=f"{session_id}/images/"))
-    image_blobs = [b for b in all_blobs if b.name.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))]
+    return {
+        "success": not summary["failed"],
+        **summary,
+        "message": f"Moved {len(summary['moved'])} image(s) to False positives and updated metadata."
+    }
 
-    unprocessed_blobs = [b for b in image_blobs if Path(b.name).name not in existing_filenames]
 
-    if not unprocessed_blobs:
+@router.post("/backfill-detections/{session_id}")
+def backfill_detections(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    batch_size: int = Query(BACKFILL_BATCH_SIZE, ge=1),
+    background: bool = Query(False),
+    duplicates: Optional[str] = Query(None, pattern="^(off|flag|skip)$"),
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    """
+    Run detection on unprocessed images in GCS session folder and update session_metadata.json.
+    Work is chunked and checkpointed into the metadata, so the call can be repeated safely;
+    with background=true it returns immediately and progress is visible via /session-status.
+    """
+    session_id = resolve_session_id(claims, session_id)
+    if background:
+        background_tasks.add_task(_run_backfill_logged, session_id, batch_size, duplicates)
         return {
             "success": True,
-            "message": "All images already have detection results.",
-            "files": existing_files,
+            "message": "Backfill scheduled.",
             "processed_count": 0
         }
 
-    new_files = []
-
-    with tempfile.TemporaryDirectory() as tmpdir:
-        temp_paths = []
-        for blob in unprocessed_blobs:
-            local_path = Path(tmpdir) / Path(blob.name).name
-            blob.download_to_filename(str(local_path))
-            temp_paths.append(local_path)
-
-        detection_results = run_model_on_images(temp_paths, session_id)
-
-        for result_path, result in zip(temp_paths, detection_results):
-            dugong_count, calf_count, image_class, _ = result
-            fname = result_path.name
-            total_count = dugong_count + 2 * calf_count
-            new_files.append({
-                "filename": fname,
-                "path": f"{session_id}/images/{fname}",
-                "dugongCount": dugong_count,
-                "calfCount": calf_count,
-                "totalCount": total_count,
-                "imageClass": image_class,
-                "createdAt": datetime.utcnow().isoformat()
-            })
-
-    merged_files = existing_files + new_files
-    metadata["files"] = merged_files
-    metadata["file_count"] = len(merged_files)
-    metadata["last_activity"] = datetime.utcnow().isoformat()
-
-    upload_json_to_gcs(metadata, metadata_path)
+    try:
+        summary = run_backfill(session_id, batch_size, duplicates)
+    except BackfillInProgress as err:
+        raise HTTPException(status_code=409, detail=str(err))
+    except Exception as err:
+        logger.error(f"[Backfill Error] {session_id}: {err}")
+        raise HTTPException(status_code=500, detail=f"Backfill failed: {err}")
 
-    logger.info(f"Backfilled {len(new_files)} new image(s) for session {session_id}")
+    processed_count = summary["processed_count"]
+    logger.info(f"Backfilled {processed_count} new image(s) for session {session_id}")
 
     return {
         "success": True,
-        "message": f"Detection results added for {len(new_files)} new image(s).",
-        "files": merged_files,
-        "processed_count": len(new_files)
+        "message": (
+            f"Detection results added for {processed_count} new image(s)."
+            if processed_count else "All images already have detection results."
+        ),
+        "files": summary["files"],
+        "processed_count": processed_count
     }
 
 
+def _run_backfill_logged(session_id: str, batch_size: int, duplicates: Optional[str] = None):
+    try:
+        summary = request_backfill(session_id, batch_size, duplicates)
+        if summary is None:
+            logger.info(f"Background backfill for {session_id} handed to the one already running")
+        else:
+            logger.info(f"Background backfill finished for {session_id}: {summary['processed_count']} image(s)")
+    except Exception as err:
+        logger.error(f"[Background Backfill Error] {session_id}: {err}")
+
+
+@router.get("/detections/density/")
+def get_detection_density(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    start: Optional[datetime] = Query(None, description="Capture time from (UTC)"),
+    end: Optional[datetime] = Query(None, description="Capture time until, exclusive (UTC)"),
+    precision: int = Query(6, ge=1, le=9, description="Geohash length of the returned cells"),
+    session_id: Optional[str] = Query(None),
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    """
+    Geotagged images and detections per geohash cell within a bounding box and
+    capture-time window, across all sessions unless session_id is given.
+    Served from the spatial index, not from session metadata.
+    """
+    if session_id:
+        session_id = resolve_session_id(claims, session_id)
+    # Aware datetimes are compared as UTC; the index stores naive UTC
+    start, end = (
+        value.astimezone(timezone.utc).replace(tzinfo=None) if value and value.tzinfo else value
+        for value in (start, end)
+    )
+    try:
+        return query_density(min_lat, min_lon, max_lat, max_lon, start, end, precision, session_id)
+    except ValueError as err:
+        raise HTTPException(status_code=400, detail=str(err))
+    except Exception as err:
+        logger.error(f"[Density Query Error]: {err}")
+        raise HTTPException(status_code=500, detail=f"Density query failed: {err}")
+
+
 @router.get("/session-status/{session_id}")
-async def get_session_status(session_id: str):
+async def get_session_status(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    claims: Optional[dict] = Depends(get_token_claims)
+):
     """
     Get the current status of a session from GCS including time remaining and file details.
+    Signed URLs close to expiry are re-signed first, up to SIGNED_URL_INLINE_MAX_RECORDS
+    records (urlsPending counts the rest), and written back in the background.
     """
+    session_id = resolve_session_id(claims, session_id)
     try:
         metadata_path = f"{session_id}/session_metadata.json"
-        metadata = download_json(metadata_path)
+        metadata = await run_in_threadpool(download_json, metadata_path)
+        refresh = await run_in_threadpool(refresh_session_urls, metadata)
+        if refresh["resigned"] or refresh["prewarm"]:
+            background_tasks.add_task(persist_refreshed_urls, session_id, refresh["resigned"])
         last_activity_str = metadata.get("last_activity")
         if not last_activity_str:
             raise HTTPException(status_code=500, detail="Missing 'last_activity' in session metadata")
@@ -424,6 +577,9 @@ async def get_session_status(session_id: str):
             "remainingSeconds": remaining_seconds,
             "isExpired": remaining_seconds <= 0,
             "fileCount": metadata.get("file_count", 0),
+            "backfill": backfill_status(metadata),
+            # Records whose URLs are still being re-signed; read again shortly
+            "urlsPending": refresh["pending"],
             "files": metadata.get("files", [])
         })
 
@@ -434,12 +590,72 @@ async def get_session_status(session_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to get session status: {str(e)}")
     
 
+@router.get("/renditions/{session_id}/{filename}")
+def get_renditions(
+    session_id: str,
+    filename: str,
+    level: int = Query(None, ge=0),
+    x0: float = Query(0.0, ge=0, le=1),
+    y0: float = Query(0.0, ge=0, le=1),
+    x1: float = Query(1.0, ge=0, le=1),
+    y1: float = Query(1.0, ge=0, le=1),
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    """
+    Signed URLs for an image's renditions. Without `level` only the thumbnail
+    and pyramid manifest are returned; with `level` the tiles intersecting the
+    normalized viewport (x0, y0)-(x1, y1) at that level are signed as well.
+    """
+    session_id = resolve_session_id(claims, session_id)
+    try:
+        manifest = download_json(f"{rendition_prefix(session_id, filename)}/manifest.json")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No renditions found for this image")
+
+    response = {
+        "filename": filename,
+        "thumbnailUrl": thumbnail_url(session_id, filename, manifest),
+        "tiles": manifest
+    }
+    if level is not None:
+        if level >= manifest.get("levels", 0):
+            raise HTTPException(status_code=400, detail=f"Level must be below {manifest.get('levels', 0)}")
+        response["level"] = level
+        response["tileUrls"] = signed_tile_urls(session_id, filename, manifest, level, (x0, y0, x1, y1))
+    return response
+
+
+@router.get("/export-session/{session_id}")
+def export_session_dataset(
+    session_id: str,
+    format: str = Query("zip", pattern="^(zip|tar)$"),
+    include_images: bool = Query(True),
+    claims: Optional[dict] = Depends(get_token_claims)
+):
+    """
+    Stream the session's training data as a YOLO dataset archive (labels/,
+    images/, data.yaml). Labels come from the columnar detections store and
+    images are fetched a few at a time, so nothing is staged on disk.
+    """
+    session_id = resolve_session_id(claims, session_id)
+    if not GCSService.get_bucket().blob(detections_blob_path(session_id)).exists():
+        raise HTTPException(status_code=404, detail="No detections stored for this session")
+
+    media_type = "application/zip" if format == "zip" else "application/x-tar"
+    return StreamingResponse(
+        stream_session_export(session_id, format, include_images),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=session_{session_id}_dataset.{format}"}
+    )
+
+
 @router.get("/export-session-csv/{session_id}")
-def export_session_csv(session_id: str):
+def export_session_csv(session_id: str, claims: Optional[dict] = Depends(get_token_claims)):
     """
     Export the session metadata (files array) as a downloadable CSV file with capitalized headers.
     Ensures IMAGECLASS is readable (e.g., 'Feeding', 'Resting').
     """
+    session_id = resolve_session_id(claims, session_id)
     metadata_path = f"{session_id}/session_metadata.json"
 
     try:
@@ -450,6 +666,8 @@ def export_session_csv(session_id: str):
     files = metadata.get('files', [])
     if not files:
         raise HTTPException(status_code=404, detail="No files metadata found for this session")
+    # Nested values (e.g. the tile pyramid manifest) have no CSV column
+    files = [{k: v for k, v in f.items() if not isinstance(v, (dict, list))} for f in files]
 
     # Add TOTALCOUNT and ensure IMAGECLASS is readable
     for file in files:
@@ -478,7 +696,7 @@ def export_session_csv(session_id: str):
         writer.writerow(row)
     csv_content = output.getvalue()
     output.close()
-    print('DEBUG CSV CONTENT:\n', csv_content, flush=True)  # Debug print to verify headers
+    logger.info(f"Exported CSV for session {session_id}: {len(files)} row(s), columns {fieldnames}")
 
     return StreamingResponse(
         iter([csv_content]),
@@ -0,0 +1,121 @@
+"""
+Stateless verification of the HS256 tokens issued by /auth/login.
+
+Decoded claims are kept in a bounded LRU cache until the token's `exp`, so
+after the first request a token costs a dictionary lookup instead of a
+signature check (and never a database round trip). The session id is taken
+from the `session_id` claim when present.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+
+from auth.login import ALGORITHM, SECRET_KEY
+from core.config import ENFORCE_AUTH, TOKEN_CACHE_MAX_ENTRIES
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+class TokenCache:
+    """
+    LRU cache of decoded claims; entries expire at the token's own `exp`.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            claims, exp = entry
+            if exp <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return claims
+
+    def put(self, token: str, claims: dict):
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        with self._lock:
+            self._entries[token] = (claims, float(exp))
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a bearer token and return its claims.
+
+    Raises:
+        HTTPException: 401 if the signature is invalid or the token expired,
+            503 if SECRET_KEY is not set
+    """
+    if not SECRET_KEY:
+        raise HTTPException(status_code=503, detail="Authentication is not configured")
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+    token_cache.put(token, claims)
+    return claims
+
+
+def get_token_claims(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[dict]:
+    """
+    Dependency returning the verified claims, or None when no token was sent
+    and auth is not enforced.
+    """
+    if credentials is None:
+        if ENFORCE_AUTH:
+            raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+        return None
+    return decode_token(credentials.credentials)
+
+
+def resolve_session_id(claims: Optional[dict], requested: Optional[str] = None) -> str:
+    """
+    Session id for the request: the token's claim when authenticated,
+    otherwise the one supplied by the client.
+
+    Raises:
+        HTTPException: 403 if the client asks for another user's session,
+            400 if no session id is available at all
+    """
+    claimed = claims.get("session_id") if claims else None
+    if claimed:
+        if requested and requested != claimed:
+            raise HTTPException(status_code=403, detail="Session does not belong to the authenticated user")
+        return claimed
+    if not requested:
+        raise HTTPException(status_code=400, detail="No session_id provided")
+    return requested
+
+
+def require_email(claims: Optional[dict], email: str):
+    """
+    Reject requests acting on another user's account when authenticated.
+    """
+    if claims and claims.get("sub") and claims["sub"].lower() != email.lower():
+        raise HTTPException(status_code=403, detail="Token does not belong to this user")
@@ -1,10 +1,11 @@
 from fastapi import FastAPI, APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 from dotenv import load_dotenv
+from core.database import get_async_users_collection
+from auth.password import VerifierBusy, password_verifier
+from core.logger import setup_logger
 import os
 import uuid
 
@@ -14,28 +15,15 @@ load_dotenv()
 # FastAPI app and router
 app = FastAPI()     
 router = APIRouter(prefix="/auth", tags=["auth"])
+logger = setup_logger("auth", "logs/auth.log")
 
 # Config
-MONGO_URL = os.getenv("MONGO_URI")  # Changed from MONGO_URL to MONGO_URI
-SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret")
+# Signs and verifies every token, so there is no default: without it no
+# tokens are issued or accepted (and main.py refuses to start)
+SECRET_KEY = os.getenv("SECRET_KEY", "")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# MongoDB setup
-try:
-    client = MongoClient(MONGO_URL)
-    # Test the connection
-    client.admin.command('ping')
-    db = client["DugongMonitoring"]
-    user_collection = db["users"]
-    print(f"Successfully connected to MongoDB at {MONGO_URL}")
-except Exception as e:
-    print(f"Failed to connect to MongoDB: {e}")
-    # Don't exit here, let the error be handled in the endpoint
-
 # Request and response models
 class LoginRequest(BaseModel):
     email: EmailStr
@@ -50,6 +38,8 @@ class TokenResponse(BaseModel):
 
 # Token creation function
 def create_token(data: dict, expires_delta: timedelta):
+    if not SECRET_KEY:
+        raise RuntimeError("SECRET_KEY is not set")
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     to_encode.update({"exp": expire})
@@ -57,28 +47,26 @@ def create_token(data: dict, expires_delta: timedelta):
 
 # Login endpoint
 @router.post("/login", response_model=TokenResponse)
-def login(request: LoginRequest):
+async def login(request: LoginRequest):
+    if not SECRET_KEY:
+        logger.error("Login refused: SECRET_KEY is not set")
+        raise HTTPException(status_code=503, detail="Authentication is not configured")
     try:
-        print("MONGO_URL:", MONGO_URL)
-        print("Login request received:", request.email)
-
-        # Test MongoDB connection
-        client.admin.command('ping')
-        print("MongoDB connection successful")
+        logger.debug(f"Login request received: {request.email}")
+        user_collection = get_async_users_collection()
 
-        user = user_collection.find_one({"email": request.email})
-        print("User found:", bool(user))
+        user = await user_collection.find_one({"email": request.email})
+        logger.debug(f"User found: {bool(user)}")
         if not user:
             raise HTTPException(status_code=401, detail="Email not found")
 
         stored_password = user.get("hashed_password", "")
-        print("Password check starting...")
 
         # Handle both hashed and accidentally stored plaintext passwords (only for dev)
         if stored_password.startswith("$2b$"):
-            password_valid = pwd_context.verify(request.password, stored_password)
+            password_valid = await password_verifier.verify(request.email, request.password, stored_password)
         else:
-            print("WARNING: Plaintext password detected in DB. This is not secure!")
+            logger.warning(f"Plaintext password stored for {request.email}; this is not secure")
             password_valid = request.password == stored_password
 
         if not password_valid:
@@ -91,10 +79,10 @@ def login(request: LoginRequest):
         session_id = user.get("session_id")
         if not session_id:
             session_id = str(uuid.uuid4())
-            user_collection.update_one({"email": request.email}, {"$set": {"session_id": session_id}})
+            await user_collection.update_one({"email": request.email}, {"$set": {"session_id": session_id}})
 
         token = create_token(
-            {"sub": user["email"]},
+            {"sub": user["email"], "session_id": session_id},
             timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         )
 
@@ -103,11 +91,10 @@ def login(request: LoginRequest):
     except HTTPException:
         # Re-raise HTTP exceptions (like 401 errors)
         raise
+    except VerifierBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
-        print(f"Login error: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"Login error ({type(e).__name__}): {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 # Include the router in the app
@@ -0,0 +1,140 @@
+"""
+Password verification off the request threads.
+
+bcrypt is deliberately slow, so verifications run on a dedicated, bounded
+thread pool instead of Starlette's shared threadpool; a burst of logins can
+then no longer starve other sync endpoints. Logins beyond the pool and its
+queue are rejected immediately rather than piling up.
+
+Successful verifications are remembered for a short TTL in process memory,
+keyed by an HMAC of (email, stored hash, password) with a random per-process
+salt, so repeated logins skip bcrypt without keeping any password around.
+Changing the stored hash invalidates the entry.
+
+The pool's in-flight and queued verifications and its outcomes are exported
+on /metrics.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from cachetools import TTLCache
+from passlib.context import CryptContext
+
+from core.config import (
+    PASSWORD_CACHE_MAX_ENTRIES,
+    PASSWORD_CACHE_TTL_SECONDS,
+    PASSWORD_VERIFY_MAX_QUEUE,
+    PASSWORD_VERIFY_WORKERS,
+)
+from core.telemetry import Counter, Gauge, register_metric
+
+# Password hashing context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+VERIFICATIONS = register_metric(Counter(
+    "dugong_password_verifications_total",
+    "Password checks by outcome: bcrypt completed, served from the cache, or rejected as busy.", ("outcome",)
+))
+
+
+class VerifierBusy(Exception):
+    """Raised when the verification pool and its queue are full."""
+
+
+class PasswordVerifier:
+    """
+    Bounded bcrypt verifier with queue-depth metrics and a verified-credential cache.
+
+    Args:
+        workers: Threads running bcrypt
+        max_queue: Verifications allowed to wait for a thread
+        cache_ttl: Seconds a successful verification is remembered (0 disables)
+        cache_size: Maximum remembered verifications
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_VERIFY_WORKERS,
+        max_queue: int = PASSWORD_VERIFY_MAX_QUEUE,
+        cache_ttl: int = PASSWORD_CACHE_TTL_SECONDS,
+        cache_size: int = PASSWORD_CACHE_MAX_ENTRIES
+    ):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._cache = TTLCache(maxsize=cache_size, ttl=cache_ttl) if cache_ttl > 0 else None
+        self._salt = os.urandom(32)
+        self._in_flight = 0
+        self.stats = {
+            "completed": 0,
+            "rejected": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "peak_queue_depth": 0
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self.workers)
+
+    def _cache_key(self, email: str, stored_hash: str, password: str) -> bytes:
+        message = "\0".join((email.lower(), stored_hash, password)).encode("utf-8")
+        return hmac.new(self._salt, message, hashlib.sha256).digest()
+
+    async def verify(self, email: str, password: str, stored_hash: str) -> bool:
+        """
+        Check `password` against the bcrypt `stored_hash` of `email`.
+
+        Raises:
+            VerifierBusy: If workers + max_queue verifications are already in flight
+        """
+        key = self._cache_key(email, stored_hash, password) if self._cache is not None else None
+        if key is not None and key in self._cache:
+            self.stats["cache_hits"] += 1
+            VERIFICATIONS.inc("cache_hit")
+            return True
+        self.stats["cache_misses"] += 1
+
+        if self._in_flight >= self.workers + self.max_queue:
+            self.stats["rejected"] += 1
+            VERIFICATIONS.inc("rejected")
+            raise VerifierBusy("Too many logins in progress")
+
+        self._in_flight += 1
+        self.stats["peak_queue_depth"] = max(self.stats["peak_queue_depth"], self.queue_depth)
+        try:
+            loop = asyncio.get_running_loop()
+            valid = await loop.run_in_executor(self._executor, pwd_context.verify, password, stored_hash)
+        finally:
+            self._in_flight -= 1
+        self.stats["completed"] += 1
+        VERIFICATIONS.inc("completed")
+
+        if valid and key is not None:
+            self._cache[key] = True
+        return valid
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "cached_entries": len(self._cache) if self._cache is not None else 0
+        }
+
+
+password_verifier = PasswordVerifier()
+
+register_metric(Gauge(
+    "dugong_password_verify_in_flight", "Password verifications running or waiting for a bcrypt thread.",
+    lambda: password_verifier._in_flight
+))
+register_metric(Gauge(
+    "dugong_password_verify_queued", "Password verifications waiting for a bcrypt thread.",
+    lambda: password_verifier.queue_depth
+))
@@ -0,0 +1,149 @@
+"""
+Throughput and latency of the batch scheduler at several batch sizes and
+max-wait deadlines.
+
+--concurrency threads stand in for concurrent upload requests. Each thread
+submits uploads of --images-per-request images (a range like 1-3 picks a
+random size for each upload) to a services.batch_scheduler.BatchScheduler,
+waits for the results and submits the next one, for --seconds per setting.
+Every combination of --batch-sizes and --waits-ms gets a fresh scheduler.
+Batch size 0 is the unbatched baseline: each upload is its own model call.
+
+By default the model is the benchmarks.stubs stand-in. It sleeps
+--call-overhead once per call plus --compute per image, which is the cost
+structure batching amortises. With --model real the detection and
+classification models come from --weights (checkpoint paths) and run for real.
+
+Reported per setting: images/s, uploads/s, p50/p95/p99 upload latency,
+mean images and uploads per model call.
+
+Run from backend/:
+    python -m benchmarks.bench_batching --concurrency 16 --batch-sizes 0 4 8 16 --waits-ms 0 5 10 25
+    python -m benchmarks.bench_batching --model real --weights det.pt cls.pt --resolution 1280x720
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+
+import psutil
+
+from benchmarks.bench_db import percentile
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.stubs import install_model_stub
+from services.image_prefetch import decode_image_bytes
+
+
+def install_model(args):
+    if args.model == "stub":
+        install_model_stub(args.compute, render=False, compute_per_call=args.call_overhead)
+        return
+    from pathlib import Path
+    from services.model_registry import load_fused, model_registry
+
+    detection, classification = args.weights
+    # Bypass the download from the configured URLs
+    model_registry._models = (load_fused(Path(detection)), load_fused(Path(classification)))
+    model_registry.state = "loaded"
+    model_registry.warm()
+
+
+def parse_range(text: str) -> tuple:
+    low, _, high = text.partition("-")
+    return int(low), int(high or low)
+
+
+def run_setting(batch_size: int, wait_ms: float, frames: list, args) -> dict:
+    import services.model_service as model_service  # the stub, when installed
+    from services.batch_scheduler import BatchScheduler
+
+    calls = []
+
+    def run_batch(images, session_id):
+        calls.append(len(images))
+        return model_service.run_model_on_images(images, session_id)
+
+    scheduler = BatchScheduler(run_batch, max_batch_size=batch_size, max_wait=wait_ms / 1000)
+    low, high = parse_range(args.images_per_request)
+    latencies, images_done = [], []
+    lock = threading.Lock()
+    stop_at = time.monotonic() + args.seconds
+
+    def client(seed: int):
+        rng = random.Random(seed)
+        while time.monotonic() < stop_at:
+            count = rng.randint(low, high)
+            upload = [(f"frame_{i}.jpg", frames[rng.randrange(len(frames))]) for i in range(count)]
+            start = time.perf_counter()
+            results = scheduler.run_model_on_images(upload, "bench")
+            elapsed = time.perf_counter() - start
+            assert [r.image_name for r in results] == [name for name, _ in upload]
+            with lock:
+                latencies.append(elapsed)
+                images_done.append(count)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    scheduler.close()
+
+    return {
+        "batch_size": batch_size,
+        "wait_ms": wait_ms,
+        "uploads": len(latencies),
+        "images_per_s": round(sum(images_done) / elapsed, 1),
+        "uploads_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "model_calls": len(calls),
+        "images_per_call": round(sum(calls) / max(1, len(calls)), 2),
+        "uploads_per_call": round(len(latencies) / max(1, len(calls)), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[0, 4, 8, 16])
+    parser.add_argument("--waits-ms", type=float, nargs="+", default=[0, 5, 10, 25])
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent uploads")
+    parser.add_argument("--images-per-request", default="1-3", help="images per upload, N or LOW-HIGH")
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each setting")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--model", choices=("stub", "real"), default="stub")
+    parser.add_argument("--weights", nargs=2, metavar=("DETECTION", "CLASSIFICATION"),
+                        help="checkpoints for --model real")
+    parser.add_argument("--call-overhead", type=float, default=0.03, help="stub model seconds per call")
+    parser.add_argument("--compute", type=float, default=0.01, help="stub model seconds per image")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    if args.model == "real" and not args.weights:
+        parser.error("--model real needs --weights DETECTION CLASSIFICATION")
+
+    install_model(args)
+    width, height = map(int, args.resolution.lower().split("x"))
+    frames = [decode_image_bytes(synthetic_aerial(width, height, seed=i)) for i in range(4)]
+
+    runs = []
+    for batch_size in args.batch_sizes:
+        # Without batching the deadline does not apply
+        for wait_ms in (args.waits_ms if batch_size > 0 else [0]):
+            runs.append(run_setting(batch_size, wait_ms, frames, args))
+            print(json.dumps(runs[-1]), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)}, "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
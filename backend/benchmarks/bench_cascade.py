@@ -0,0 +1,194 @@
+"""
+Evaluation of the detection cascade and the empty-frame fast path
+(services.model_service): speed against missed detections on a labeled set.
+
+Settings, each over the same frames in --batch-size batches:
+    full        every frame detected and classified (no cascade, no fast path)
+    fast_path   every frame detected; frames without boxes skip
+                classification and the annotated rendition
+    cascade     fast path, plus a screening pass at each --screen-sizes x
+                --screen-confs deciding which frames get full detection
+
+Reported per setting: seconds per image, speedup over `full`, frames left
+with boxes and frames classified, and missed detections two ways:
+    missed_vs_full   boxes `full` found in frames the setting left empty,
+                     as a share of all boxes `full` found (the cascade's own
+                     cost: screened-in frames get exactly the full output)
+    recall           labeled boxes matched by a prediction at IoU >= 0.5;
+                     missed_frames counts labeled frames left without boxes
+
+--dataset is a YOLO-layout directory (images/ and labels/ with one .txt
+per image). Without it, --frames synthetic frames are generated, of which
+--positive-rate hold animals; they only mean something to a model trained
+on similar imagery.
+
+Run from backend/:
+    python -m benchmarks.bench_cascade --weights det.pt cls.pt --dataset /data/dugong-val
+    python -m benchmarks.bench_cascade --weights det.pt cls.pt --frames 60 --resolution 1920x1080
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import psutil
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from core.config import EMPTY_FRAME_CLASS
+
+
+def install_model(weights: list):
+    from services.model_registry import load_fused, model_registry
+
+    detection, classification = weights
+    # Bypass the download from the configured URLs
+    model_registry._models = (load_fused(Path(detection)), load_fused(Path(classification)))
+    model_registry.state = "loaded"
+    model_registry.warm()
+
+
+def load_dataset(root: str) -> list:
+    """(filename, BGR image, (N, 5) labels as class + xywhn) per image."""
+    frames = []
+    for path in sorted(Path(root, "images").iterdir()):
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        label_path = Path(root, "labels", path.stem + ".txt")
+        rows = label_path.read_text().split("\n") if label_path.exists() else []
+        labels = np.array([row.split()[:5] for row in rows if row.strip()], dtype=np.float32).reshape(-1, 5)
+        frames.append((path.name, image, labels))
+    return frames
+
+
+def synthetic_dataset(count: int, width: int, height: int, positive_rate: float) -> list:
+    """Open-water frames; a share of them with dugong (class 0) and calf (class 1) blobs."""
+    rng = np.random.default_rng(0)
+    scale = min(width, height) / 1080
+    frames = []
+    for i in range(count):
+        image = cv2.imdecode(np.frombuffer(synthetic_aerial(width, height, seed=i, animals=0), np.uint8),
+                             cv2.IMREAD_COLOR)
+        labels = []
+        if rng.random() < positive_rate:
+            for _ in range(int(rng.integers(1, 5))):
+                cls = int(rng.random() < 0.25)
+                size = 0.5 if cls else 1.0
+                axes = (int(40 * scale * size) + 4, int(14 * scale * size) + 2)
+                center = (int(rng.integers(axes[0], width - axes[0])), int(rng.integers(axes[0], height - axes[0])))
+                angle = int(rng.integers(0, 180))
+                cv2.ellipse(image, center, axes, angle, 0, 360, (95, 110, 125), -1)
+                x, y, w, h = cv2.boundingRect(cv2.ellipse2Poly(center, axes, angle, 0, 360, 5))
+                labels.append([cls, (x + w / 2) / width, (y + h / 2) / height, w / width, h / height])
+        frames.append((f"frame_{i:04d}.jpg", image, np.array(labels, dtype=np.float32).reshape(-1, 5)))
+    return frames
+
+
+def to_xyxy(xywhn: np.ndarray) -> np.ndarray:
+    xywhn = np.asarray(xywhn, dtype=np.float32).reshape(-1, 4)
+    return np.column_stack([xywhn[:, :2] - xywhn[:, 2:] / 2, xywhn[:, :2] + xywhn[:, 2:] / 2])
+
+
+def matched_labels(labels: np.ndarray, predicted_xywhn: np.ndarray, threshold: float = 0.5) -> int:
+    """Labeled boxes with a prediction at IoU >= threshold (greedy, class-agnostic)."""
+    truth, predicted = to_xyxy(labels[:, 1:]), to_xyxy(predicted_xywhn)
+    if not len(truth) or not len(predicted):
+        return 0
+    top_left = np.maximum(truth[:, None, :2], predicted[None, :, :2])
+    bottom_right = np.minimum(truth[:, None, 2:], predicted[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas = lambda boxes: np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    iou = intersection / (areas(truth)[:, None] + areas(predicted)[None, :] - intersection)
+    used, matched = set(), 0
+    for row in iou:
+        for j in np.argsort(-row):
+            if row[j] < threshold:
+                break
+            if j not in used:
+                used.add(j)
+                matched += 1
+                break
+    return matched
+
+
+def run_setting(frames: list, args, **options) -> tuple:
+    from services.model_service import run_model_on_images
+
+    results = []
+    start = time.perf_counter()
+    for offset in range(0, len(frames), args.batch_size):
+        batch = [(name, image) for name, image, _ in frames[offset:offset + args.batch_size]]
+        results.extend(run_model_on_images(batch, "bench-cascade", **options))
+    return results, time.perf_counter() - start
+
+
+def evaluate(name: str, frames: list, results: list, seconds: float, full: list, full_seconds: float) -> dict:
+    labeled = sum(len(labels) for _, _, labels in frames)
+    full_boxes = sum(len(r.cls) for r in full)
+    missed_vs_full = sum(len(f.cls) for f, r in zip(full, results) if len(f.cls) and not len(r.cls))
+    return {
+        "setting": name,
+        "images": len(frames),
+        "s_per_image": round(seconds / len(frames), 4),
+        "speedup": round(full_seconds / seconds, 2),
+        "frames_with_boxes": sum(len(r.cls) > 0 for r in results),
+        "frames_classified": sum(r.image_class != EMPTY_FRAME_CLASS for r in results),
+        "missed_vs_full": round(missed_vs_full / full_boxes, 4) if full_boxes else None,
+        "recall": round(sum(matched_labels(labels, r.xywhn) for (_, _, labels), r in zip(frames, results))
+                        / labeled, 4) if labeled else None,
+        "missed_frames": sum(len(labels) > 0 and not len(r.cls) for (_, _, labels), r in zip(frames, results)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--weights", nargs=2, required=True, metavar=("DETECTION", "CLASSIFICATION"))
+    parser.add_argument("--dataset", help="YOLO-layout directory with images/ and labels/")
+    parser.add_argument("--frames", type=int, default=60, help="synthetic frames without --dataset")
+    parser.add_argument("--positive-rate", type=float, default=0.2, help="synthetic frames holding animals")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--screen-sizes", type=int, nargs="+", default=[320, 480])
+    parser.add_argument("--screen-confs", type=float, nargs="+", default=[0.05, 0.1])
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    install_model(args.weights)
+    if args.dataset:
+        frames = load_dataset(args.dataset)
+    else:
+        width, height = map(int, args.resolution.lower().split("x"))
+        frames = synthetic_dataset(args.frames, width, height, args.positive_rate)
+
+    # Untimed pass so lazy initialisation is not charged to the first setting
+    run_setting(frames[:args.batch_size], args, cascade=True, empty_fast_path=False)
+
+    full, full_seconds = run_setting(frames, args, cascade=False, empty_fast_path=False)
+    runs = [evaluate("full", frames, full, full_seconds, full, full_seconds)]
+    results, seconds = run_setting(frames, args, cascade=False, empty_fast_path=True)
+    runs.append(evaluate("fast_path", frames, results, seconds, full, full_seconds))
+    print(json.dumps(runs), file=sys.stderr)
+    for size in args.screen_sizes:
+        for conf in args.screen_confs:
+            results, seconds = run_setting(frames, args, cascade=True, empty_fast_path=True,
+                                           screen_size=size, screen_conf=conf)
+            runs.append(evaluate(f"cascade_{size}@{conf}", frames, results, seconds, full, full_seconds))
+            print(json.dumps(runs[-1]), file=sys.stderr)
+
+    report = {
+        "meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args),
+                 "labeled_boxes": int(sum(len(labels) for _, _, labels in frames)),
+                 "labeled_frames": sum(len(labels) > 0 for _, _, labels in frames)},
+        "settings": runs
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: login and cleanup latency under concurrency with the shared,
+pooled MongoDB clients from core.database.
+
+Uses a mongomock-backed database (benchmarks.fake_mongo) with a simulated
+round-trip latency, the real auth and API routers in-process via httpx's ASGI
+transport, and stubbed GCS deletes.
+
+Run from backend/:
+    python -m benchmarks.bench_db --concurrency 1 10 50 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from benchmarks.fake_mongo import install_fake_mongo
+from benchmarks.stubs import install_model_stub
+
+
+def build_app(db_latency: float, users: int) -> FastAPI:
+    install_model_stub()
+    client = install_fake_mongo(latency=db_latency)
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash("secret123")
+    client["DugongMonitoring"]["users"].insert_many([
+        {"email": f"user{i}@example.com", "hashed_password": hashed} for i in range(users)
+    ])
+
+    # Fixed, so every worker of a multi-worker run accepts the others' tokens
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    from api.routes import router as api_router
+    from auth.login import router as login_router
+    from services.GCS_service import GCSService
+
+    GCSService.delete_session_folder = staticmethod(
+        lambda session_id: {"deleted": True, "file_count": 0}
+    )
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api")
+    app.include_router(login_router, prefix="/api")
+    return app
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+async def run_level(app, endpoint: str, concurrency: int, total: int, users: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                email = f"user{i % users}@example.com"
+                start = time.perf_counter()
+                if endpoint == "login":
+                    resp = await client.post("/api/auth/login", json={"email": email, "password": "secret123"})
+                else:
+                    resp = await client.post(f"/api/cleanup-sessions/{email}", params={"session_id": f"s{i}"})
+                latencies.append(time.perf_counter() - start)
+                if resp.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--db-latency", type=float, default=0.002, help="simulated Mongo round trip (s)")
+    args = parser.parse_args()
+
+    app = build_app(args.db_latency, args.users)
+    report = [
+        asyncio.run(run_level(app, endpoint, level, args.requests, args.users))
+        for endpoint in ("login", "cleanup")
+        for level in args.concurrency
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Near-duplicate frame detection (services.frame_dedup): hashing cost, how
+well it separates duplicates from distinct frames, and what skipping saves.
+
+Hashing: frame_hashes on --resolution frames, per image, against decoding
+the same JPEG.
+
+Matching: --frames distinct synthetic survey frames, each with variants a
+hovering drone or a burst produces (re-encoded, brightness shift, sensor
+noise, a few pixels of drift), which should match, and variants of a moving
+survey (the next frame overlapping by 80% or 50%), which perceptual hashes
+are not expected to match. Distinct frames are checked against each other
+for false matches.
+
+End to end: a survey of --frames scenes with --repeats hover frames each
+goes through run_deduplicated in each mode, with the model stubbed at
+--compute seconds per image and the real render pool; reports wall time,
+images inferred, and images flagged or skipped.
+
+Run from backend/:
+    python -m benchmarks.bench_dedup --frames 40 --resolution 1920x1080
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+import psutil
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.fake_gcs import install_fake_gcs
+from benchmarks.stubs import install_model_stub
+
+
+def decode(data: bytes) -> np.ndarray:
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def reencode(image: np.ndarray, quality: int) -> np.ndarray:
+    return decode(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes())
+
+
+def shifted(image: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """The scene moved by (dx, dy) pixels; the uncovered edge is replicated."""
+    matrix = np.float32([[1, 0, dx], [0, 1, dy]])
+    return cv2.warpAffine(image, matrix, image.shape[1::-1], borderMode=cv2.BORDER_REPLICATE)
+
+
+def variants(image: np.ndarray, rng: np.random.Generator) -> dict:
+    height, width = image.shape[:2]
+    noise = rng.normal(0, 4, image.shape).astype(np.float32)
+    return {
+        "reencoded": reencode(image, 75),
+        "brighter": cv2.convertScaleAbs(image, alpha=1.0, beta=12),
+        "noise": np.clip(image + noise, 0, 255).astype(np.uint8),
+        "drift_0.5pct": shifted(image, width // 200, height // 200),
+        "overlap_80pct": shifted(image, width // 5, 0),
+        "overlap_50pct": shifted(image, width // 2, 0),
+    }
+
+
+def bench_hashing(args, frames: list) -> dict:
+    from services.frame_dedup import frame_hashes
+
+    encoded = [cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes() for f in frames[:8]]
+    decoded = [decode(data) for data in encoded]
+    samples = {"hash": [], "decode": []}
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        frame_hashes(decoded)
+        samples["hash"].append((time.perf_counter() - start) / len(decoded))
+        start = time.perf_counter()
+        for data in encoded:
+            decode(data)
+        samples["decode"].append((time.perf_counter() - start) / len(encoded))
+    return {
+        "resolution": args.resolution,
+        "hash_ms_per_image": round(float(np.median(samples["hash"])) * 1000, 2),
+        "decode_ms_per_image": round(float(np.median(samples["decode"])) * 1000, 2),
+    }
+
+
+def bench_matching(args, frames: list) -> dict:
+    from services.frame_dedup import frame_hashes, hash_distances
+
+    rng = np.random.default_rng(1)
+    originals = frame_hashes(frames)
+    matched = {}
+    for i, frame in enumerate(frames):
+        for kind, variant in variants(frame, rng).items():
+            distance = int(hash_distances(frame_hashes([variant]), originals[i:i + 1])[0, 0])
+            matched.setdefault(kind, []).append(distance <= args.max_distance)
+
+    distances = hash_distances(originals, originals)
+    pairs = distances[np.triu_indices(len(frames), k=1)]
+    return {
+        "max_distance": args.max_distance,
+        "match_rate": {kind: round(float(np.mean(hits)), 3) for kind, hits in matched.items()},
+        "distinct_pairs": int(pairs.size),
+        "false_matches": int((pairs <= args.max_distance).sum()),
+        "distinct_distance_min": int(pairs.min()) if pairs.size else None,
+    }
+
+
+def bench_end_to_end(args, frames: list) -> list:
+    from services.frame_dedup import run_deduplicated
+
+    model = install_model_stub(compute_per_image=args.compute, render=True)
+    rng = np.random.default_rng(2)
+    survey = []
+    for i, frame in enumerate(frames):
+        survey.append((f"scene{i:03d}_0.jpg", frame))
+        for r in range(1, args.repeats + 1):
+            survey.append((f"scene{i:03d}_{r}.jpg", reencode(shifted(frame, r, r), 85)))
+
+    runs = []
+    for mode in ("off", "flag", "skip"):
+        install_fake_gcs()
+        inferred = []
+
+        def run_batch(images):
+            inferred.append(len(images))
+            return model.run_model_on_images(images, "bench-dedup")
+
+        start = time.perf_counter()
+        results = []
+        for offset in range(0, len(survey), args.batch_size):
+            results.extend(run_deduplicated(survey[offset:offset + args.batch_size], "bench-dedup",
+                                            run_batch, mode, args.max_distance))
+        runs.append({
+            "mode": mode,
+            "images": len(survey),
+            "inferred": sum(inferred),
+            "flagged": sum(r.duplicate_of is not None for r in results),
+            "skipped": sum(r.reused for r in results),
+            "wall_s": round(time.perf_counter() - start, 2),
+        })
+    return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=40, help="distinct scenes")
+    parser.add_argument("--repeats", type=int, default=2, help="hover frames per scene (end to end)")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--compute", type=float, default=0.2, help="stub model seconds per image")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-distance", type=int, default=None, help="default DEDUP_MAX_DISTANCE")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    if args.max_distance is None:
+        from core.config import DEDUP_MAX_DISTANCE
+
+        args.max_distance = DEDUP_MAX_DISTANCE
+
+    width, height = map(int, args.resolution.lower().split("x"))
+    frames = [decode(synthetic_aerial(width, height, seed=i)) for i in range(args.frames)]
+
+    hashing = bench_hashing(args, frames)
+    print(json.dumps(hashing), file=sys.stderr)
+    matching = bench_matching(args, frames)
+    print(json.dumps(matching), file=sys.stderr)
+    end_to_end = bench_end_to_end(args, frames)
+    print(json.dumps(end_to_end), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)},
+              "hashing": hashing, "matching": matching, "end_to_end": end_to_end}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+API cost of proxied uploads (/upload-multiple/) against direct-to-storage
+uploads (/upload-urls/ + signed resumable URL + /upload-complete/).
+
+The stub app (benchmarks.load_app) runs under uvicorn in its own process,
+with the fake bucket shared through a temporary directory. --sessions
+sessions each upload --images images of --resolution, concurrently:
+
+    proxied  multipart POSTs of --files-per-request images to /upload-multiple/,
+             which stores and runs inference inline
+    direct   /upload-urls/, then the bytes go to the bucket through the fake
+             signed URL from this process (the browser's PUT to GCS), then
+             /upload-complete/, which queues inference in the background
+
+Each run ends when /session-status lists every image of every session.
+Reported per mode: time until all uploads were accepted, time until every
+image was processed, image MB that went through the API, CPU seconds and
+peak RSS of the API process.
+
+Run from backend/:
+    python -m benchmarks.bench_direct_upload --sessions 4 --images 20 --resolution 3840x2160
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import psutil
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.bench_workers import MemorySampler, stop, wait_until
+from benchmarks.fake_gcs import FakeBucket
+from benchmarks.loadtest import free_port
+from services.GCS_service import GCSService
+
+MODES = ("proxied", "direct")
+
+
+def start_app(args, workdir: str) -> tuple:
+    bucket_dir = os.path.join(workdir, "bucket")
+    config = {"users": args.sessions, "gcs_latency": args.gcs_latency, "compute": args.compute,
+              "render": False, "bucket_dir": bucket_dir}
+    env = dict(os.environ, LOAD_APP_CONFIG=json.dumps(config), WARMUP_ENABLED="false", LOG_TO_STDERR="false")
+    env.pop("INFERENCE_SOCKET", None)
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.load_app:app_from_env", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--loop", "asyncio", "--http", "h11",
+         "--log-level", "warning"],
+        env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+
+    def app_ready():
+        try:
+            return httpx.get(f"{url}/loadtest/time", timeout=1).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    wait_until(app_ready, [proc], timeout=120)
+    return proc, url, bucket_dir
+
+
+async def upload_proxied(client, session: str, names: list, frame: bytes, args):
+    for i in range(0, len(names), args.files_per_request):
+        files = [("files", (name, frame, "image/jpeg")) for name in names[i:i + args.files_per_request]]
+        resp = await client.post("/api/upload-multiple/", files=files, data={"session_id": session})
+        resp.raise_for_status()
+
+
+async def upload_direct(client, bucket: FakeBucket, session: str, names: list, frame: bytes, args):
+    specs = [{"filename": name, "contentType": "image/jpeg", "size": len(frame)} for name in names]
+    resp = await client.post("/api/upload-urls/", json={"sessionId": session, "files": specs})
+    resp.raise_for_status()
+    uploads = resp.json()["uploads"]
+    assert len(uploads) == len(names), resp.json()
+    for upload in uploads:
+        await asyncio.to_thread(bucket.upload_via_signed_url, upload["uploadUrl"], frame, upload["uploadHeaders"])
+    resp = await client.post("/api/upload-complete/", json={"sessionId": session, "filenames": names})
+    resp.raise_for_status()
+    assert len(resp.json()["accepted"]) == len(names), resp.json()
+
+
+async def wait_processed(client, session: str, count: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        resp = await client.get(f"/api/session-status/{session}")
+        if resp.status_code == 200 and resp.json()["fileCount"] >= count:
+            return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{session}: images not processed within {timeout} s")
+
+
+async def drive(mode: str, url: str, bucket_dir: str, frame: bytes, args) -> dict:
+    bucket = FakeBucket(GCSService.BUCKET_NAME, 0.0, bucket_dir)
+    upload_done = []
+
+    async def session_run(client, i: int):
+        session = f"load-session-{i}"
+        names = [f"{mode}_{i}_{n:04d}.jpg" for n in range(args.images)]
+        if mode == "proxied":
+            await upload_proxied(client, session, names, frame, args)
+        else:
+            await upload_direct(client, bucket, session, names, frame, args)
+        upload_done.append(time.perf_counter())
+        await wait_processed(client, session, args.images, args.timeout)
+
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(session_run(client, i) for i in range(args.sessions)))
+        done = time.perf_counter()
+    return {"upload_s": round(max(upload_done) - start, 2), "processed_s": round(done - start, 2)}
+
+
+def run_mode(mode: str, frame: bytes, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="dugong-direct-")
+    proc = None
+    try:
+        proc, url, bucket_dir = start_app(args, workdir)
+        server = psutil.Process(proc.pid)
+        cpu_before = sum(server.cpu_times()[:2])
+        with MemorySampler([proc.pid], interval=0.1) as memory:
+            timing = asyncio.run(drive(mode, url, bucket_dir, frame, args))
+            final = memory.sample()
+        cpu_seconds = sum(server.cpu_times()[:2]) - cpu_before
+        peak = memory.peak if memory.peak["rss_mb"] >= final["rss_mb"] else final
+    finally:
+        if proc is not None:
+            stop([proc])
+        shutil.rmtree(workdir, ignore_errors=True)
+    images = args.sessions * args.images
+    image_mb = images * len(frame) / 2**20
+    return {
+        "mode": mode,
+        "images": images,
+        **timing,
+        "images_per_s": round(images / timing["processed_s"], 1),
+        "mb_through_api": round(image_mb if mode == "proxied" else 0.0, 1),
+        "api_cpu_s": round(cpu_seconds, 2),
+        "api_cpu_ms_per_image": round(cpu_seconds * 1000 / images, 1),
+        "api_peak_rss_mb": peak["rss_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent uploading sessions")
+    parser.add_argument("--images", type=int, default=20, help="images per session")
+    parser.add_argument("--files-per-request", type=int, default=10, help="images per proxied POST")
+    parser.add_argument("--resolution", default="3840x2160")
+    parser.add_argument("--compute", type=float, default=0.01, help="stub model seconds per image")
+    parser.add_argument("--gcs-latency", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    width, height = map(int, args.resolution.lower().split("x"))
+    frame = synthetic_aerial(width, height, seed=0)
+
+    runs = []
+    for mode in args.modes:
+        runs.append(run_mode(mode, frame, args))
+        print(json.dumps(runs[-1]), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args),
+                       "image_mb": round(len(frame) / 2**20, 2)},
+              "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Latency of small uploads while another session uploads a large batch, and
+speed of admission-control rejections.
+
+The real /upload-multiple/ route runs in-process (benchmarks.load_app, stub
+model, fake bucket and user store) behind httpx's ASGI transport. One session
+posts --large-images images in a single upload. Meanwhile --small-users
+other sessions keep posting one image at a time, and their latency is
+recorded until the large upload finishes. Scenarios:
+
+    quiet     small uploads only, the reference latency
+    fifo      one shared queue and the large upload submitted whole, i.e.
+              the scheduling before per-session queues
+    fair      per-session queues, weighted round-robin, chunked uploads
+    overload  `fair` with --max-requests admitted uploads; the rest are
+              refused with 429, and the report shows how fast
+
+Exits non-zero when the p95 small-upload latency under `fair` is above
+--bound-ms, or when `overload` produced no 429 with a Retry-After header.
+
+Run from backend/:
+    python -m benchmarks.bench_fairness --large-images 200 --small-users 4
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+import httpx
+import psutil
+
+from benchmarks.bench_db import percentile
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.load_app import create_app
+
+SCENARIOS = ("quiet", "fifo", "fair", "overload")
+
+
+def fifo_scheduler(**kwargs):
+    from services.batch_scheduler import BatchScheduler
+
+    class FifoScheduler(BatchScheduler):
+        """Every request in one queue, batches filled from its head."""
+
+        def submit(self, images, session_id, queue=None, weight=1):
+            return super().submit(images, session_id, queue="fifo", weight=max(1, self.max_batch_size))
+
+    return FifoScheduler(**kwargs)
+
+
+def configure(scenario: str, args):
+    """Swap in a fresh scheduler (and upload chunking) for the scenario."""
+    import api.routes
+    import services.batch_scheduler as batch_scheduler
+    from core.config import UPLOAD_BATCH_SIZE
+
+    if batch_scheduler._scheduler is not None:
+        batch_scheduler._scheduler.close()
+    kwargs = {"max_batch_size": args.batch_size}
+    if scenario == "overload":
+        kwargs["max_requests"] = args.max_requests
+    if scenario == "fifo":
+        batch_scheduler._scheduler = fifo_scheduler(**kwargs)
+        api.routes.UPLOAD_BATCH_SIZE = 10**9
+    else:
+        batch_scheduler._scheduler = batch_scheduler.BatchScheduler(**kwargs)
+        api.routes.UPLOAD_BATCH_SIZE = UPLOAD_BATCH_SIZE
+
+
+async def post(client, session: str, names: list, frame: bytes) -> httpx.Response:
+    files = [("files", (name, frame, "image/jpeg")) for name in names]
+    return await client.post("/api/upload-multiple/", files=files, data={"session_id": session})
+
+
+async def run_scenario(scenario: str, client, frame: bytes, args) -> dict:
+    configure(scenario, args)
+    tag = f"{scenario}-{time.monotonic_ns()}"
+    stop = asyncio.Event()
+    small, rejected, retry_after = [], [], []
+
+    async def small_user(user: int):
+        i = 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            resp = await post(client, f"load-session-{user + 1}", [f"small_{tag}_{user}_{i}.jpg"], frame)
+            elapsed = time.perf_counter() - start
+            i += 1
+            if resp.status_code == 429:
+                rejected.append(elapsed)
+                retry_after.append(resp.headers.get("retry-after"))
+                await asyncio.sleep(0.05)
+                continue
+            resp.raise_for_status()
+            small.append(elapsed)
+
+    large_seconds = None
+    users = args.small_users * (4 if scenario == "overload" else 1)
+    tasks = [asyncio.create_task(small_user(u)) for u in range(users)]
+    try:
+        if scenario == "quiet":
+            await asyncio.sleep(args.quiet_seconds)
+        else:
+            names = [f"large_{tag}_{i:04d}.jpg" for i in range(args.large_images)]
+            start = time.perf_counter()
+            resp = await post(client, "load-session-0", names, frame)
+            resp.raise_for_status()
+            large_seconds = time.perf_counter() - start
+    finally:
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    entry = {"scenario": scenario, "small_uploads": len(small)}
+    if small:
+        entry.update({
+            "small_p50_ms": round(percentile(small, 50) * 1000, 1),
+            "small_p95_ms": round(percentile(small, 95) * 1000, 1),
+            "small_max_ms": round(max(small) * 1000, 1),
+        })
+    if large_seconds is not None:
+        entry["large_upload_s"] = round(large_seconds, 2)
+        entry["large_images_per_s"] = round(args.large_images / large_seconds, 1)
+    if rejected:
+        entry.update({
+            "rejected": len(rejected),
+            "rejected_p95_ms": round(percentile(rejected, 95) * 1000, 1),
+            "retry_after": sorted(set(filter(None, retry_after)), key=int),
+        })
+    return entry
+
+
+async def run_all(args) -> list:
+    app = create_app(users=args.small_users * 4 + 2, gcs_latency=args.gcs_latency, compute=args.compute,
+                     render=False)
+    width, height = map(int, args.resolution.lower().split("x"))
+    frame = synthetic_aerial(width, height, seed=0)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        runs = []
+        for scenario in args.scenarios:
+            runs.append(await run_scenario(scenario, client, frame, args))
+            print(json.dumps(runs[-1]), file=sys.stderr)
+        return runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--large-images", type=int, default=200)
+    parser.add_argument("--small-users", type=int, default=4)
+    parser.add_argument("--quiet-seconds", type=float, default=3.0)
+    parser.add_argument("--batch-size", type=int, default=8, help="scheduler max batch size")
+    parser.add_argument("--max-requests", type=int, default=4, help="admitted uploads in the overload scenario")
+    parser.add_argument("--compute", type=float, default=0.02, help="stub model seconds per image")
+    parser.add_argument("--gcs-latency", type=float, default=0.0)
+    parser.add_argument("--resolution", default="640x480")
+    parser.add_argument("--bound-ms", type=float, default=1000.0, help="p95 small-upload latency allowed under fair")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    runs = asyncio.run(run_all(args))
+    failures = []
+    for run in runs:
+        if run["scenario"] == "fair" and run.get("small_p95_ms", float("inf")) > args.bound_ms:
+            failures.append(f"fair: small-upload p95 {run.get('small_p95_ms')} ms > {args.bound_ms} ms")
+        if run["scenario"] == "overload" and not run.get("retry_after"):
+            failures.append("overload: no 429 with Retry-After")
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)},
+              "runs": runs, "failures": failures}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Reclassifying many images as false positives: one /move-to-false-positive/
+call per image against a single /move-to-false-positive/bulk/ call.
+
+A session of --session-images processed images (metadata records as
+result_service writes them) is seeded into the fake bucket, with
+--gcs-latency per storage request. --moves of them are then marked, once
+image by image and once in bulk, on fresh copies of the session. Reported:
+wall time, storage requests, and bytes of session_metadata.json uploaded.
+
+Run from backend/:
+    python -m benchmarks.bench_false_positive --session-images 500 --moves 10 50 200
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import psutil
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_pipeline import git_commit
+from benchmarks.load_app import PASSWORD, create_app
+
+
+def seed_session(bucket, session_id: str, images: int):
+    from services.GCS_service import GCSService
+
+    for name in list(bucket.objects):
+        if name.startswith(f"{session_id}/"):
+            del bucket.objects[name]
+    records = []
+    for i in range(images):
+        filename = f"DJI_{i:04d}.JPG"
+        bucket.objects[f"{session_id}/images/{filename}"] = (b"\xff\xd8" + b"\0" * 1024, i + 1, "image/jpeg")
+        records.append({
+            "filename": filename,
+            "imageUrl": f"https://storage.googleapis.com/bucket/{session_id}/results/{filename}?X-Goog-Signature=" + "0" * 512,
+            "previewUrl": f"https://storage.googleapis.com/bucket/{session_id}/previews/{filename}?X-Goog-Signature=" + "0" * 512,
+            "labelUrl": f"https://storage.googleapis.com/bucket/{session_id}/labels/{filename}?X-Goog-Signature=" + "0" * 512,
+            "annotated": True,
+            "dugongCount": 1,
+            "calfCount": 0,
+            "totalCount": 1,
+            "imageClass": "resting" if i % 2 else "feeding",
+            "geo": None,
+            "createdAt": datetime.utcnow().isoformat()
+        })
+    GCSService.upload_json(f"{session_id}/session_metadata.json", {
+        "session_id": session_id, "created_at": datetime.utcnow().isoformat(),
+        "last_activity": datetime.utcnow().isoformat(), "files": records, "file_count": len(records)
+    })
+    return records
+
+
+def measure(bucket, run) -> dict:
+    # Counted at the bucket, so writes through any GCSService or blob call are seen
+    written = []
+    put = bucket._put
+
+    def counting_put(name, data, content_type, if_generation_match):
+        if name.endswith("session_metadata.json"):
+            written.append(len(data))
+        return put(name, data, content_type, if_generation_match)
+
+    bucket._put = counting_put
+    requests = bucket.requests
+    start = time.perf_counter()
+    try:
+        run()
+    finally:
+        del bucket._put
+    return {
+        "wall_s": round(time.perf_counter() - start, 3),
+        "storage_requests": bucket.requests - requests,
+        "metadata_writes": len(written),
+        "metadata_mb_written": round(sum(written) / 2**20, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--session-images", type=int, default=500)
+    parser.add_argument("--moves", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--gcs-latency", type=float, default=0.02, help="fake storage latency per request")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    app = create_app(users=1, gcs_latency=args.gcs_latency, db_latency=0.0)
+    from services.GCS_service import GCSService
+
+    bucket = GCSService.get_bucket()
+    client = TestClient(app)
+    token = client.post("/api/auth/login", json={"email": "bench0@example.com", "password": PASSWORD}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    session_id = "load-session-0"
+
+    runs = []
+    for moves in args.moves:
+        records = seed_session(bucket, session_id, args.session_images)[:moves]
+
+        def single():
+            for record in records:
+                response = client.post("/api/move-to-false-positive/", headers=headers, json={
+                    "sessionId": session_id, "imageName": record["filename"], "targetClass": record["imageClass"]
+                })
+                assert response.status_code == 200, response.text
+
+        one_by_one = measure(bucket, single)
+
+        records = seed_session(bucket, session_id, args.session_images)[:moves]
+
+        def bulk():
+            response = client.post("/api/move-to-false-positive/bulk/", headers=headers, json={
+                "sessionId": session_id,
+                "images": [{"imageName": r["filename"], "targetClass": r["imageClass"]} for r in records]
+            })
+            assert response.status_code == 200 and len(response.json()["moved"]) == moves, response.text
+
+        runs.append({"moves": moves, "single": one_by_one, "bulk": measure(bucket, bulk)})
+        print(json.dumps(runs[-1]), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)}, "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
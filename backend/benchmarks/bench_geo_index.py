@@ -0,0 +1,245 @@
+"""
+Cost of geotag extraction, and bounding-box/time-window density queries
+from the spatial index against scanning every session's metadata.
+
+Extraction: services.exif_service.extract_geo on a geotagged --resolution
+JPEG (all bytes, and the EXIF_HEADER_BYTES a backfill reads), against
+opening it with Pillow and fully decoding it with OpenCV.
+
+Queries: --sessions sessions of --images geotagged images, spread over a
+survey area, are written both as session_metadata.json files (fake bucket
+with --gcs-latency per request) and to the index (mongomock, or the MongoDB
+at --mongo-uri). Each query box covers --box-fraction of the area and one
+day of captures. "scan" downloads every session's metadata and filters the
+records; "index" is services.geo_index.query_density. Both must report the
+same totals. `index_candidates` counts the images inside the query's geohash
+prefix ranges, i.e. the (geohash, taken_at) index keys MongoDB examines.
+mongomock ignores indexes and scans every document, so index_ms only means
+something with --mongo-uri.
+
+Run from backend/:
+    python -m benchmarks.bench_geo_index --sessions 50 --images 100
+    python -m benchmarks.bench_geo_index --sessions 1000 --mongo-uri mongodb://localhost:27017
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import psutil
+from PIL import ExifTags, Image
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.fake_gcs import install_fake_gcs
+from benchmarks.fake_mongo import install_fake_mongo
+
+# Survey area (Moreton Bay) and period the synthetic images are spread over
+AREA = (-27.6, 153.1, -27.0, 153.5)
+PERIOD_START = datetime(2024, 5, 1)
+PERIOD_DAYS = 30
+
+
+def _dms(value: float) -> tuple:
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    return float(degrees), float(minutes), round((value - degrees - minutes / 60) * 3600, 4)
+
+
+def geotag(jpeg: bytes, lat: float, lon: float, altitude: float, taken_at: datetime) -> bytes:
+    """
+    Insert an EXIF block with GPS position, altitude and UTC time into a
+    JPEG, without re-encoding it.
+    """
+    exif = Image.Exif()
+    exif[ExifTags.Base.GPSInfo] = {
+        1: "S" if lat < 0 else "N", 2: _dms(lat), 3: "W" if lon < 0 else "E", 4: _dms(lon),
+        5: 0, 6: altitude, 7: (float(taken_at.hour), float(taken_at.minute), float(taken_at.second)),
+        29: taken_at.strftime("%Y:%m:%d")
+    }
+    exif.get_ifd(ExifTags.IFD.Exif)[36867] = taken_at.strftime("%Y:%m:%d %H:%M:%S")
+    payload = exif.tobytes()
+    return jpeg[:2] + b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload + jpeg[2:]
+
+
+def time_call(fn, repeat: int) -> float:
+    """Median milliseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def bench_extraction(args) -> dict:
+    import cv2
+    import numpy as np
+
+    from core.config import EXIF_HEADER_BYTES
+    from services.exif_service import extract_geo
+
+    width, height = map(int, args.resolution.lower().split("x"))
+    data = geotag(synthetic_aerial(width, height, seed=0), -27.4, 153.3, 120.0, PERIOD_START)
+    assert extract_geo(data) == extract_geo(data[:EXIF_HEADER_BYTES]) is not None
+
+    def pil_exif():
+        with Image.open(io.BytesIO(data)) as img:
+            return img.getexif().get_ifd(ExifTags.IFD.GPSInfo)
+
+    return {
+        "image_mb": round(len(data) / 2**20, 2),
+        "extract_geo_ms": time_call(lambda: extract_geo(data), args.repeat * 10),
+        "extract_geo_header_ms": time_call(lambda: extract_geo(data[:EXIF_HEADER_BYTES]), args.repeat * 10),
+        "pillow_open_exif_ms": time_call(pil_exif, args.repeat * 10),
+        "full_decode_ms": time_call(lambda: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR),
+                                    args.repeat),
+    }
+
+
+def seed(args) -> tuple:
+    """
+    Write the synthetic sessions to the bucket and the index; return the
+    session ids and the geohash of every image.
+    """
+    from services.GCS_service import GCSService
+    from services.geo_index import geohash_encode, index_images
+
+    rng = random.Random(0)
+    sessions, geohashes = [], []
+    for s in range(args.sessions):
+        session_id = f"geo-session-{s}"
+        day = PERIOD_START + timedelta(days=rng.randrange(PERIOD_DAYS))
+        records = []
+        for i in range(args.images):
+            taken_at = day + timedelta(hours=7, seconds=i * 5)
+            records.append({
+                "filename": f"DJI_{i:04d}.JPG",
+                "dugongCount": rng.choice((0, 0, 0, 1, 2, 3)),
+                "calfCount": rng.choice((0, 0, 0, 0, 1)),
+                "imageClass": "resting",
+                "geo": {"lat": rng.uniform(AREA[0], AREA[2]), "lon": rng.uniform(AREA[1], AREA[3]),
+                        "altitude": 120.0, "relativeAltitude": None, "takenAt": taken_at.isoformat()}
+            })
+        GCSService.upload_json(f"{session_id}/session_metadata.json",
+                               {"session_id": session_id, "files": records, "file_count": len(records)})
+        index_images(session_id, records)
+        sessions.append(session_id)
+        geohashes.extend(geohash_encode(r["geo"]["lat"], r["geo"]["lon"]) for r in records)
+    return sessions, geohashes
+
+
+def scan_query(sessions: list, box: tuple, start: datetime, end: datetime) -> dict:
+    """The alternative without an index: read every session's metadata."""
+    from services.GCS_service import GCSService
+
+    min_lat, min_lon, max_lat, max_lon = box
+    totals = {"images": 0, "dugongs": 0, "calves": 0}
+
+    def load(session_id):
+        return GCSService.download_json(f"{session_id}/session_metadata.json")
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        for metadata in pool.map(load, sessions):
+            for record in metadata["files"]:
+                geo = record.get("geo")
+                if not geo or not geo.get("takenAt"):
+                    continue
+                taken_at = datetime.fromisoformat(geo["takenAt"])
+                if min_lat <= geo["lat"] <= max_lat and min_lon <= geo["lon"] <= max_lon and start <= taken_at < end:
+                    totals["images"] += 1
+                    totals["dugongs"] += record["dugongCount"]
+                    totals["calves"] += record["calfCount"]
+    return totals
+
+
+def bench_queries(args) -> list:
+    from services.geo_index import cover_bbox, query_density
+
+    install_fake_gcs(latency=args.gcs_latency)
+    if args.mongo_uri:
+        from pymongo import MongoClient
+
+        from core import database
+
+        database.set_clients(MongoClient(args.mongo_uri))
+        database.get_detection_geo_collection().drop()
+        database.init_db()
+    else:
+        install_fake_mongo()
+    start = time.perf_counter()
+    sessions, geohashes = seed(args)
+    seed_seconds = time.perf_counter() - start
+
+    rng = random.Random(1)
+    side_lat = (AREA[2] - AREA[0]) * args.box_fraction ** 0.5
+    side_lon = (AREA[3] - AREA[1]) * args.box_fraction ** 0.5
+    runs = []
+    for _ in range(args.queries):
+        min_lat = rng.uniform(AREA[0], AREA[2] - side_lat)
+        min_lon = rng.uniform(AREA[1], AREA[3] - side_lon)
+        box = (min_lat, min_lon, min_lat + side_lat, min_lon + side_lon)
+        day = PERIOD_START + timedelta(days=rng.randrange(PERIOD_DAYS))
+        window = (day, day + timedelta(days=1))
+
+        t0 = time.perf_counter()
+        scanned = scan_query(sessions, box, *window)
+        t1 = time.perf_counter()
+        indexed = query_density(*box, *window, precision=6)
+        t2 = time.perf_counter()
+        assert scanned == {k: indexed[k] for k in scanned}, (scanned, indexed)
+        cells = tuple(cover_bbox(*box))
+        runs.append({"scan_ms": (t1 - t0) * 1000, "index_ms": (t2 - t1) * 1000, "images": indexed["images"],
+                     "cells": len(indexed["cells"]), "candidates": sum(g.startswith(cells) for g in geohashes)})
+
+    if args.mongo_uri:
+        from core import database
+
+        database.get_detection_geo_collection().drop()
+    return [{
+        "sessions": args.sessions,
+        "images": args.sessions * args.images,
+        "backend": "mongodb" if args.mongo_uri else "mongomock",
+        "seed_s": round(seed_seconds, 2),
+        "matched_images_mean": round(statistics.mean(r["images"] for r in runs), 1),
+        "cells_mean": round(statistics.mean(r["cells"] for r in runs), 1),
+        "index_candidates_mean": round(statistics.mean(r["candidates"] for r in runs), 1),
+        "scan_ms_median": round(statistics.median(r["scan_ms"] for r in runs), 1),
+        "index_ms_median": round(statistics.median(r["index_ms"] for r in runs), 1),
+    }]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--images", type=int, default=100, help="images per session")
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--box-fraction", type=float, default=0.05, help="share of the survey area per query")
+    parser.add_argument("--gcs-latency", type=float, default=0.01, help="fake storage latency per request")
+    parser.add_argument("--mongo-uri", help="run the index on this MongoDB (its detection_geo is dropped)")
+    parser.add_argument("--resolution", default="3840x2160")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    extraction = bench_extraction(args)
+    print(json.dumps(extraction), file=sys.stderr)
+    queries = bench_queries(args)
+    print(json.dumps(queries), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)},
+              "extraction": extraction, "queries": queries}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
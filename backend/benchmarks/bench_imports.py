@@ -0,0 +1,152 @@
+"""
+Import-time profile of the API's cold start.
+
+Imports the application module (main by default) in fresh interpreters with
+`python -X importtime` and reports:
+
+    import_ms       cumulative import time of the module (median over --repeat)
+    process_ms      wall time of the whole process, interpreter start included
+    packages        top-level packages by total self time
+    slowest         individual modules with the largest cumulative time
+    heavy_imported  inference-only packages (torch, ultralytics, cv2, ...)
+                    that were imported; the non-inference API should load none
+
+The run fails (exit 1) when import_ms exceeds --target-ms, when a heavy
+package is imported, or, with --compare, when import_ms regresses beyond
+--tolerance against a saved report.
+
+Run from backend/:
+    python -m benchmarks.bench_imports --output imports.json
+    python -m benchmarks.bench_imports --compare imports.json
+    python -m benchmarks.bench_imports --module services.model_service --target-ms 0 --allow-heavy
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.bench_pipeline import git_commit
+
+HEAVY_PACKAGES = ("torch", "torchvision", "ultralytics", "cv2", "matplotlib", "scipy", "pandas")
+
+# Cold-start budget for importing the API without the inference stack
+DEFAULT_TARGET_MS = 1000.0
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parse `-X importtime` output into (module, self_us, cumulative_us, depth) rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def profile_once(module: str) -> dict:
+    env = dict(os.environ, PYTHONPROFILEIMPORTTIME="1")
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", f"import {module}"], capture_output=True, text=True, env=env)
+    process_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        error = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"importing {module} failed:\n" + "\n".join(error[-5:]))
+    rows = parse_importtime(proc.stderr)
+    return {"rows": rows, "process_ms": process_ms}
+
+
+def summarize(module: str, runs: list, top: int) -> dict:
+    import_ms = []
+    for run in runs:
+        total = next((cum for name, _, cum, depth in run["rows"] if name == module and depth == 0), None)
+        import_ms.append((total or 0) / 1000)
+
+    # Module breakdown from the median run
+    median_run = sorted(zip(import_ms, range(len(runs))))[len(runs) // 2][1]
+    rows = runs[median_run]["rows"]
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    imported = {name.split(".")[0] for name, *_ in rows}
+
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(import_ms), 1),
+        "import_ms_min": round(min(import_ms), 1),
+        "process_ms": round(statistics.median(r["process_ms"] for r in runs), 1),
+        "modules_imported": len(rows),
+        "packages": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        "slowest": [
+            {"module": name, "cumulative_ms": round(cum / 1000, 1), "self_ms": round(self_us / 1000, 1)}
+            for name, self_us, cum, _ in sorted(rows, key=lambda r: -r[2])[:top]
+        ],
+        "heavy_imported": sorted(imported.intersection(HEAVY_PACKAGES)),
+    }
+
+
+def check(report: dict, args, baseline: dict = None) -> list:
+    failures = []
+    result = report["result"]
+    if args.target_ms and result["import_ms"] > args.target_ms:
+        failures.append(f"import_ms {result['import_ms']} > target {args.target_ms}")
+    if result["heavy_imported"] and not args.allow_heavy:
+        failures.append(f"heavy packages imported: {', '.join(result['heavy_imported'])}")
+    if baseline:
+        old = baseline["result"].get("import_ms")
+        if old and (result["import_ms"] - old) / old > args.tolerance:
+            failures.append(f"import_ms regressed {old} -> {result['import_ms']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (the ASGI app by default)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="packages/modules listed in the report")
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help="0 disables the target")
+    parser.add_argument("--allow-heavy", action="store_true", help="do not fail on inference-only packages")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed import_ms regression (fraction)")
+    args = parser.parse_args()
+
+    profile_once(args.module)  # warm the bytecode cache and page cache
+    runs = [profile_once(args.module) for _ in range(args.repeat)]
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "target_ms": args.target_ms,
+        },
+        "result": summarize(args.module, runs, args.top),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report["failures"] = check(report, args, baseline)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if report["failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: caller-side cost of logging through the queue handler.
+
+Compares the time a request thread spends per log call with a plain
+synchronous FileHandler (the previous setup) against core.logger's
+QueueHandler, for INFO lines and for sampled per-item DEBUG lines.
+
+Run from backend/:
+    LOG_TO_STDERR=false python -m benchmarks.bench_logging --lines 50000
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from core.logger import _DroppingQueueHandler, setup_logger, shutdown_logging
+
+
+def per_call_us(logger: logging.Logger, level: int, lines: int) -> float:
+    start = time.perf_counter()
+    for i in range(lines):
+        logger.log(level, "Deleting blob: session/images/frame_%05d.jpg", i)
+    return (time.perf_counter() - start) / lines * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_logger = logging.getLogger("bench_sync")
+        sync_logger.propagate = False
+        handler = logging.FileHandler(Path(tmp) / "sync.log")
+        handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        sync_logger.addHandler(handler)
+        sync_logger.setLevel(logging.DEBUG)
+
+        queued_logger = setup_logger("bench_queued", str(Path(tmp) / "queued.log"), level=logging.DEBUG)
+
+        report = {
+            "lines": args.lines,
+            "sync_file_info_us": round(per_call_us(sync_logger, logging.INFO, args.lines), 2),
+            "queued_info_us": round(per_call_us(queued_logger, logging.INFO, args.lines), 2),
+            "queued_debug_sampled_us": round(per_call_us(queued_logger, logging.DEBUG, args.lines), 2),
+        }
+        start = time.perf_counter()
+        shutdown_logging()
+        report["listener_drain_s"] = round(time.perf_counter() - start, 3)
+        report["queued_dropped"] = _DroppingQueueHandler.dropped
+        report["queued_lines_written"] = sum(1 for _ in open(Path(tmp) / "queued.log"))
+        handler.close()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark: login throughput at 1/10/100 concurrent users, with and without
+the verified-credential cache, on the dedicated bcrypt pool.
+
+Each simulated user logs in repeatedly (as a field team does at the start of
+a shift), so the cached run shows the steady state after the first login.
+
+Run from backend/:
+    python -m benchmarks.bench_login --concurrency 1 10 100 --requests 300
+"""
+import argparse
+import asyncio
+import json
+
+from auth import password
+from benchmarks.bench_db import build_app, run_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=1000)
+    args = parser.parse_args()
+
+    app = build_app(db_latency=0.002, users=args.users)
+    report = []
+    for cache_ttl in (0, 300):
+        for level in args.concurrency:
+            verifier = password.PasswordVerifier(
+                workers=args.workers, max_queue=args.max_queue, cache_ttl=cache_ttl
+            )
+            # auth.login imported the module-level instance by name
+            import auth.login
+            auth.login.password_verifier = verifier
+            result = asyncio.run(run_level(app, "login", level, args.requests, min(args.users, level)))
+            result["cache"] = bool(cache_ttl)
+            result["verifier"] = verifier.snapshot()
+            report.append(result)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
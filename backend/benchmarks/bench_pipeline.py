@@ -0,0 +1,311 @@
+"""
+End-to-end benchmark of the ingest pipeline.
+
+Exercises /upload-multiple/, run_model_on_images, fully_dynamic_nms,
+/backfill-detections/ and /export-session-csv/ on synthetic aerial frames at
+several resolutions, with an in-memory GCS (benchmarks.fake_gcs), a mongomock
+user store (benchmarks.fake_mongo) and, by default, the stub model with real
+annotation/rendition rendering (benchmarks.stubs). Routes run in-process
+through httpx's ASGI transport with telemetry enabled, so every scenario
+reports its per-stage breakdown from the span histograms.
+
+Each scenario reports images/s, p50/p95/p99 latency, peak RSS and per-stage
+totals. Write the report with --output and compare two commits with
+--compare (exits non-zero when a metric regresses beyond --tolerance).
+
+Run from backend/:
+    python -m benchmarks.bench_pipeline --resolutions 1280x720 1920x1080 3840x2160 --output base.json
+    python -m benchmarks.bench_pipeline --compare base.json
+    python -m benchmarks.bench_pipeline --model real     # needs torch and the weights
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import time
+
+import cv2
+import httpx
+import numpy as np
+import psutil
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from benchmarks.bench_db import percentile
+from benchmarks.fake_gcs import install_fake_gcs
+from benchmarks.fake_mongo import install_fake_mongo
+from benchmarks.stubs import install_model_stub
+from core import telemetry
+from core.telemetry import STAGE_SECONDS
+
+PASSWORD = "bench-secret"
+
+
+def synthetic_aerial(width: int, height: int, seed: int, animals: int = 4) -> bytes:
+    """
+    JPEG of open water (low-frequency blue-green texture with surface noise)
+    with a few grey-brown elongated blobs standing in for dugongs.
+    """
+    rng = np.random.default_rng(seed)
+    coarse = rng.random((max(2, height // 64), max(2, width // 64), 1)).astype(np.float32)
+    water = cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)[..., None]
+    base = np.array([110, 95, 30], dtype=np.float32)   # BGR sea green
+    img = base + water * np.array([60, 50, 20], dtype=np.float32)
+    img += rng.normal(0, 6, (height, width, 1)).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    scale = min(width, height) / 1080
+    for _ in range(animals):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        axes = (int(40 * scale) + 4, int(14 * scale) + 2)
+        cv2.ellipse(img, center, axes, float(rng.integers(0, 180)), 0, 360, (95, 110, 125), -1)
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def stage_breakdown() -> dict:
+    return {
+        labels[0]: {"total_ms": round(total * 1000, 1), "count": count, "mean_ms": round(total / count * 1000, 2)}
+        for labels, (total, count) in sorted(STAGE_SECONDS.totals().items())
+    }
+
+
+def summarize(latencies: list, images: int, elapsed: float) -> dict:
+    return {
+        "calls": len(latencies),
+        "images": images,
+        "images_per_s": round(images / elapsed, 2) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class Scenario:
+    """Collects latencies, the stage breakdown and memory for one scenario."""
+
+    def __init__(self, report: dict, name: str):
+        self.report = report
+        self.name = name
+        self.latencies = []
+        self.images = 0
+
+    def __enter__(self):
+        STAGE_SECONDS.reset()
+        self.start = time.perf_counter()
+        return self
+
+    def record(self, seconds: float, images: int):
+        self.latencies.append(seconds)
+        self.images += images
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.latencies:
+            entry = summarize(self.latencies, self.images, time.perf_counter() - self.start)
+            entry["peak_rss_mb"] = peak_rss_mb()
+            entry["rss_mb"] = round(psutil.Process().memory_info().rss / 2**20, 1)
+            entry["stages"] = stage_breakdown()
+            self.report[self.name] = entry
+        return False
+
+
+def build_app(args):
+    telemetry.configure(enabled=True, otlp_endpoint="")
+    bucket = install_fake_gcs(latency=args.gcs_latency)
+    mongo = install_fake_mongo(latency=args.db_latency)
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(PASSWORD)
+    mongo["DugongMonitoring"]["users"].insert_many([
+        {"email": f"bench{i}@example.com", "hashed_password": hashed, "session_id": f"bench-session-{i}"}
+        for i in range(args.sessions * len(args.resolutions) * 2)
+    ])
+    if args.model == "stub":
+        install_model_stub(args.compute, render=True)
+
+    # Fixed, so every worker of a multi-worker run accepts the others' tokens
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    from api.routes import router as api_router
+    from auth.login import router as login_router
+
+    app = FastAPI()
+    app.add_middleware(telemetry.TelemetryMiddleware)
+    app.include_router(api_router, prefix="/api")
+    app.include_router(login_router, prefix="/api")
+    return app, bucket
+
+
+async def login(client, user: int) -> tuple:
+    resp = await client.post("/api/auth/login", json={"email": f"bench{user}@example.com", "password": PASSWORD})
+    resp.raise_for_status()
+    body = resp.json()
+    return body["session_id"], {"Authorization": f"Bearer {body['access_token']}"}
+
+
+async def bench_upload_and_export(client, report, label, frames, args, first_user):
+    sessions = []
+    with Scenario(report, f"upload_multiple[{label}]") as scenario:
+        for s in range(args.sessions):
+            session_id, headers = await login(client, first_user + s)
+            for i in range(0, len(frames), args.batch_size):
+                files = [
+                    ("files", (f"frame_{s}_{i + j:04d}.jpg", data, "image/jpeg"))
+                    for j, data in enumerate(frames[i:i + args.batch_size])
+                ]
+                start = time.perf_counter()
+                resp = await client.post("/api/upload-multiple/", files=files,
+                                         data={"session_id": session_id}, headers=headers)
+                resp.raise_for_status()
+                scenario.record(time.perf_counter() - start, len(files))
+            sessions.append((session_id, headers))
+
+    with Scenario(report, f"export_session_csv[{label}]") as scenario:
+        for _ in range(args.repeat):
+            for session_id, headers in sessions:
+                start = time.perf_counter()
+                resp = await client.get(f"/api/export-session-csv/{session_id}", headers=headers)
+                resp.raise_for_status()
+                scenario.record(time.perf_counter() - start, len(frames))
+
+
+async def bench_backfill(client, bucket, report, label, frames, args, first_user):
+    with Scenario(report, f"backfill_detections[{label}]") as scenario:
+        for s in range(args.sessions):
+            session_id, headers = await login(client, first_user + s)
+            for i, data in enumerate(frames):
+                bucket.objects[f"{session_id}/images/frame_{i:04d}.jpg"] = (data, 1, "image/jpeg")
+            start = time.perf_counter()
+            resp = await client.post(f"/api/backfill-detections/{session_id}",
+                                     params={"batch_size": args.batch_size}, headers=headers)
+            resp.raise_for_status()
+            scenario.record(time.perf_counter() - start, resp.json()["processed_count"])
+
+
+def bench_model(report, label, frames, args):
+    from services.image_prefetch import decode_image_bytes
+    from services.model_service import run_model_on_images
+
+    decoded = [(f"frame_{i:04d}.jpg", decode_image_bytes(data)) for i, data in enumerate(frames)]
+    with Scenario(report, f"run_model_on_images[{label}]") as scenario:
+        for _ in range(args.repeat):
+            for i in range(0, len(decoded), args.batch_size):
+                batch = decoded[i:i + args.batch_size]
+                start = time.perf_counter()
+                run_model_on_images(batch, "bench-model")
+                scenario.record(time.perf_counter() - start, len(batch))
+
+
+def bench_nms(report, label, width, height, args):
+    import torch
+    from ultralytics.engine.results import Results
+    from services.model_service import fully_dynamic_nms
+
+    rng = np.random.default_rng(1)
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+
+    def make_results(n_boxes):
+        xy = rng.random((n_boxes, 2)) * [width, height]
+        wh = rng.uniform(10, 120, (n_boxes, 2))
+        data = np.column_stack([xy, xy + wh, rng.uniform(0.3, 1, n_boxes), rng.integers(0, 2, n_boxes)])
+        return Results(img, path="bench.jpg", names={0: "dugong", 1: "calf"},
+                       boxes=torch.tensor(data, dtype=torch.float32))
+
+    with Scenario(report, f"fully_dynamic_nms[{label}]") as scenario:
+        for _ in range(args.repeat):
+            preds = [make_results(args.nms_boxes) for _ in range(args.batch_size)]
+            start = time.perf_counter()
+            fully_dynamic_nms(preds)
+            scenario.record(time.perf_counter() - start, len(preds))
+
+
+async def run(args) -> dict:
+    app, bucket = build_app(args)
+    scenarios = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for index, resolution in enumerate(args.resolutions):
+            width, height = map(int, resolution.lower().split("x"))
+            frames = [synthetic_aerial(width, height, seed=i) for i in range(args.images)]
+            first_user = index * args.sessions * 2
+            await bench_upload_and_export(client, scenarios, resolution, frames, args, first_user)
+            await bench_backfill(client, bucket, scenarios, resolution, frames, args, first_user + args.sessions)
+            bench_model(scenarios, resolution, frames, args)
+            if args.model == "real":
+                bench_nms(scenarios, resolution, width, height, args)
+    return scenarios
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return "unknown"
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Metrics that got worse than the baseline by more than `tolerance` (fraction).
+    """
+    regressions = []
+    for name, entry in current["scenarios"].items():
+        base = baseline["scenarios"].get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in (("images_per_s", True), ("p95_ms", False), ("peak_rss_mb", False)):
+            old, new = base.get(metric), entry.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({"scenario": name, "metric": metric, "baseline": old,
+                                    "current": new, "change_pct": round(change * 100, 1)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", nargs="+", default=["1280x720", "1920x1080", "3840x2160"])
+    parser.add_argument("--images", type=int, default=8, help="frames per session")
+    parser.add_argument("--sessions", type=int, default=2, help="sessions per resolution and scenario")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of the direct-call scenarios")
+    parser.add_argument("--model", choices=["stub", "real"], default="stub")
+    parser.add_argument("--compute", type=float, default=0.02, help="stub model seconds per image")
+    parser.add_argument("--nms-boxes", type=int, default=300, help="raw boxes per image for the NMS scenario")
+    parser.add_argument("--gcs-latency", type=float, default=0.005, help="simulated storage round trip (s)")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="simulated Mongo round trip (s)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed regression (fraction)")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": psutil.cpu_count(),
+            "args": vars(args),
+        },
+        "scenarios": asyncio.run(run(args)),
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    if report.get("regressions"):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
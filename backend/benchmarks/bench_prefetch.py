@@ -0,0 +1,92 @@
+"""
+Benchmark: overlap of storage I/O and model compute in the prefetch pipeline.
+
+Compares a serial download -> decode -> infer loop against
+services.image_prefetch.iter_prefetched_batches, using a local fake storage
+server with injected latency and a sleep-based stand-in for model compute
+(torch releases the GIL during inference, as sleep does).
+
+Run from backend/:
+    python -m benchmarks.bench_prefetch --images 48 --latency 0.05 --compute 0.04
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.fake_storage import FakeStorageServer
+from services.image_prefetch import decode_image_bytes, iter_prefetched_batches
+
+
+def make_images(store: FakeStorageServer, count: int, width: int, height: int) -> list:
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode(".jpg", img)
+        path = f"bench-session/images/frame_{i:05d}.jpg"
+        store.objects[path] = encoded.tobytes()
+        paths.append(path)
+    return paths
+
+
+def fake_infer(batch: list, compute_per_image: float):
+    time.sleep(compute_per_image * len(batch))
+
+
+def run_serial(store, paths, batch_size, compute):
+    io_time = 0.0
+    start = time.perf_counter()
+    for i in range(0, len(paths), batch_size):
+        t0 = time.perf_counter()
+        batch = [decode_image_bytes(store.fetch(p)) for p in paths[i:i + batch_size]]
+        io_time += time.perf_counter() - t0
+        fake_infer(batch, compute)
+    return time.perf_counter() - start, io_time
+
+
+def run_pipelined(store, paths, batch_size, compute, workers, max_mb):
+    start = time.perf_counter()
+    for batch in iter_prefetched_batches(
+        paths, batch_size, fetch=store.fetch, workers=workers, max_bytes=max_mb * 1024 * 1024
+    ):
+        fake_infer(batch, compute)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=48)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per storage request")
+    parser.add_argument("--compute", type=float, default=0.04, help="model seconds per image")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-mb", type=int, default=512)
+    args = parser.parse_args()
+
+    with FakeStorageServer(latency=args.latency) as store:
+        paths = make_images(store, args.images, args.width, args.height)
+        serial_s, io_s = run_serial(store, paths, args.batch_size, args.compute)
+        pipelined_s = run_pipelined(store, paths, args.batch_size, args.compute, args.workers, args.max_mb)
+
+    compute_s = args.compute * args.images
+    report = {
+        "images": args.images,
+        "serial_s": round(serial_s, 3),
+        "pipelined_s": round(pipelined_s, 3),
+        "serial_io_s": round(io_s, 3),
+        "compute_s": round(compute_s, 3),
+        "speedup": round(serial_s / pipelined_s, 2),
+        # 1.0 means I/O was fully hidden behind compute (or vice versa)
+        "overlap": round(min(1.0, (serial_s - pipelined_s) / min(io_s, compute_s)), 2),
+        "images_per_s": round(args.images / pipelined_s, 2),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
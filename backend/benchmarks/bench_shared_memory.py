@@ -0,0 +1,182 @@
+"""
+Per-process memory of memory-mapped vs. read model weights, and cost of
+handing decoded frames to the inference server through shared memory vs.
+pickling them over its socket.
+
+weights   --processes N processes each load the fused detection model through
+          services.model_registry (WEIGHTS_MMAP=true and =false) and run one
+          dummy prediction, then stay alive while their RSS, PSS (shared
+          pages split between the processes mapping them) and USS (pages
+          private to the process) are read. With mmap the weights are page
+          cache shared by all of them, so USS per process drops by about the
+          size of the checkpoint. Uses --weights, or builds a randomly
+          initialised model from --arch when no weights are given.
+
+handoff   batches of --batch-size synthetic frames go through an
+          InferenceClient to a stub inference server (benchmarks.load_app
+          --inference-server, no compute, no rendering), with shared memory
+          and with pickling; reports the median round trip per batch.
+
+Run from backend/:
+    python -m benchmarks.bench_shared_memory --processes 1 2 4 --arch yolov8m.yaml
+    python -m benchmarks.bench_shared_memory --weights ../model/MLmodel.pt
+    python -m benchmarks.bench_shared_memory --skip-weights --resolution 3840x2160
+"""
+import argparse
+import json
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import psutil
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from services.image_prefetch import decode_image_bytes
+
+
+def child_load(weights: str):
+    """Runs in each subprocess: load, predict once, report ready, then idle."""
+    import numpy as np
+    from services.model_registry import load_fused
+
+    model = load_fused(Path(weights))
+    model.predict([np.zeros((640, 640, 3), dtype=np.uint8)], verbose=False)
+    print("loaded", flush=True)
+    sys.stdin.read()
+
+
+def build_weights(arch: str, workdir: str) -> str:
+    from ultralytics import YOLO
+
+    path = os.path.join(workdir, Path(arch).stem + ".pt")
+    YOLO(arch).save(path)
+    return path
+
+
+def bench_weights(weights: str, processes: int, mmap: bool) -> dict:
+    env = dict(os.environ, WEIGHTS_MMAP=str(mmap).lower(), LOG_TO_STDERR="false")
+    procs = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.bench_shared_memory", "--child-load", weights],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True)
+        for _ in range(processes)
+    ]
+    try:
+        for proc in procs:
+            # ultralytics prints model summaries to stdout before "loaded"
+            for line in proc.stdout:
+                if line.strip() == "loaded":
+                    break
+            else:
+                raise RuntimeError("weights loader exited early")
+        infos = [psutil.Process(proc.pid).memory_full_info() for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+    mb = 2**20
+    return {
+        "mmap": mmap,
+        "processes": processes,
+        "rss_mb_per_process": round(statistics.fmean(i.rss for i in infos) / mb, 1),
+        "uss_mb_per_process": round(statistics.fmean(i.uss for i in infos) / mb, 1),
+        "pss_mb_total": round(sum(i.pss for i in infos) / mb, 1),
+    }
+
+
+def bench_handoff(args, frames: list) -> list:
+    from services.inference_client import InferenceClient
+
+    workdir = tempfile.mkdtemp(prefix="dugong-shm-")
+    socket_path = os.path.join(workdir, "inference.sock")
+    authkey = secrets.token_hex(32)
+    env = dict(os.environ, LOG_TO_STDERR="false", INFERENCE_AUTHKEY=authkey)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_app", "--inference-server", socket_path,
+         "--compute", "0", "--gcs-latency", "0", "--no-render"], env=env
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while not os.path.exists(socket_path):
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("inference server did not start")
+            time.sleep(0.1)
+
+        batch = [(f"frame_{i}.jpg", frames[i % len(frames)]) for i in range(args.batch_size)]
+        batch_mb = sum(a.nbytes for _, a in batch) / 2**20
+        results = []
+        for shared in (True, False):
+            client = InferenceClient(socket_path, authkey.encode(), shared_memory=shared)
+            client.run_model_on_images(batch, "bench")  # connect and warm up
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                client.run_model_on_images(batch, "bench")
+                times.append(time.perf_counter() - start)
+            client.close()
+            median = statistics.median(times)
+            results.append({
+                "transport": "shared_memory" if shared else "pickle",
+                "batch_mb": round(batch_mb, 1),
+                "median_ms": round(median * 1000, 2),
+                "throughput_mb_s": round(batch_mb / median, 1),
+                "server_rss_mb": round(psutil.Process(server.pid).memory_info().rss / 2**20, 1),
+            })
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--weights", help="detection weights (.pt); default builds one from --arch")
+    parser.add_argument("--arch", default="yolov8m.yaml", help="ultralytics model config for built weights")
+    parser.add_argument("--skip-weights", action="store_true")
+    parser.add_argument("--resolution", default="1920x1080")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--child-load", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_load:
+        child_load(args.child_load)
+        return
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)}}
+    if not args.skip_weights:
+        with tempfile.TemporaryDirectory(prefix="dugong-weights-") as workdir:
+            weights = args.weights
+            if weights is None:
+                weights = build_weights(args.arch, workdir)
+            else:
+                # Fused copies are written next to the weights; keep them out of the model dir
+                weights = os.path.join(workdir, Path(weights).name)
+                os.symlink(os.path.abspath(args.weights), weights)
+            # The first load fuses and caches the checkpoint; measure steady state
+            bench_weights(weights, 1, True)
+            report["weights"] = [
+                bench_weights(weights, n, mmap) for mmap in (False, True) for n in args.processes
+            ]
+            for entry in report["weights"]:
+                print(json.dumps(entry), file=sys.stderr)
+
+    width, height = map(int, args.resolution.lower().split("x"))
+    frames = [decode_image_bytes(synthetic_aerial(width, height, seed=i)) for i in range(2)]
+    report["handoff"] = bench_handoff(args, frames)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Cost of keeping the signed URLs in session metadata valid on status reads
+(services.signed_url_service), at --files records per session.
+
+URLs are signed for real (V4, RSA-SHA256 with a generated service-account
+key, as the GCS client does locally), so signing costs what it would in
+production; storage is the fake bucket with --gcs-latency per request.
+
+Scenarios, each on freshly seeded metadata:
+    fresh        every record valid for hours: nothing is signed
+    near_expiry  every record lapses within SIGNED_URL_REFRESH_MINUTES but
+                 not SIGNED_URL_MIN_TTL_MINUTES: answered as is, re-signed
+                 and written back in the background
+    expired      every record has lapsed (a stale session): the first
+                 SIGNED_URL_INLINE_MAX_RECORDS are re-signed before
+                 answering, the rest reported pending and re-signed with the
+                 write-back in the background; the next read signs nothing
+    expired_uncapped
+                 the same read re-signing every lapsed record inline (the
+                 behaviour without the cap), inline half only
+    naive        re-signing every URL on every read, the alternative
+
+Reported: inline_ms (the refresh inside the request), inline_signed and
+inline_pending (records left to the background), background_ms and
+background_signed (the write-back job), poll_ms and poll_pending (the whole
+/session-status/ call including its background job, as the test client
+waits for it) and next_poll_ms and next_poll_pending (the read after it).
+
+Run from backend/:
+    python -m benchmarks.bench_signed_urls --files 1000 10000
+"""
+import argparse
+import copy
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import psutil
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_pipeline import git_commit
+from benchmarks.fake_gcs import FakeBlob
+from benchmarks.load_app import PASSWORD, create_app
+
+SESSION_ID = "load-session-0"
+
+
+def install_real_signing():
+    """Make the fake bucket's signed URLs real V4 signatures from a throwaway key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from google.cloud.storage._signing import generate_signed_url_v4
+    from google.oauth2 import service_account
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    credentials = service_account.Credentials.from_service_account_info({
+        "type": "service_account",
+        "client_email": "bench@example.iam.gserviceaccount.com",
+        "private_key": key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                         serialization.NoEncryption()).decode(),
+        "private_key_id": "bench",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "project_id": "bench"
+    })
+
+    def generate_signed_url(self, version="v4", expiration=timedelta(hours=1), method="GET", **kwargs):
+        self.bucket.signed_urls += 1
+        return generate_signed_url_v4(credentials, f"/{self.bucket.name}/{quote(self.name)}",
+                                      expiration=expiration, method=method)
+
+    FakeBlob.generate_signed_url = generate_signed_url
+
+
+def seed_metadata(files: int, expires_at: datetime) -> dict:
+    signature = "&X-Goog-Algorithm=GOOG4-RSA-SHA256&X-Goog-Date=20240501T000000Z&X-Goog-Expires=86400" \
+                "&X-Goog-SignedHeaders=host&X-Goog-Signature=" + "0" * 512
+    records = []
+    for i in range(files):
+        stem = f"DJI_{i:05d}"
+        url = lambda path: f"https://storage.googleapis.com/dugongstorage/{SESSION_ID}/{path}?{signature}"
+        records.append({
+            "filename": f"{stem}.JPG",
+            "imageUrl": url(f"results/{stem}.JPG"),
+            "previewUrl": url(f"previews/{stem}.jpg"),
+            "thumbnailUrl": url(f"renditions/{stem}.JPG/thumb.webp"),
+            "labelUrl": url(f"labels/{stem}.txt"),
+            "annotated": True,
+            "dugongCount": 1,
+            "calfCount": 0,
+            "totalCount": 1,
+            "imageClass": "resting",
+            "createdAt": (expires_at - timedelta(hours=24)).isoformat(),
+            "urlsExpireAt": expires_at.isoformat(timespec="seconds")
+        })
+    now = datetime.utcnow().isoformat()
+    return {"session_id": SESSION_ID, "created_at": now, "last_activity": now, "files": records,
+            "file_count": len(records)}
+
+
+def run_scenario(name: str, files: int, expires_at: datetime, client, headers, bucket,
+                 max_records: int = None) -> dict:
+    """Both halves on their own, then the endpoint; only the inline half when `max_records` is given."""
+    from core.config import SIGNED_URL_INLINE_MAX_RECORDS
+    from services.GCS_service import GCSService
+    from services.signed_url_service import persist_refreshed_urls, refresh_session_urls
+
+    metadata_path = f"{SESSION_ID}/session_metadata.json"
+    seeded = seed_metadata(files, expires_at)
+
+    # The two halves on their own
+    GCSService.upload_json(metadata_path, seeded)
+    metadata = copy.deepcopy(seeded)
+    signed = bucket.signed_urls
+    start = time.perf_counter()
+    refresh = refresh_session_urls(metadata, max_records or SIGNED_URL_INLINE_MAX_RECORDS)
+    inline_ms = (time.perf_counter() - start) * 1000
+    inline_signed = bucket.signed_urls - signed
+    entry = {
+        "files": files,
+        "scenario": name,
+        "inline_ms": round(inline_ms, 1),
+        "inline_signed": inline_signed,
+        "inline_pending": refresh["pending"],
+    }
+    if max_records:
+        return entry
+    signed = bucket.signed_urls
+    start = time.perf_counter()
+    # Scheduled only when something is due, as /session-status/ does
+    if refresh["resigned"] or refresh["prewarm"]:
+        persist_refreshed_urls(SESSION_ID, refresh["resigned"])
+    background_ms = (time.perf_counter() - start) * 1000
+    background_signed = bucket.signed_urls - signed
+
+    # The endpoint, twice
+    GCSService.upload_json(metadata_path, seeded)
+    polls = []
+    for _ in range(2):
+        start = time.perf_counter()
+        response = client.get(f"/api/session-status/{SESSION_ID}", headers=headers)
+        polls.append(((time.perf_counter() - start) * 1000, response.json().get("urlsPending")))
+        assert response.status_code == 200 and len(response.json()["files"]) == files, response.text
+    entry.update({
+        "background_ms": round(background_ms, 1),
+        "background_signed": background_signed,
+        "poll_ms": round(polls[0][0], 1),
+        "poll_pending": polls[0][1],
+        "next_poll_ms": round(polls[1][0], 1),
+        "next_poll_pending": polls[1][1],
+    })
+    return entry
+
+
+def run_naive(files: int, bucket) -> dict:
+    import numpy as np
+
+    from services.signed_url_service import resign_records
+
+    metadata = seed_metadata(files, datetime.utcnow() + timedelta(hours=12))
+    signed = bucket.signed_urls
+    start = time.perf_counter()
+    resign_records(metadata["files"], np.arange(files))
+    return {
+        "files": files,
+        "scenario": "naive",
+        "inline_ms": round((time.perf_counter() - start) * 1000, 1),
+        "inline_signed": bucket.signed_urls - signed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--gcs-latency", type=float, default=0.02, help="fake storage latency per request")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    from core.config import SIGNED_URL_MIN_TTL_MINUTES, SIGNED_URL_REFRESH_MINUTES
+
+    app = create_app(users=1, gcs_latency=args.gcs_latency, db_latency=0.0)
+    install_real_signing()
+    from services.GCS_service import GCSService
+
+    bucket = GCSService.get_bucket()
+    client = TestClient(app)
+    token = client.post("/api/auth/login", json={"email": "bench0@example.com", "password": PASSWORD}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+    near = (SIGNED_URL_MIN_TTL_MINUTES + SIGNED_URL_REFRESH_MINUTES) / 2
+    runs = []
+    for files in args.files:
+        now = datetime.utcnow()
+        for name, expires_at in (("fresh", now + timedelta(hours=12)),
+                                 ("near_expiry", now + timedelta(minutes=near)),
+                                 ("expired", now - timedelta(hours=1))):
+            runs.append(run_scenario(name, files, expires_at, client, headers, bucket))
+            print(json.dumps(runs[-1]), file=sys.stderr)
+        runs.append(run_scenario("expired_uncapped", files, now - timedelta(hours=1), client, headers, bucket,
+                                 max_records=files))
+        print(json.dumps(runs[-1]), file=sys.stderr)
+        runs.append(run_naive(files, bucket))
+        print(json.dumps(runs[-1]), file=sys.stderr)
+
+    report = {"meta": {"commit": git_commit(), "cpus": psutil.cpu_count(), "args": vars(args)}, "runs": runs}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: cost of the tracing instrumentation and a check of span export.
+
+1. Per-span overhead with telemetry disabled, enabled, and enabled with OTLP
+   export to a local collector stand-in.
+2. A traced backfill-shaped pipeline (prefetch download/decode from fake
+   storage, then annotate on the render pool) under one root span; reports
+   the stages received by the collector, whether they all share the root's
+   trace, and the resulting /metrics histogram lines.
+
+Run from backend/:
+    python -m benchmarks.bench_tracing --spans 200000 --images 16
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks.bench_prefetch import make_images
+from benchmarks.fake_otlp import FakeCollector
+from benchmarks.fake_storage import FakeStorageServer
+from core import telemetry
+from core.telemetry import STAGE_SECONDS, render_metrics, span
+from services.image_prefetch import iter_prefetched_batches
+from services.render_service import submit_render
+
+
+def span_overhead_ns(count: int) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        with span("bench"):
+            pass
+    return (time.perf_counter_ns() - start) / count
+
+
+def traced_pipeline(store, paths, batch_size):
+    with span("backfill", images=len(paths)) as root:
+        for batch in iter_prefetched_batches(paths, batch_size, fetch=store.fetch):
+            boxes = np.array([[10, 10, 60, 60]], dtype=np.float32)
+            futures = [submit_render(img, boxes, np.array([0])) for _, img in batch]
+            for future in futures:
+                future.result()
+    return root.trace_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spans", type=int, default=200000)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    report = {}
+    with FakeCollector() as collector:
+        telemetry.configure(enabled=False, otlp_endpoint="")
+        report["span_ns_disabled"] = round(span_overhead_ns(args.spans), 1)
+        telemetry.configure(enabled=True, otlp_endpoint="")
+        report["span_ns_enabled"] = round(span_overhead_ns(args.spans), 1)
+        telemetry.configure(enabled=True, otlp_endpoint=collector.url)
+        report["span_ns_enabled_export"] = round(span_overhead_ns(args.spans // 10), 1)
+        telemetry.shutdown()
+
+        collector.spans.clear()
+        STAGE_SECONDS.reset()
+        telemetry.configure(enabled=True, otlp_endpoint=collector.url)
+        with FakeStorageServer(latency=0.01) as store:
+            paths = make_images(store, args.images, 1280, 720)
+            trace_id = traced_pipeline(store, paths, args.batch_size)
+        telemetry.shutdown()
+
+    stages = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+    for s in collector.spans:
+        entry = stages[s["name"]]
+        entry["count"] += 1
+        entry["total_ms"] += (int(s["endTimeUnixNano"]) - int(s["startTimeUnixNano"])) / 1e6
+    report["exported_stages"] = {k: {"count": v["count"], "total_ms": round(v["total_ms"], 1)} for k, v in stages.items()}
+    report["single_trace"] = all(s["traceId"] == trace_id for s in collector.spans)
+    report["metrics_sample"] = [
+        line for line in render_metrics().splitlines() if line.startswith("dugong_stage_duration_seconds_count")
+    ]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Memory and throughput of the serving topologies at several API worker counts.
+
+For each worker count (--workers) and topology (--topologies) the stub app
+(benchmarks.load_app) is started under `uvicorn --workers N` with a fake
+bucket shared through a temporary directory, and --concurrency virtual users
+run the benchmarks.loadtest mix against it for --step-seconds:
+
+    in-process        every worker loads its own copy of the model
+    inference-server  one extra process holds the model; workers call it
+                      over a Unix socket (services.inference_server)
+
+The stub model holds --weights-mb of resident memory once loaded, standing
+in for the weights, so the RSS columns show how the model is duplicated per
+worker. Reported per run: throughput, p95, error rate, and the peak total
+RSS and USS (memory unique to each process) of all server processes,
+sampled during the run.
+
+Run from backend/:
+    python -m benchmarks.bench_workers --workers 1 2 4 8 --concurrency 16 --weights-mb 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import psutil
+
+from benchmarks.bench_pipeline import git_commit, synthetic_aerial
+from benchmarks.loadtest import free_port, parse_mix, run_level
+
+TOPOLOGIES = ("in-process", "inference-server")
+
+
+class MemorySampler:
+    """
+    Peak total RSS/USS over a set of process trees, sampled on a thread.
+    """
+
+    def __init__(self, pids: list, interval: float = 0.5):
+        self.roots = [psutil.Process(pid) for pid in pids]
+        self.interval = interval
+        self.peak = {"rss_mb": 0.0, "uss_mb": 0.0, "processes": 0}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def sample(self) -> dict:
+        rss = uss = count = 0
+        for root in self.roots:
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    info = proc.memory_full_info()
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+                rss += info.rss
+                uss += info.uss
+                count += 1
+        return {"rss_mb": round(rss / 2**20, 1), "uss_mb": round(uss / 2**20, 1), "processes": count}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            current = self.sample()
+            if current["rss_mb"] > self.peak["rss_mb"]:
+                self.peak = current
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def wait_until(check, proc_list, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return
+        if any(proc.poll() is not None for proc in proc_list):
+            raise RuntimeError("a server process exited during startup")
+        time.sleep(0.2)
+    raise RuntimeError("server did not start in time")
+
+
+def start_topology(topology: str, workers: int, args, workdir: str) -> tuple:
+    bucket_dir = os.path.join(workdir, "bucket")
+    config = {"users": args.concurrency + 1, "gcs_latency": args.gcs_latency, "compute": args.compute,
+              "bucket_dir": bucket_dir, "weights_mb": args.weights_mb}
+    env = dict(os.environ, LOAD_APP_CONFIG=json.dumps(config), WARMUP_ENABLED="false", LOG_TO_STDERR="false")
+    env.pop("INFERENCE_SOCKET", None)
+    procs = []
+
+    if topology == "inference-server":
+        socket_path = os.path.join(workdir, "inference.sock")
+        env["INFERENCE_SOCKET"] = socket_path
+        env["INFERENCE_AUTHKEY"] = secrets.token_hex(32)
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_app", "--inference-server", socket_path,
+             "--gcs-latency", str(args.gcs_latency), "--compute", str(args.compute),
+             "--bucket-dir", bucket_dir, "--weights-mb", str(args.weights_mb)],
+            env=env
+        ))
+        wait_until(lambda: os.path.exists(socket_path), procs)
+
+    port = free_port()
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.load_app:app_from_env", "--factory",
+         "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+         "--loop", "asyncio", "--http", "h11", "--log-level", "warning"],
+        env=env
+    ))
+    url = f"http://127.0.0.1:{port}"
+
+    def app_ready():
+        try:
+            return httpx.get(f"{url}/loadtest/time", timeout=1).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    wait_until(app_ready, procs, timeout=120)
+    # Every worker builds its app on start; give the slower ones a moment
+    time.sleep(min(10.0, 0.5 * workers))
+    return procs, url
+
+
+def stop(procs: list):
+    for proc in reversed(procs):
+        proc.terminate()
+    for proc in procs:
+        try:
+            proc.wait(timeout=20)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+async def drive(url: str, frames: list, weights: dict, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        return await run_level(client, args.concurrency, 0, frames, weights, args)
+
+
+def run_one(topology: str, workers: int, frames: list, weights: dict, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="dugong-workers-")
+    procs = []
+    try:
+        procs, url = start_topology(topology, workers, args, workdir)
+        with MemorySampler([proc.pid for proc in procs]) as memory:
+            step = asyncio.run(drive(url, frames, weights, args))
+            final = memory.sample()
+        peak = memory.peak if memory.peak["rss_mb"] >= final["rss_mb"] else final
+    finally:
+        stop(procs)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "topology": topology,
+        "workers": workers,
+        "throughput_rps": step["throughput_rps"],
+        "p95_ms": step["p95_ms"],
+        "error_rate": step["error_rate"],
+        "actions": step["actions"],
+        "peak_rss_mb": peak["rss_mb"],
+        "peak_uss_mb": peak["uss_mb"],
+        "processes": peak["processes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--topologies", nargs="+", choices=TOPOLOGIES, default=list(TOPOLOGIES))
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual users per run")
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--mix", nargs="+", default=["upload=1", "status=6", "export=1"])
+    parser.add_argument("--batch-size", type=int, default=2, help="frames per upload")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--compute", type=float, default=0.02, help="stub model seconds per image")
+    parser.add_argument("--gcs-latency", type=float, default=0.005, help="fake storage latency")
+    parser.add_argument("--weights-mb", type=int, default=200, help="resident memory of one model copy")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    weights = {k: v for k, v in args.mix.items() if v > 0}
+    width, height = map(int, args.resolution.lower().split("x"))
+    frames = [synthetic_aerial(width, height, seed=i) for i in range(4)]
+
+    runs = []
+    for topology in args.topologies:
+        for workers in args.workers:
+            runs.append(run_one(topology, workers, frames, weights, args))
+            print(json.dumps({k: runs[-1][k] for k in ("topology", "workers", "throughput_rps", "p95_ms",
+                                                        "error_rate", "peak_rss_mb", "peak_uss_mb")}),
+                  file=sys.stderr)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "cpus": psutil.cpu_count(),
+            "args": vars(args),
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
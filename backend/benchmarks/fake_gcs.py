@@ -0,0 +1,242 @@
+"""
+In-process stand-in for the google-cloud-storage bucket API used by
+services.GCS_service and the services built on it.
+
+Objects live in a dict with per-object generations, so generation-matched
+writes behave as on GCS (PreconditionFailed on a stale generation). Every
+call sleeps `latency` seconds to model a storage round trip; sleeping
+releases the GIL as a network call would.
+
+With `root` set, objects are files in that directory instead, so several
+processes (multi-worker load tests) see one bucket.
+"""
+import fcntl
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections.abc import MutableMapping
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from services.GCS_service import GCSService
+
+
+class FakeBlob:
+    def __init__(self, bucket: "FakeBucket", name: str, generation: Optional[int] = None):
+        self.bucket = bucket
+        self.name = name
+        # Like the GCS client: known once loaded (get_blob, list_blobs) or
+        # uploaded, and not updated by other writers afterwards
+        self._generation = generation
+
+    @property
+    def generation(self) -> Optional[int]:
+        return self._generation
+
+    @property
+    def size(self) -> Optional[int]:
+        entry = self.bucket.objects.get(self.name)
+        return len(entry[0]) if entry else None
+
+    def exists(self) -> bool:
+        self.bucket._round_trip()
+        return self.name in self.bucket.objects
+
+    def upload_from_string(self, data, content_type: str = None, if_generation_match: int = None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._generation = self.bucket._put(self.name, bytes(data), content_type, if_generation_match)
+
+    def upload_from_filename(self, filename: str, content_type: str = None):
+        with open(filename, "rb") as f:
+            self.upload_from_string(f.read(), content_type=content_type)
+
+    def download_as_bytes(self, if_generation_match: int = None, start: int = None, end: int = None) -> bytes:
+        data = self.bucket._get(self.name, if_generation_match)
+        if start is None and end is None:
+            return data
+        # Like GCS, `end` is inclusive
+        return data[start or 0:None if end is None else end + 1]
+
+    def download_to_filename(self, filename: str):
+        with open(filename, "wb") as f:
+            f.write(self.download_as_bytes())
+
+    def delete(self):
+        self.bucket._delete(self.name)
+
+    def generate_signed_url(self, version: str = "v4", expiration=timedelta(hours=1), method: str = "GET",
+                            content_type: str = None, headers: dict = None, **kwargs) -> str:
+        seconds = int(expiration.total_seconds()) if isinstance(expiration, timedelta) else int(expiration)
+        self.bucket.signed_urls += 1
+        query = {"X-Goog-Expires": seconds, "method": method}
+        if content_type:
+            query["content_type"] = content_type
+        for key, value in (headers or {}).items():
+            query[f"header:{key.lower()}"] = value
+        return f"https://fake-gcs.local/{self.bucket.name}/{quote(self.name)}?{urlencode(query)}"
+
+
+class _DirectoryObjects(MutableMapping):
+    """
+    The bucket's name -> (data, generation, content_type) mapping stored as
+    one pickle file per object, written atomically.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, quote(name, safe=""))
+
+    def __getitem__(self, name):
+        try:
+            with open(self._path(name), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, entry):
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f)
+        os.replace(tmp, self._path(name))
+
+    def __delitem__(self, name):
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        return (unquote(entry) for entry in os.listdir(self.root) if not entry.startswith("."))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class _FileLock:
+    """Thread and cross-process lock for read-modify-write on a shared bucket."""
+
+    def __init__(self, path: str):
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+class FakeBucket:
+    def __init__(self, name: str = "fake-bucket", latency: float = 0.0, root: str = None):
+        self.name = name
+        self.latency = latency
+        # name -> (data, generation, content_type)
+        self.objects: Dict[str, Tuple[bytes, int, Optional[str]]] = {}
+        self.requests = 0
+        self.signed_urls = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        if root is not None:
+            self.objects = _DirectoryObjects(root)
+            self._lock = _FileLock(os.path.join(root, ".lock"))
+
+    def _round_trip(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _put(self, name, data, content_type, if_generation_match):
+        self._round_trip()
+        with self._lock:
+            current = self.objects.get(name)
+            if if_generation_match is not None and (current[1] if current else 0) != if_generation_match:
+                raise PreconditionFailed(f"generation mismatch for {name}")
+            # Nanosecond clock generations stay unique across processes
+            self._generation = max(self._generation + 1, time.time_ns())
+            self.objects[name] = (data, self._generation, content_type)
+            return self._generation
+
+    def _get(self, name, if_generation_match=None) -> bytes:
+        self._round_trip()
+        entry = self.objects.get(name)
+        if entry is None:
+            raise NotFound(f"{name} not found")
+        if if_generation_match is not None and entry[1] != if_generation_match:
+            raise PreconditionFailed(f"generation mismatch for {name}")
+        return entry[0]
+
+    def _delete(self, name):
+        self._round_trip()
+        with self._lock:
+            if self.objects.pop(name, None) is None:
+                raise NotFound(f"{name} not found")
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def get_blob(self, name: str) -> Optional[FakeBlob]:
+        self._round_trip()
+        entry = self.objects.get(name)
+        return FakeBlob(self, name, entry[1]) if entry else None
+
+    def list_blobs(self, prefix: str = "", max_results: int = None):
+        self._round_trip()
+        names = [name for name in sorted(self.objects) if name.startswith(prefix)]
+        entries = ((name, self.objects.get(name)) for name in names[:max_results])
+        return [FakeBlob(self, name, entry[1]) for name, entry in entries if entry]
+
+    def upload_via_signed_url(self, url: str, data: bytes, headers: dict) -> FakeBlob:
+        """
+        What the browser does with a resumable-upload URL (start the session
+        with the signed headers, then PUT the bytes). Raises PermissionError
+        where GCS would reject the request.
+        """
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        sent = {key.lower(): value for key, value in headers.items()}
+        if query.get("method") != "RESUMABLE" or sent.get("x-goog-resumable") != "start":
+            raise PermissionError("not a resumable-upload URL or missing x-goog-resumable: start")
+        if "content_type" in query and sent.get("content-type") != query["content_type"]:
+            raise PermissionError("Content-Type differs from the signed one")
+        for key, value in query.items():
+            if key.startswith("header:") and sent.get(key[len("header:"):]) != value:
+                raise PermissionError(f"signed header {key[len('header:'):]} missing")
+        name = unquote(parts.path.split("/", 2)[2])
+        self._put(name, bytes(data), sent.get("content-type"), None)
+        return FakeBlob(self, name)
+
+    def copy_blob(self, blob: FakeBlob, destination_bucket: "FakeBucket", new_name: str) -> FakeBlob:
+        data = self._get(blob.name)
+        content_type = self.objects[blob.name][2]
+        destination_bucket._put(new_name, data, content_type, None)
+        return FakeBlob(destination_bucket, new_name)
+
+
+class FakeClient:
+    def __init__(self, bucket: FakeBucket):
+        self._bucket = bucket
+
+    def bucket(self, name: str) -> FakeBucket:
+        return self._bucket
+
+
+def install_fake_gcs(latency: float = 0.0, root: str = None) -> FakeBucket:
+    """
+    Make GCSService (and everything using GCSService.get_bucket()) use an
+    in-memory bucket, or a directory-backed one shared with other processes
+    when `root` is given.
+    """
+    bucket = FakeBucket(GCSService.BUCKET_NAME, latency, root)
+    GCSService._client = FakeClient(bucket)
+    return bucket
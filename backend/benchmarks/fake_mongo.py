@@ -0,0 +1,77 @@
+"""
+mongomock-backed stand-ins for the shared MongoDB clients in core.database.
+
+mongomock only provides a synchronous API, so the async client is a thin
+adapter that runs the same mongomock calls behind coroutines; both views
+share one in-memory database.
+"""
+import asyncio
+
+import mongomock
+from mongomock.collection import BulkOperationBuilder
+
+from core import database
+
+
+def _accept_update_sort():
+    """
+    pymongo >= 4.11 passes `sort` to bulk_write's UpdateOne, which
+    mongomock's bulk builder does not know; it only matters for updates
+    that match several documents, which the app never relies on.
+    """
+    add_update = BulkOperationBuilder.add_update
+    if getattr(add_update, "_accepts_sort", False):
+        return
+
+    def patched(self, *args, sort=None, **kwargs):
+        return add_update(self, *args, **kwargs)
+
+    patched._accepts_sort = True
+    BulkOperationBuilder.add_update = patched
+
+
+class _AsyncCollection:
+    def __init__(self, collection, latency: float):
+        self._collection = collection
+        self._latency = latency
+
+    async def _call(self, name, *args, **kwargs):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return getattr(self._collection, name)(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+class _AsyncDatabase:
+    def __init__(self, db, latency: float):
+        self._db = db
+        self._latency = latency
+
+    def __getitem__(self, name):
+        return _AsyncCollection(self._db[name], self._latency)
+
+
+class AsyncMongoMockClient:
+    def __init__(self, client: mongomock.MongoClient, latency: float = 0.0):
+        self._client = client
+        self._latency = latency
+
+    def __getitem__(self, name):
+        return _AsyncDatabase(self._client[name], self._latency)
+
+    async def close(self):
+        pass
+
+
+def install_fake_mongo(latency: float = 0.0) -> mongomock.MongoClient:
+    """
+    Point core.database at a fresh in-memory database and return the sync
+    client. `latency` adds a simulated round trip to async calls.
+    """
+    _accept_update_sort()
+    client = mongomock.MongoClient()
+    database.set_clients(client, AsyncMongoMockClient(client, latency))
+    database.init_db()
+    return client
@@ -0,0 +1,55 @@
+"""
+Local stand-in for an OpenTelemetry collector.
+
+Accepts OTLP/HTTP JSON trace exports at /v1/traces and keeps the received
+spans in memory, so span export can be checked without a real collector.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCollector:
+    """
+    OTLP/HTTP receiver at http://127.0.0.1:<port>; use `url` as the
+    OTEL_EXPORTER_OTLP_ENDPOINT.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.requests = 0
+        self._lock = threading.Lock()
+        collector = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with collector._lock:
+                    collector.requests += 1
+                    for resource in body.get("resourceSpans", []):
+                        for scope in resource.get("scopeSpans", []):
+                            collector.spans.extend(scope.get("spans", []))
+                self.send_response(200 if self.path == "/v1/traces" else 404)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
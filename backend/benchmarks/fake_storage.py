@@ -0,0 +1,70 @@
+"""
+Local stand-in for GCS object storage used by the benchmarks.
+
+Serves objects from memory over HTTP with a configurable per-request latency,
+so I/O behaves like a remote bucket without network access or credentials.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.request import urlopen
+
+
+class FakeStorageServer:
+    """
+    In-memory object store reachable at http://127.0.0.1:<port>/<blob_path>.
+
+    Args:
+        latency: Seconds slept before answering each request
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects = {}
+        self.request_count = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.request_count += 1
+                time.sleep(server.latency)
+                data = server.objects.get(self.path.lstrip("/"))
+                if data is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_PUT(self):
+                server.request_count += 1
+                time.sleep(server.latency)
+                length = int(self.headers.get("Content-Length", 0))
+                server.objects[self.path.lstrip("/")] = self.rfile.read(length)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def fetch(self, blob_path: str) -> bytes:
+        """Drop-in replacement for services.image_prefetch.fetch_blob_bytes."""
+        with urlopen(f"{self.url}/{blob_path}") as resp:
+            return resp.read()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
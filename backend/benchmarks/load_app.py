@@ -0,0 +1,180 @@
+"""
+The API with stubbed storage, database and model, served by uvicorn for load
+tests (see benchmarks.loadtest).
+
+GCS is the in-memory fake bucket, users come from mongomock (bench{i}@example.com,
+password "bench-secret", one session each) and the model is the stub. Everything
+else, routes and middleware included, is the real application code.
+
+For multi-worker runs (see benchmarks.bench_workers) the bucket is a shared
+directory, the app is built by `app_from_env` in each uvicorn worker and
+`--inference-server` runs the stub model behind services.inference_server.
+
+Run from backend/:
+    python -m benchmarks.load_app --port 8100 --users 500 --compute 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from fastapi import FastAPI
+from passlib.context import CryptContext
+
+from benchmarks.fake_gcs import install_fake_gcs
+from benchmarks.fake_mongo import install_fake_mongo
+from benchmarks.stubs import install_model_stub
+from core import telemetry
+from core.loop_monitor import LoopMonitorMiddleware, monitor
+
+PASSWORD = "bench-secret"
+
+
+class LoopLagProbe:
+    """
+    Samples event-loop lag: how late a `sleep(interval)` wakes up.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def snapshot(self, reset: bool = False) -> dict:
+        samples, count = sorted(self.samples), len(self.samples)
+        if reset:
+            self.samples = []
+        if not count:
+            return {"samples": 0}
+        return {
+            "samples": count,
+            "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+            "p99_ms": round(samples[min(count - 1, int(0.99 * count))] * 1000, 2),
+            "max_ms": round(samples[-1] * 1000, 2),
+        }
+
+
+def create_app(users: int = 500, gcs_latency: float = 0.005, db_latency: float = 0.001,
+               compute: float = 0.02, render: bool = True, bucket_dir: str = None,
+               weights_mb: int = 0) -> FastAPI:
+    install_fake_gcs(latency=gcs_latency, root=bucket_dir)
+    mongo = install_fake_mongo(latency=db_latency)
+    # Low bcrypt cost: logins are setup here, not what is being measured
+    hashed = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4).hash(PASSWORD)
+    mongo["DugongMonitoring"]["users"].insert_many([
+        {"email": f"bench{i}@example.com", "hashed_password": hashed, "session_id": f"load-session-{i}"}
+        for i in range(users)
+    ])
+    install_model_stub(compute, render=render, weights_mb=weights_mb)
+
+    # Fixed, so every worker of a multi-worker run accepts the others' tokens
+    os.environ.setdefault("SECRET_KEY", "bench-secret-key")
+    from api.routes import router as api_router
+    from auth.login import router as login_router
+
+    app = FastAPI(title="Dugong load-test app")
+    app.add_middleware(telemetry.TelemetryMiddleware)
+    app.add_middleware(LoopMonitorMiddleware, enabled=True)
+    app.include_router(api_router, prefix="/api")
+    app.include_router(login_router, prefix="/api")
+
+    probe = LoopLagProbe()
+    baseline = {}
+
+    @app.on_event("startup")
+    async def start_probe():
+        probe.start()
+        monitor.start()
+
+    @app.on_event("shutdown")
+    async def stop_probe():
+        probe.stop()
+        monitor.stop()
+
+    @app.get("/loadtest/lag")
+    async def loop_lag(reset: bool = False):
+        """
+        Loop lag since the last reset, plus the monitor's stall and threadpool
+        saturation counts by route over the same window.
+        """
+        lag = probe.snapshot(reset)
+        current = monitor.snapshot()
+        for key in ("stalls", "stall_seconds", "threadpool_saturated"):
+            previous = baseline.get(key, {})
+            lag[key] = {
+                route: round(value - previous.get(route, 0), 3)
+                for route, value in current[key].items() if value != previous.get(route, 0)
+            }
+        lag["threadpool"] = current["threadpool"]
+        if reset:
+            baseline.update(current)
+        return lag
+
+    @app.get("/loadtest/time")
+    async def server_time():
+        return {"time": time.time()}
+
+    return app
+
+
+def app_from_env() -> FastAPI:
+    """
+    App factory for `uvicorn --factory --workers N`: create_app's keyword
+    arguments come from the LOAD_APP_CONFIG environment variable (JSON).
+    """
+    return create_app(**json.loads(os.environ.get("LOAD_APP_CONFIG", "{}")))
+
+
+def serve_inference(socket_path: str, gcs_latency: float, compute: float, render: bool,
+                    bucket_dir: str = None, weights_mb: int = 0):
+    from services.inference_server import InferenceServer
+
+    install_fake_gcs(latency=gcs_latency, root=bucket_dir)
+    install_model_stub(compute, render=render, weights_mb=weights_mb)
+    InferenceServer(socket_path).serve_forever()
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--gcs-latency", type=float, default=0.005)
+    parser.add_argument("--db-latency", type=float, default=0.001)
+    parser.add_argument("--compute", type=float, default=0.02, help="stub model seconds per image")
+    parser.add_argument("--no-render", action="store_true", help="skip annotation/rendition rendering")
+    parser.add_argument("--bucket-dir", help="share the fake bucket with other processes through this directory")
+    parser.add_argument("--weights-mb", type=int, default=0, help="memory the stub model holds once loaded")
+    parser.add_argument("--inference-server", metavar="SOCKET", help="serve the stub model on this Unix socket")
+    args = parser.parse_args()
+
+    if args.inference_server:
+        serve_inference(args.inference_server, args.gcs_latency, args.compute, not args.no_render,
+                        args.bucket_dir, args.weights_mb)
+        return
+    app = create_app(args.users, args.gcs_latency, args.db_latency, args.compute, not args.no_render,
+                     args.bucket_dir, args.weights_mb)
+    # Same server settings as startup.sh
+    uvicorn.run(app, host=args.host, port=args.port, loop="asyncio", http="h11", log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Load-test scenario runner: many concurrent field sessions against a running app.
+
+Each virtual user logs in as its own user (so it has its own session_id) and
+then loops over a weighted mix of actions until the step ends:
+
+    upload          POST /upload-multiple/ with --batch-size synthetic frames
+    status          GET  /session-status/{session_id}
+    false_positive  POST /move-to-false-positive/ for one of its uploaded frames
+    export          GET  /export-session-csv/{session_id}
+
+Concurrency is ramped through --levels, with fresh users at every level. Per
+level it reports throughput, per-action p50/p95/p99 and error rates, the
+server's event-loop lag (from the app's lag probe) and the load generator's
+own loop lag (to show the client was not the bottleneck). The saturation
+point is the first level where throughput stops growing by --min-gain, p95
+exceeds --slo-ms, or the error rate exceeds --max-error-rate.
+
+Without --url a stub app (benchmarks.load_app) is started on a free port.
+
+Run from backend/:
+    python -m benchmarks.loadtest --levels 1 2 4 8 16 --step-seconds 10 \\
+        --mix upload=1 status=6 false_positive=1 export=1
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from benchmarks.bench_db import percentile
+from benchmarks.bench_pipeline import synthetic_aerial
+from benchmarks.load_app import PASSWORD, LoopLagProbe
+
+ACTIONS = ("upload", "status", "false_positive", "export")
+
+
+class StepStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(int)
+
+    def record(self, action: str, seconds: float, status):
+        self.latencies[action].append(seconds)
+        self.status_codes[str(status)] += 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors[action] += 1
+
+
+class VirtualUser:
+    def __init__(self, client, user: int, frames: list, args, stats: StepStats):
+        self.client = client
+        self.user = user
+        self.frames = frames
+        self.args = args
+        self.stats = stats
+        self.rng = random.Random(user)
+        self.uploaded = []
+        self.counter = 0
+
+    async def login(self):
+        resp = await self.client.post(
+            "/api/auth/login", json={"email": f"bench{self.user}@example.com", "password": PASSWORD}
+        )
+        resp.raise_for_status()
+        body = resp.json()
+        self.session_id = body["session_id"]
+        self.headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+    async def _timed(self, action: str, request):
+        start = time.perf_counter()
+        try:
+            resp = await request
+            status = resp.status_code
+        except httpx.HTTPError as err:
+            resp, status = None, type(err).__name__
+        self.stats.record(action, time.perf_counter() - start, status)
+        return resp
+
+    async def upload(self):
+        files = []
+        for _ in range(self.args.batch_size):
+            name = f"u{self.user}_{self.counter:05d}.jpg"
+            self.counter += 1
+            files.append(("files", (name, self.rng.choice(self.frames), "image/jpeg")))
+        resp = await self._timed("upload", self.client.post(
+            "/api/upload-multiple/", files=files, data={"session_id": self.session_id}, headers=self.headers
+        ))
+        if resp is not None and resp.status_code == 200:
+            self.uploaded.extend(f[1][0] for f in files)
+
+    async def status(self):
+        await self._timed("status", self.client.get(f"/api/session-status/{self.session_id}", headers=self.headers))
+
+    async def false_positive(self):
+        if not self.uploaded:
+            await self.upload()
+            return
+        image = self.uploaded.pop(self.rng.randrange(len(self.uploaded)))
+        await self._timed("false_positive", self.client.post("/api/move-to-false-positive/", json={
+            "sessionId": self.session_id,
+            "imageName": image,
+            "targetClass": self.rng.choice(["feeding", "resting"])
+        }, headers=self.headers))
+
+    async def export(self):
+        await self._timed("export", self.client.get(f"/api/export-session-csv/{self.session_id}", headers=self.headers))
+
+    async def run(self, deadline: float, weights: dict):
+        actions, w = zip(*weights.items())
+        await self.upload()   # every session starts with some frames
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(actions, w)[0])()
+
+
+def summarize_step(level: int, elapsed: float, stats: StepStats, server_lag: dict, client_lag: dict) -> dict:
+    all_latencies = [v for values in stats.latencies.values() for v in values]
+    total = len(all_latencies)
+    errors = sum(stats.errors.values())
+    return {
+        "concurrency": level,
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "p95_ms": round(percentile(all_latencies, 95) * 1000, 1) if total else None,
+        "status_codes": dict(stats.status_codes),
+        "actions": {
+            action: {
+                "requests": len(values),
+                "errors": stats.errors[action],
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+            }
+            for action, values in sorted(stats.latencies.items())
+        },
+        "server_loop_lag": server_lag,
+        "client_loop_lag": client_lag,
+    }
+
+
+def find_saturation(steps: list, args) -> dict:
+    previous = None
+    for step in steps:
+        reasons = []
+        if step["error_rate"] > args.max_error_rate:
+            reasons.append(f"error rate {step['error_rate']:.2%} > {args.max_error_rate:.2%}")
+        if step["p95_ms"] is not None and step["p95_ms"] > args.slo_ms:
+            reasons.append(f"p95 {step['p95_ms']} ms > {args.slo_ms} ms")
+        if previous and step["throughput_rps"] < previous["throughput_rps"] * (1 + args.min_gain):
+            reasons.append(f"throughput {step['throughput_rps']} rps did not grow over {previous['throughput_rps']} rps")
+        if reasons:
+            return {
+                "concurrency": step["concurrency"],
+                "last_good_concurrency": previous["concurrency"] if previous else None,
+                "reasons": reasons,
+            }
+        previous = step
+    return {"concurrency": None, "last_good_concurrency": steps[-1]["concurrency"] if steps else None,
+            "reasons": ["not saturated at the highest level"]}
+
+
+async def run_level(client, level, first_user, frames, weights, args) -> dict:
+    stats = StepStats()
+    users = [VirtualUser(client, first_user + i, frames, args, stats) for i in range(level)]
+    await asyncio.gather(*(u.login() for u in users))
+
+    await client.get("/loadtest/lag", params={"reset": True})
+    client_probe = LoopLagProbe()
+    client_probe.start()
+    start = time.perf_counter()
+    deadline = start + args.step_seconds
+    await asyncio.gather(*(u.run(deadline, weights) for u in users))
+    elapsed = time.perf_counter() - start
+    client_probe.stop()
+
+    server_lag = (await client.get("/loadtest/lag", params={"reset": True})).json()
+    return summarize_step(level, elapsed, stats, server_lag, client_probe.snapshot())
+
+
+async def run(args, base_url: str) -> dict:
+    weights = {k: v for k, v in args.mix.items() if v > 0}
+    width, height = map(int, args.resolution.lower().split("x"))
+    frames = [synthetic_aerial(width, height, seed=i) for i in range(4)]
+    limits = httpx.Limits(max_connections=max(args.levels) * 2, max_keepalive_connections=max(args.levels) * 2)
+
+    steps = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        first_user = 0
+        for level in args.levels:
+            steps.append(await run_level(client, level, first_user, frames, weights, args))
+            first_user += level
+            print(json.dumps({k: steps[-1][k] for k in ("concurrency", "throughput_rps", "p95_ms", "error_rate")}),
+                  file=sys.stderr)
+    return {"mix": weights, "steps": steps, "saturation": find_saturation(steps, args)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_app(args) -> tuple:
+    port = free_port()
+    cmd = [sys.executable, "-m", "benchmarks.load_app", "--port", str(port),
+           "--users", str(sum(args.levels) + 1), "--compute", str(args.compute),
+           "--gcs-latency", str(args.gcs_latency)]
+    proc = subprocess.Popen(cmd)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            if httpx.get(f"{url}/loadtest/time", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            raise RuntimeError("load-test app exited during startup")
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("load-test app did not start")
+
+
+def parse_mix(items) -> dict:
+    mix = {action: 0.0 for action in ACTIONS}
+    for item in items:
+        name, _, weight = item.partition("=")
+        if name not in mix:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; expected one of {ACTIONS}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running load_app; default starts one")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--mix", nargs="+", default=["upload=1", "status=6", "false_positive=1", "export=1"])
+    parser.add_argument("--batch-size", type=int, default=2, help="frames per upload")
+    parser.add_argument("--resolution", default="1280x720")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 latency objective")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--min-gain", type=float, default=0.05, help="throughput growth expected per level")
+    parser.add_argument("--compute", type=float, default=0.02, help="stub model seconds per image (local app)")
+    parser.add_argument("--gcs-latency", type=float, default=0.005, help="fake storage latency (local app)")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    args.mix = parse_mix(args.mix)
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_local_app(args)
+    try:
+        report = asyncio.run(run(args, url))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Lightweight stand-in for services.model_service used by the benchmarks.
+
+The real module loads torch/ultralytics and the weights on first use; the
+stub keeps the same public functions and result type but returns
+deterministic synthetic detections after a configurable compute delay.
+"""
+import sys
+import time
+import types
+from pathlib import Path
+
+import numpy as np
+
+from core.telemetry import span
+from schemas.detection import DetectionResult
+from services.image_prefetch import iter_prefetched_batches
+from services.render_service import submit_render
+
+
+def install_model_stub(compute_per_image: float = 0.0, render: bool = False, weights_mb: int = 0,
+                       compute_per_call: float = 0.0) -> types.ModuleType:
+    """
+    Register the stub as services.model_service (before api.routes is imported).
+
+    Args:
+        compute_per_image: Seconds slept per image in place of inference
+        render: Annotate decoded images on the real render pool (previews,
+            thumbnails, tiles) instead of returning placeholder bytes
+        weights_mb: Resident memory allocated on the first call, standing in
+            for the model weights when comparing serving topologies
+        compute_per_call: Seconds slept once per call, standing in for the
+            fixed cost of a predict call that batching amortises
+    """
+    module = types.ModuleType("services.model_service")
+    module.DetectionResult = DetectionResult
+    module.weights = None
+
+    def run_model_on_images(images, session_id):
+        if weights_mb and module.weights is None:
+            module.weights = np.ones(weights_mb * 2**20, dtype=np.uint8)
+        with span("detect", images=len(images)):
+            time.sleep(compute_per_call + compute_per_image * len(images))
+        cls = np.array([0, 1], dtype=np.int16)
+        xywhn = np.array([[0.5, 0.5, 0.1, 0.1], [0.2, 0.2, 0.05, 0.05]], dtype=np.float32)
+        conf = np.array([0.9, 0.8], dtype=np.float32)
+        label_content = "0 0.500000 0.500000 0.100000 0.100000\n1 0.200000 0.200000 0.050000 0.050000\n"
+
+        pending = []
+        for image in images:
+            name = image[0] if isinstance(image, tuple) else Path(image).name
+            future = None
+            if render and isinstance(image, tuple):
+                height, width = image[1].shape[:2]
+                xyxy = (np.column_stack([xywhn[:, :2] - xywhn[:, 2:] / 2, xywhn[:, :2] + xywhn[:, 2:] / 2])
+                        * [width, height, width, height])
+                future = submit_render(image[1], xyxy, cls)
+            pending.append((name, future))
+
+        results = []
+        for name, future in pending:
+            image_bytes, preview_bytes, renditions = (
+                future.result() if future else (b"\xff\xd8stub\xff\xd9", None, None)
+            )
+            results.append(DetectionResult(
+                1, 1, "feeding", image_bytes, label_content, name, preview_bytes, renditions, cls, xywhn, conf
+            ))
+        return results
+
+    def run_model_on_blobs(blob_paths, session_id, batch_size=16, **prefetch_kwargs):
+        for batch in iter_prefetched_batches(blob_paths, batch_size, **prefetch_kwargs):
+            yield run_model_on_images(batch, session_id)
+
+    module.run_model_on_images = run_model_on_images
+    module.run_model_on_blobs = run_model_on_blobs
+    sys.modules["services.model_service"] = module
+    return module
@@ -26,7 +26,7 @@ def delete_all_gcs_uploads(bucket_name: str, prefix: str = "uploads/") -> int:
         logger.info("No GCS files found to delete under uploads/")
         return 0
     for blob in blobs:
-        logger.info(f"Deleting blob: {blob.name}")
+        logger.debug(f"Deleting blob: {blob.name}")
         blob.delete()
     logger.info(f"Deleted {len(blobs)} files from GCS under '{prefix}'")
     return len(blobs)
@@ -1,9 +1,190 @@
 """
 Core configuration settings for file handling and model parameters.
 """
+import os
 from pathlib import Path
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png"}
 MAX_FILE_SIZE_MB = 25
 MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
 MODEL_PATH = Path(__file__).resolve().parent.parent.parent / "model" / "MLmodel.pt"
-CLASSIFICATION_MODEL_PATH = Path(__file__).resolve().parent.parent.parent / "model" / "classification_model.pt"
\ No newline at end of file
+CLASSIFICATION_MODEL_PATH = Path(__file__).resolve().parent.parent.parent / "model" / "classification_model.pt"
+DETECTION_MODEL_URL = os.getenv("DETECTION_MODEL_URL", "https://storage.googleapis.com/dugong_models/best.pt")
+CLASSIFICATION_MODEL_URL = os.getenv(
+    "CLASSIFICATION_MODEL_URL", "https://storage.googleapis.com/dugong_models/classification_model.pt"
+)
+
+# Backfill: images per inference chunk (also the checkpoint interval), and
+# sessions backfilled at once per process (each holds its own prefetch buffer)
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "16"))
+BACKFILL_MAX_CONCURRENT = int(os.getenv("BACKFILL_MAX_CONCURRENT", "2"))
+# A backfill marked running whose checkpoint is older than this is reported as stale
+BACKFILL_STALE_SECONDS = int(os.getenv("BACKFILL_STALE_SECONDS", "600"))
+# Each backfill batch takes an inference admission ticket like an upload; while
+# inference is at capacity it waits up to this long for one, then fails
+BACKFILL_ADMISSION_TIMEOUT_SECONDS = float(os.getenv("BACKFILL_ADMISSION_TIMEOUT_SECONDS", "600"))
+
+# Inference input prefetching: download/decode threads, images requested ahead
+# of the model, and memory budget for decoded images waiting to be consumed
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "16"))
+PREFETCH_MAX_BYTES = int(os.getenv("PREFETCH_MAX_MB", "512")) * 1024 * 1024
+
+# Rendering of annotated results. With SERVER_SIDE_RENDERING=false the server
+# skips drawing/encoding the full-size annotated JPEG and the dashboard draws
+# boxes over the original image from the label file.
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "85"))
+PREVIEW_MAX_SIDE = int(os.getenv("PREVIEW_MAX_SIDE", "1280"))
+PREVIEW_JPEG_QUALITY = int(os.getenv("PREVIEW_JPEG_QUALITY", "75"))
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+SERVER_SIDE_RENDERING = os.getenv("SERVER_SIDE_RENDERING", "true").lower() != "false"
+
+# Viewer renditions written at ingest: thumbnails for the sidebar and a tiled
+# zoom pyramid for the viewer (see services/rendition_service.py)
+RENDITIONS_ENABLED = os.getenv("RENDITIONS_ENABLED", "true").lower() != "false"
+RENDITION_TILES = os.getenv("RENDITION_TILES", "true").lower() != "false"
+THUMBNAIL_MAX_SIDE = int(os.getenv("THUMBNAIL_MAX_SIDE", "256"))
+TILE_SIZE = int(os.getenv("TILE_SIZE", "512"))
+TILE_JPEG_QUALITY = int(os.getenv("TILE_JPEG_QUALITY", "80"))
+RENDITION_UPLOAD_WORKERS = int(os.getenv("RENDITION_UPLOAD_WORKERS", "8"))
+
+# Password verification: bcrypt runs on its own bounded pool; logins beyond
+# workers + queue are rejected with 503. Successful verifications are cached
+# in memory for a short TTL.
+PASSWORD_VERIFY_WORKERS = int(os.getenv("PASSWORD_VERIFY_WORKERS", "4"))
+PASSWORD_VERIFY_MAX_QUEUE = int(os.getenv("PASSWORD_VERIFY_MAX_QUEUE", "64"))
+PASSWORD_CACHE_TTL_SECONDS = int(os.getenv("PASSWORD_CACHE_TTL_SECONDS", "300"))
+PASSWORD_CACHE_MAX_ENTRIES = int(os.getenv("PASSWORD_CACHE_MAX_ENTRIES", "10000"))
+
+# JWT auth: with ENFORCE_AUTH=true every session route requires a bearer token
+# and takes the session id from its claims. Decoded tokens are cached until exp.
+ENFORCE_AUTH = os.getenv("ENFORCE_AUTH", "false").lower() == "true"
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "4096"))
+
+# Tracing and metrics: with TELEMETRY_ENABLED=false spans are no-ops and no
+# histograms are recorded. Finished spans are exported as OTLP/HTTP JSON when
+# OTEL_EXPORTER_OTLP_ENDPOINT is set (e.g. http://localhost:4318).
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "false").lower() == "true"
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
+OTLP_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "dugong-api")
+
+# Logging: records are handed to a background listener thread through a
+# bounded queue (dropped, never blocking, when full) and written as JSON lines
+# to size-rotated files and stderr. Per-item DEBUG lines are sampled: one in
+# LOG_DEBUG_SAMPLE_EVERY per call site is written.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "10")) * 1024 * 1024
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_SAMPLE_EVERY = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "100"))
+LOG_TO_STDERR = os.getenv("LOG_TO_STDERR", "true").lower() != "false"
+
+# Event-loop / threadpool monitor: samples loop lag every LOOP_MONITOR_INTERVAL_MS
+# and names the route whose request was running on the loop during any stall
+# longer than LOOP_STALL_THRESHOLD_MS. Exposed at /metrics; stalls and
+# threadpool saturation are also logged when LOOP_MONITOR_LOG_STALLS=true.
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "false").lower() == "true"
+LOOP_MONITOR_INTERVAL_MS = int(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+LOOP_STALL_THRESHOLD_MS = int(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))
+LOOP_MONITOR_LOG_STALLS = os.getenv("LOOP_MONITOR_LOG_STALLS", "false").lower() == "true"
+
+# Warm start: weights are downloaded once to MODEL_PATH/CLASSIFICATION_MODEL_PATH,
+# fused copies are cached next to them, and both models run a dummy batch in a
+# background thread at startup, retried every WARMUP_RETRY_SECONDS if the load
+# fails. /ready reports model, storage and DB readiness.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() != "false"
+WARMUP_BATCH_SIZE = int(os.getenv("WARMUP_BATCH_SIZE", "2"))
+WARMUP_IMAGE_SIZE = int(os.getenv("WARMUP_IMAGE_SIZE", "640"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+MODEL_DOWNLOAD_TIMEOUT = int(os.getenv("MODEL_DOWNLOAD_TIMEOUT", "300"))
+READY_CHECK_CACHE_SECONDS = float(os.getenv("READY_CHECK_CACHE_SECONDS", "5"))
+# Memory-map the fused FP32 checkpoints so processes loading the same weights
+# share their pages instead of each holding a private copy
+WEIGHTS_MMAP = os.getenv("WEIGHTS_MMAP", "true").lower() != "false"
+
+# Serving topology: with INFERENCE_SOCKET set, API workers do not load the
+# models; they send images over this Unix socket to the inference server
+# (python -m services.inference_server), which holds the only copy of the
+# weights. Unset, every process runs inference in-process.
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")
+# Messages on the socket are pickles, so the key has no default: startup.sh
+# generates a random one for its processes, and both sides refuse to start without
+INFERENCE_AUTHKEY = os.getenv("INFERENCE_AUTHKEY", "").encode()
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "300"))
+# Retry-After (seconds) sent with 503 when the inference server cannot be reached
+INFERENCE_RETRY_AFTER = int(os.getenv("INFERENCE_RETRY_AFTER", "5"))
+# Decoded frames go to the inference server through /dev/shm blocks rather
+# than being pickled over the socket (falls back when /dev/shm is full)
+INFERENCE_SHARED_MEMORY = os.getenv("INFERENCE_SHARED_MEMORY", "true").lower() != "false"
+
+# Micro-batching: images from concurrent requests are coalesced into model
+# calls of up to BATCH_MAX_SIZE images, dispatched when full or once the oldest
+# has waited BATCH_MAX_WAIT_MS (see services/batch_scheduler.py). 0 disables
+# coalescing; model calls are serialised either way.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+
+# Fair sharing and admission control (see services/batch_scheduler.py). Each
+# session queues separately and batches are filled weighted round-robin across
+# queues, image by image. Uploads are decoded and submitted UPLOAD_BATCH_SIZE
+# images at a time. Uploads beyond these in-flight budgets get 429 with a
+# Retry-After estimated from recent throughput; admissions not released within
+# ADMISSION_TICKET_TTL_SECONDS (a crashed worker) lapse.
+SCHEDULER_UPLOAD_WEIGHT = int(os.getenv("SCHEDULER_UPLOAD_WEIGHT", "2"))
+SCHEDULER_BACKFILL_WEIGHT = int(os.getenv("SCHEDULER_BACKFILL_WEIGHT", "1"))
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "8"))
+ADMISSION_MAX_REQUESTS = int(os.getenv("ADMISSION_MAX_REQUESTS", "64"))
+ADMISSION_MAX_IMAGES = int(os.getenv("ADMISSION_MAX_IMAGES", "1024"))
+ADMISSION_SESSION_MAX_IMAGES = int(os.getenv("ADMISSION_SESSION_MAX_IMAGES", "512"))
+ADMISSION_MAX_QUEUED_BYTES = int(os.getenv("ADMISSION_MAX_QUEUED_MB", "1024")) * 1024 * 1024
+ADMISSION_TICKET_TTL_SECONDS = float(os.getenv("ADMISSION_TICKET_TTL_SECONDS", "900"))
+
+# Direct-to-storage uploads (see services/direct_upload_service.py): lifetime
+# of the signed resumable-upload URLs, and the shared token Pub/Sub push
+# subscriptions must pass (?token=) to /storage-events/ (unset disables it)
+DIRECT_UPLOAD_URL_MINUTES = int(os.getenv("DIRECT_UPLOAD_URL_MINUTES", "30"))
+STORAGE_EVENTS_TOKEN = os.getenv("STORAGE_EVENTS_TOKEN", "")
+
+# Geotagging (see services/exif_service.py and services/geo_index.py): bytes
+# read from the start of a stored image to find its EXIF block, and the most
+# geohash cells a bounding-box query is split into
+EXIF_HEADER_BYTES = int(os.getenv("EXIF_HEADER_BYTES", str(128 * 1024)))
+GEO_QUERY_MAX_CELLS = int(os.getenv("GEO_QUERY_MAX_CELLS", "64"))
+
+# Near-duplicate frames (see services/frame_dedup.py): "off", "flag" (infer
+# and mark them) or "skip" (reuse the matched frame's result); requests may
+# override it. Frames match when both perceptual hashes are within
+# DEDUP_MAX_DISTANCE of 64 bits. Off by default: "flag" and "skip" read and
+# rewrite the session's frame index on every upload.
+DEDUP_MODE = os.getenv("DEDUP_MODE", "off").lower()
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "4"))
+
+# Detection cascade (see services/model_service.py). With CASCADE_ENABLED a
+# screening pass on frames downscaled to CASCADE_SCREEN_SIZE, at the lower
+# CASCADE_SCREEN_CONF, picks the frames that get full detection; the rest are
+# treated as empty. With EMPTY_FRAME_FAST_PATH, empty frames (no boxes) skip
+# classification and the annotated full-size rendition, and get
+# EMPTY_FRAME_CLASS instead of feeding/resting. Both are off until validated on
+# labeled surveys; the false-positive routes and dashboard only know
+# feeding/resting.
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+CASCADE_SCREEN_SIZE = int(os.getenv("CASCADE_SCREEN_SIZE", "320"))
+CASCADE_SCREEN_CONF = float(os.getenv("CASCADE_SCREEN_CONF", "0.1"))
+EMPTY_FRAME_FAST_PATH = os.getenv("EMPTY_FRAME_FAST_PATH", "false").lower() == "true"
+EMPTY_FRAME_CLASS = os.getenv("EMPTY_FRAME_CLASS", "empty")
+
+# Bulk false-positive moves (see services/false_positive_service.py): GCS
+# copy/delete pairs run at once
+FALSE_POSITIVE_WORKERS = int(os.getenv("FALSE_POSITIVE_WORKERS", "8"))
+
+# Signed URLs kept in session metadata (see services/signed_url_service.py):
+# their lifetime, and how close to expiry a status read re-signs them, inline
+# (SIGNED_URL_MIN_TTL_MINUTES) or ahead of time in the background
+# (SIGNED_URL_REFRESH_MINUTES), before writing them back to the metadata
+SIGNED_URL_HOURS = int(os.getenv("SIGNED_URL_HOURS", "24"))
+SIGNED_URL_MIN_TTL_MINUTES = int(os.getenv("SIGNED_URL_MIN_TTL_MINUTES", "15"))
+SIGNED_URL_REFRESH_MINUTES = int(os.getenv("SIGNED_URL_REFRESH_MINUTES", "120"))
+# A status read re-signs at most SIGNED_URL_INLINE_MAX_RECORDS records itself
+# and leaves the rest to the background job; SIGNED_URL_WORKERS threads sign
+# (RSA locally, or an IAM signBlob call without a key file)
+SIGNED_URL_INLINE_MAX_RECORDS = int(os.getenv("SIGNED_URL_INLINE_MAX_RECORDS", "250"))
+SIGNED_URL_WORKERS = int(os.getenv("SIGNED_URL_WORKERS", "4"))
@@ -0,0 +1,93 @@
+"""
+Shared MongoDB access for the auth and cleanup routes and the geo index.
+
+One pooled MongoClient (for sync routes) and one AsyncMongoClient (for
+async def routes) per process, created at app startup and closed at shutdown.
+Routes fetch collections from here instead of opening their own clients.
+"""
+import os
+from dotenv import load_dotenv
+from pymongo import ASCENDING, AsyncMongoClient, MongoClient
+from pymongo.errors import PyMongoError
+from core.logger import setup_logger
+
+load_dotenv()
+
+logger = setup_logger("database", "logs/database.log")
+
+MONGO_URL = os.getenv("MONGO_URI")
+DB_NAME = "DugongMonitoring"
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+
+_client = None
+_async_client = None
+
+
+def _client_options() -> dict:
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_TIMEOUT_MS,
+    }
+
+
+def get_client() -> MongoClient:
+    global _client
+    if _client is None:
+        _client = MongoClient(MONGO_URL, **_client_options())
+    return _client
+
+
+def get_async_client() -> AsyncMongoClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(MONGO_URL, **_client_options())
+    return _async_client
+
+
+def get_users_collection():
+    return get_client()[DB_NAME]["users"]
+
+
+def get_detection_geo_collection():
+    return get_client()[DB_NAME]["detection_geo"]
+
+
+def get_async_users_collection():
+    return get_async_client()[DB_NAME]["users"]
+
+
+def set_clients(client=None, async_client=None):
+    """
+    Replace the shared clients, e.g. with mongomock in benchmarks or tests.
+    """
+    global _client, _async_client
+    _client = client
+    _async_client = async_client
+
+
+def init_db():
+    """
+    Create the shared clients and the indexes the routes rely on.
+    Failures are logged, not raised, so the API can still start without Mongo.
+    """
+    try:
+        users = get_users_collection()
+        users.create_index([("email", ASCENDING)], unique=True, name="email_unique")
+        geo = get_detection_geo_collection()
+        geo.create_index([("geohash", ASCENDING), ("taken_at", ASCENDING)], name="geohash_time")
+        geo.create_index([("session_id", ASCENDING)], name="session")
+        get_async_client()
+        logger.info("MongoDB clients initialized and indexes ensured")
+    except PyMongoError as err:
+        logger.error(f"MongoDB initialization failed: {err}")
+
+
+async def close_db():
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+    if _client is not None:
+        _client.close()
+    _client = None
+    _async_client = None
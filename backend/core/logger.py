@@ -1,26 +1,195 @@
 """
 Configures logging for the Dugong Classification system with file output support.
+
+Loggers never write from the calling thread: a QueueHandler hands records to
+one background QueueListener, which writes them as JSON lines to the logger's
+size-rotated file (and stderr). Per-item DEBUG lines are sampled at the call
+site before they are queued.
 """
 
+import atexit
+import json
 import logging
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
-def setup_logger(name: str, log_file: str, level=logging.INFO) -> logging.Logger:
+from core.config import (
+    LOG_BACKUP_COUNT,
+    LOG_DEBUG_SAMPLE_EVERY,
+    LOG_LEVEL,
+    LOG_MAX_BYTES,
+    LOG_QUEUE_SIZE,
+    LOG_TO_STDERR,
+)
+
+# Id of the HTTP request being handled, set by the telemetry middleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """
+    Stamp every record with the current request id.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keep one in `every` DEBUG records per call site; the kept record carries
+    `sampled=every` so counts can be scaled back up. Higher levels always pass.
+    """
+
+    def __init__(self, every: int = LOG_DEBUG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        count = self._counts.get(site, 0)
+        self._counts[site] = count + 1
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: ts, level, logger, request_id, message, any
+    `extra` fields, and exc_info when present.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+_formatter = logging.Formatter()
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the queue is full.
+    """
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Render the message in the caller (args may be mutated later) and
+        # keep the traceback as text instead of folding it into the message.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _RoutingHandler(logging.Handler):
+    """
+    Listener-side handler writing each record to its logger's file handler.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.targets = {}
+
+    def handle(self, record):
+        handler = self.targets.get(record.name)
+        if handler is not None:
+            handler.handle(record)
+        return True
+
+
+_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_router = _RoutingHandler()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _start_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return
+        handlers = [_router]
+        if LOG_TO_STDERR:
+            console = logging.StreamHandler(sys.stderr)
+            console.setFormatter(JsonFormatter())
+            handlers.append(console)
+        _listener = QueueListener(_queue, *handlers)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+    for handler in _router.targets.values():
+        handler.close()
+
+
+def setup_logger(name: str, log_file: str, level=None) -> logging.Logger:
     """
     Create a configured logger instance with file output.
-    
+
     Args:
         name: Logger identifier
-        log_file: Path to log file
-        level: Logging level (default: INFO)
+        log_file: Path to log file, rotated at LOG_MAX_MB
+        level: Logging level (default: LOG_LEVEL)
     """
     Path(log_file).parent.mkdir(parents=True, exist_ok=True)
     logger = logging.getLogger(name)
     if not logger.handlers:
-        handler = logging.FileHandler(log_file)
-        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
-        handler.setFormatter(formatter)
+        file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+        file_handler.setFormatter(JsonFormatter())
+        _router.targets[name] = file_handler
+
+        handler = _DroppingQueueHandler(_queue)
+        handler.addFilter(DebugSamplingFilter())
+        handler.addFilter(RequestIdFilter())
         logger.addHandler(handler)
-        logger.setLevel(level)
+        logger.setLevel(level or LOG_LEVEL)
         logger.propagate = False
+        _start_listener()
     return logger
@@ -0,0 +1,226 @@
+"""
+Event-loop lag and threadpool saturation monitor.
+
+A sampler task on the event loop measures how late a short sleep wakes up
+(loop lag) and reads the occupancy of Starlette's threadpool (the anyio
+default thread limiter that runs `def` routes). A watchdog thread notices
+when the sampler has not run for longer than LOOP_STALL_THRESHOLD_MS and
+looks up which request task is running on the loop at that moment, so each
+stall is attributed to a route (and, in the logs, to the source line the
+loop thread is executing).
+
+When the threadpool has waiters, the `def` routes holding its threads are
+counted as the ones saturating it.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+import anyio.to_thread
+
+from core.config import (
+    LOOP_MONITOR_ENABLED,
+    LOOP_MONITOR_INTERVAL_MS,
+    LOOP_MONITOR_LOG_STALLS,
+    LOOP_STALL_THRESHOLD_MS,
+)
+from core.logger import setup_logger
+from core.telemetry import Counter, Gauge, Histogram, register_metric
+
+logger = setup_logger("loop_monitor", "logs/loop_monitor.log")
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+LOOP_LAG = register_metric(Histogram(
+    "dugong_event_loop_lag_seconds", "How late the event loop ran a scheduled wake-up.", (), LAG_BUCKETS
+))
+LOOP_STALLS = register_metric(Counter(
+    "dugong_event_loop_stalls_total", "Event-loop stalls over the threshold, by the route running on the loop.",
+    ("route",)
+))
+LOOP_STALL_SECONDS = register_metric(Counter(
+    "dugong_event_loop_stall_seconds_total", "Event-loop time blocked in stalls, by route.", ("route",)
+))
+THREADPOOL_SATURATED = register_metric(Counter(
+    "dugong_threadpool_saturated_total", "Samples with requests waiting for a threadpool thread, by route holding one.",
+    ("route",)
+))
+
+
+def _route_of(scope: Optional[dict]) -> str:
+    if scope is None:
+        return "unknown"
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "unknown")
+
+
+def _loop_location(thread_id: int) -> str:
+    """Innermost application frame the loop thread is executing."""
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return "?"
+    stack = traceback.extract_stack(frame)
+    for entry in reversed(stack):
+        if "site-packages" not in entry.filename and "/lib/python" not in entry.filename:
+            return f"{entry.filename}:{entry.lineno} in {entry.name}"
+    return f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}" if stack else "?"
+
+
+class LoopMonitor:
+    def __init__(self, interval: float, stall_threshold: float, log_stalls: bool = LOOP_MONITOR_LOG_STALLS):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.log_stalls = log_stalls
+        self.threadpool = {"borrowed": 0, "capacity": 0, "waiting": 0}
+        self._inflight: Dict[asyncio.Task, dict] = {}
+        self._loop = None
+        self._loop_thread_id = None
+        self._heartbeat = time.monotonic()
+        self._stall_route = None
+        self._task = None
+        self._stop = threading.Event()
+        self._watchdog = None
+
+    # request tracking (called on the loop by LoopMonitorMiddleware)
+
+    def track(self, scope: dict):
+        task = asyncio.current_task()
+        if task is not None:
+            self._inflight[task] = scope
+        return task
+
+    def untrack(self, task):
+        if task is not None:
+            self._inflight.pop(task, None)
+
+    # loop side
+
+    async def _sample(self):
+        loop = asyncio.get_running_loop()
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        was_saturated = False
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self._heartbeat = time.monotonic()
+            LOOP_LAG.observe(lag)
+
+            if lag >= self.stall_threshold:
+                route, self._stall_route = self._stall_route, None
+                if route is None:
+                    # Too short for the watchdog to catch the running task
+                    route = "unknown"
+                    LOOP_STALLS.inc(route)
+                LOOP_STALL_SECONDS.inc(route, amount=lag)
+
+            stats = limiter.statistics()
+            self.threadpool = {
+                "borrowed": stats.borrowed_tokens,
+                "capacity": int(limiter.total_tokens),
+                "waiting": stats.tasks_waiting,
+            }
+            saturated = stats.tasks_waiting > 0
+            if saturated:
+                routes = self._sync_routes_in_flight()
+                for route in routes:
+                    THREADPOOL_SATURATED.inc(route)
+                if self.log_stalls and not was_saturated:
+                    logger.warning(
+                        f"Threadpool saturated: {stats.borrowed_tokens}/{int(limiter.total_tokens)} threads busy, "
+                        f"{stats.tasks_waiting} waiting",
+                        extra={"routes": routes}
+                    )
+            was_saturated = saturated
+
+    def _sync_routes_in_flight(self) -> Dict[str, int]:
+        counts = {}
+        for scope in list(self._inflight.values()):
+            endpoint = scope.get("endpoint")
+            if endpoint is not None and not asyncio.iscoroutinefunction(endpoint):
+                route = _route_of(scope)
+                counts[route] = counts.get(route, 0) + 1
+        return counts
+
+    # watchdog thread
+
+    def _watch(self):
+        stalled = False
+        while not self._stop.wait(self.interval / 2):
+            blocked = time.monotonic() - self._heartbeat - self.interval
+            if blocked < self.stall_threshold:
+                stalled = False
+                continue
+            if stalled:
+                continue
+            stalled = True
+            task = asyncio.current_task(self._loop)
+            route = _route_of(self._inflight.get(task)) if task is not None else "unknown"
+            self._stall_route = route
+            LOOP_STALLS.inc(route)
+            if self.log_stalls:
+                logger.warning(
+                    f"Event loop blocked for {blocked * 1000:.0f} ms by {route}",
+                    extra={"route": route, "location": _loop_location(self._loop_thread_id)}
+                )
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = self._loop.create_task(self._sample())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            f"Loop monitor started (interval {self.interval * 1000:.0f} ms, "
+            f"stall threshold {self.stall_threshold * 1000:.0f} ms)"
+        )
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "threadpool": dict(self.threadpool),
+            "stalls": {k[0]: v for k, v in LOOP_STALLS.values().items()},
+            "stall_seconds": {k[0]: round(v, 3) for k, v in LOOP_STALL_SECONDS.values().items()},
+            "threadpool_saturated": {k[0]: v for k, v in THREADPOOL_SATURATED.values().items()},
+        }
+
+
+monitor = LoopMonitor(LOOP_MONITOR_INTERVAL_MS / 1000, LOOP_STALL_THRESHOLD_MS / 1000)
+
+register_metric(Gauge(
+    "dugong_threadpool_threads", "Threadpool threads by state (busy, capacity, waiting requests).",
+    lambda: {("busy",): monitor.threadpool["borrowed"], ("capacity",): monitor.threadpool["capacity"],
+             ("waiting",): monitor.threadpool["waiting"]},
+    ("state",)
+))
+
+
+class LoopMonitorMiddleware:
+    """
+    ASGI middleware registering each HTTP request's task with the monitor so
+    stalls can be attributed to its route. A pass-through when disabled.
+    """
+
+    def __init__(self, app, enabled: bool = LOOP_MONITOR_ENABLED):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = monitor.track(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            monitor.untrack(task)
@@ -0,0 +1,56 @@
+"""
+Readiness of the API's dependencies for the /ready probe.
+
+Models are ready once warmed, or right away when warm-up is disabled (see
+services.model_registry), in this process or in the inference server when one
+is configured; storage and the database
+are probed with one cheap call each. Probe results are cached for
+READY_CHECK_CACHE_SECONDS so frequent polling does not load GCS or Mongo.
+"""
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from core.config import READY_CHECK_CACHE_SECONDS
+from core.database import get_client
+from services.GCS_service import GCSService
+from services.inference_client import model_status
+
+_cache = {}
+
+
+def _check_storage():
+    # Listing one object needs only object read access, unlike bucket.exists()
+    list(GCSService.get_bucket().list_blobs(max_results=1))
+
+
+def _check_database():
+    get_client().admin.command("ping")
+
+
+async def _probe(name: str, check) -> dict:
+    cached = _cache.get(name)
+    now = time.monotonic()
+    if cached and cached["ok"] and now - cached["at"] < READY_CHECK_CACHE_SECONDS:
+        return cached["result"]
+    start = time.perf_counter()
+    try:
+        await run_in_threadpool(check)
+        result = {"ready": True, "latency_ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as err:
+        result = {"ready": False, "error": f"{type(err).__name__}: {err}"}
+    _cache[name] = {"ok": result["ready"], "at": now, "result": result}
+    return result
+
+
+async def check_readiness() -> dict:
+    """
+    Readiness of model, storage and database, with an overall `ready` flag.
+    """
+    model = await run_in_threadpool(model_status)
+    checks = {
+        "model": {**model, "ready": bool(model.get("ready"))},
+        "storage": await _probe("storage", _check_storage),
+        "database": await _probe("database", _check_database),
+    }
+    return {"ready": all(c["ready"] for c in checks.values()), "checks": checks}
@@ -0,0 +1,429 @@
+"""
+Request tracing and per-stage timing.
+
+`span("stage")` times one pipeline stage. Spans nest through a context
+variable, so the stages of an upload share the trace of its HTTP request, and
+every finished span feeds the `dugong_stage_duration_seconds` histogram served
+in Prometheus text format at /metrics. Spans are optionally exported to an
+OpenTelemetry collector as OTLP/HTTP JSON.
+
+With telemetry disabled `span()` returns a shared no-op object, so
+instrumented code pays one attribute lookup and nothing is recorded.
+"""
+import contextvars
+import json
+import queue
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from core.config import OTLP_ENDPOINT, OTLP_SERVICE_NAME, TELEMETRY_ENABLED
+from core.logger import request_id_var, setup_logger
+
+logger = setup_logger("telemetry", "logs/telemetry.log")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Cumulative Prometheus histogram with a fixed label set.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...], buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in self._series.items()]
+        for labelvalues, counts, total, count in sorted(snapshot):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labelvalues))
+            sep = "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+    def totals(self) -> Dict[tuple, Tuple[float, int]]:
+        """(sum, count) per label set."""
+        with self._lock:
+            return {k: (v[1], v[2]) for k, v in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labelnames: Tuple[str, ...], labelvalues: tuple) -> str:
+    labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(labelnames, labelvalues))
+    return f"{{{labels}}}" if labels else ""
+
+
+class Counter:
+    """
+    Monotonic Prometheus counter with a fixed label set.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def values(self) -> Dict[tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_label_text(self.labelnames, k)} {v}" for k, v in items)
+        return lines
+
+
+class Gauge:
+    """
+    Prometheus gauge read at scrape time from `read()`, which returns
+    {labelvalues tuple: value} (or a bare number when there are no labels).
+    """
+
+    def __init__(self, name: str, documentation: str, read, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._read = read
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        values = self._read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        lines.extend(f"{self.name}{_label_text(self.labelnames, k)} {v}" for k, v in sorted(values.items()))
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "dugong_stage_duration_seconds", "Time spent in each pipeline stage.", ("stage",)
+)
+REQUEST_SECONDS = Histogram(
+    "dugong_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+_metrics = [REQUEST_SECONDS, STAGE_SECONDS]
+
+
+def register_metric(metric):
+    """Add a metric (anything with collect() -> lines) to the /metrics output."""
+    _metrics.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class _SpanScope:
+    __slots__ = ("_span", "_token", "_start")
+
+    def __init__(self, span_obj: Span):
+        self._span = span_obj
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        self._start = time.perf_counter()
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        span_obj = self._span
+        span_obj.end_ns = span_obj.start_ns + int(elapsed * 1e9)
+        if exc is not None:
+            span_obj.error = repr(exc)
+        _current_span.reset(self._token)
+        STAGE_SECONDS.observe(elapsed, span_obj.name)
+        if _exporter is not None:
+            _exporter.submit(span_obj)
+        return False
+
+
+class _NoopSpan:
+    """Stands in for both the scope and the span when telemetry is off."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+_enabled = TELEMETRY_ENABLED
+_exporter = None
+
+
+def span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes):
+    """
+    Context manager timing one stage; nests under the current span.
+
+    Args:
+        name: Stage name, also the `stage` label of the histogram
+        trace_id, parent_id: Continue a remote trace (root spans only)
+        attributes: Exported as span attributes
+    """
+    if not _enabled:
+        return _NOOP
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    elif trace_id is None:
+        trace_id = f"{random.getrandbits(128):032x}"
+    return _SpanScope(Span(name, trace_id, parent_id, attributes))
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """
+    executor.submit that keeps the caller's span and request id in the worker.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class OTLPExporter:
+    """
+    Batches finished spans on a background thread and posts them to an
+    OTLP/HTTP collector as JSON. Spans are dropped (and counted) rather than
+    blocking the request when the queue is full.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = OTLP_SERVICE_NAME,
+                 max_queue: int = 10000, batch_size: int = 512, interval: float = 1.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, span_obj: Span):
+        try:
+            self._queue.put_nowait(span_obj)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, block: bool) -> List[Span]:
+        batch = []
+        try:
+            if block:
+                batch.append(self._queue.get(timeout=self.interval))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._post(batch)
+        while True:
+            batch = self._drain(block=False)
+            if not batch:
+                return
+            self._post(batch)
+
+    def _post(self, batch: List[Span]):
+        try:
+            self._session.post(self.url, data=json.dumps(self._encode(batch)),
+                               headers={"Content-Type": "application/json"}, timeout=5)
+        except requests.RequestException as err:
+            logger.warning(f"OTLP export of {len(batch)} span(s) failed: {err}")
+
+    def _encode(self, batch: List[Span]) -> dict:
+        spans = []
+        for s in batch:
+            record = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [_otlp_attribute(k, v) for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1}
+            }
+            if s.parent_id:
+                record["parentSpanId"] = s.parent_id
+            spans.append(record)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "dugong"}, "spans": spans}]
+            }]
+        }
+
+    def shutdown(self, timeout: float = 5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def configure(enabled: Optional[bool] = None, otlp_endpoint: Optional[str] = None):
+    """
+    (Re)configure tracing, e.g. from tests or benchmarks; defaults come from
+    TELEMETRY_ENABLED and OTEL_EXPORTER_OTLP_ENDPOINT.
+    """
+    global _enabled, _exporter
+    _enabled = TELEMETRY_ENABLED if enabled is None else enabled
+    endpoint = OTLP_ENDPOINT if otlp_endpoint is None else otlp_endpoint
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+    if _enabled and endpoint:
+        _exporter = OTLPExporter(endpoint)
+        logger.info(f"Exporting spans to {_exporter.url}")
+
+
+def shutdown():
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def _parse_traceparent(header: str) -> Tuple[Optional[str], Optional[str]]:
+    parts = header.split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class TelemetryMiddleware:
+    """
+    ASGI middleware assigning each request an id (X-Request-ID, taken from the
+    client when sent) for log correlation and, when enabled, a root span and a
+    latency observation labelled with the matched route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        request_token = request_id_var.set(request_id)
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            if not _enabled:
+                await self.app(scope, receive, send_wrapper)
+                return
+            trace_id, parent_id = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+            start = time.perf_counter()
+            with span("http.request", trace_id=trace_id, parent_id=parent_id,
+                      **{"http.method": scope["method"], "http.target": scope["path"], "request.id": request_id}) as root:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    route = getattr(scope.get("route"), "path", "unmatched")
+                    root.set_attribute("http.route", route)
+                    root.set_attribute("http.status_code", status[0])
+                    REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, str(status[0]))
+        finally:
+            request_id_var.reset(request_token)
@@ -1,63 +1,111 @@
-# main.py
-import certifi
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
-from dotenv import load_dotenv
-import asyncio
-import os
-from auth.login import router as login_router
-from api.routes import router as api_router
-# from auth.google_auth import router as auth_router
-from core.logger import setup_logger
-from fastapi.staticfiles import StaticFiles
-
-# Load environment variables from .env file
-load_dotenv()
-
-
-print(certifi.where())
-
-
-# Get secret key from environment
-SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret")
-
-# App logger
-app_logger = setup_logger("app", "logs/app.log")
-
-# Ensure base directories exist BEFORE initializing FastAPI
-os.makedirs("logs", exist_ok=True)
-
-# Initialize FastAPI app
-app = FastAPI(title="YOLO Image Uploader")
-app_logger.info("App initialized")
-
-# Add middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# ✅ Add session middleware required for OAuth login
-app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
-
-# Background task: periodically clean expired session folders
-@app.on_event("startup")
-async def startup_event():
-    app_logger.info("Starting session-based cleanup background task")
-
-# Register routers
-app.include_router(api_router, prefix="/api")     # Main API
-# app.include_router(auth_router)                   # Google OAuth
-app.include_router(login_router, prefix="/api")                  # Email/Password Login
-
-@app.get("/")
-async def root():
-    return {"message": "Dugong Taxonomy API is running"}
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": "2025-01-01T00:00:00Z"}
\ No newline at end of file
+# main.py
+import certifi
+from datetime import datetime
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.sessions import SessionMiddleware
+from dotenv import load_dotenv
+import asyncio
+import os
+from auth.login import router as login_router
+from api.routes import router as api_router
+# from auth.google_auth import router as auth_router
+from core.logger import setup_logger
+from core.database import init_db, close_db
+from core import telemetry
+from core.config import INFERENCE_SOCKET, LOOP_MONITOR_ENABLED, WARMUP_ENABLED
+from core.readiness import check_readiness
+from services.model_registry import model_registry
+from core.loop_monitor import LoopMonitorMiddleware, monitor as loop_monitor
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+# Get secret key from environment; it signs the session cookies and the
+# login tokens, so refuse to start without it
+SECRET_KEY = os.getenv("SECRET_KEY")
+if not SECRET_KEY:
+    raise RuntimeError("SECRET_KEY is not set")
+
+# App logger
+app_logger = setup_logger("app", "logs/app.log")
+app_logger.debug(f"Using CA bundle: {certifi.where()}")
+
+# Ensure base directories exist BEFORE initializing FastAPI
+os.makedirs("logs", exist_ok=True)
+
+# Initialize FastAPI app
+app = FastAPI(title="YOLO Image Uploader")
+app_logger.info("App initialized")
+
+# Add middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# ✅ Add session middleware required for OAuth login
+app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
+
+# Request ids for log correlation, plus request spans/latency when TELEMETRY_ENABLED
+app.add_middleware(telemetry.TelemetryMiddleware)
+
+# Attributes event-loop stalls to routes when LOOP_MONITOR_ENABLED
+app.add_middleware(LoopMonitorMiddleware)
+
+# Background task: periodically clean expired session folders
+@app.on_event("startup")
+async def startup_event():
+    app_logger.info("Starting session-based cleanup background task")
+    telemetry.configure()
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    if WARMUP_ENABLED and not INFERENCE_SOCKET:
+        # With an inference server the models live there, not in API workers
+        model_registry.start_background_warmup()
+    await run_in_threadpool(init_db)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_db()
+    loop_monitor.stop()
+    telemetry.shutdown()
+
+# Register routers
+app.include_router(api_router, prefix="/api")     # Main API
+# app.include_router(auth_router)                   # Google OAuth
+app.include_router(login_router, prefix="/api")                  # Email/Password Login
+
+@app.get("/")
+async def root():
+    return {"message": "Dugong Taxonomy API is running"}
+
+@app.get("/health")
+async def health_check():
+    """
+    Liveness: the process is up and serving. See /ready for dependencies.
+    """
+    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat() + "Z"}
+
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: models loaded and warmed, storage and database reachable.
+    Returns 503 until all three are ready.
+    """
+    report = await check_readiness()
+    return JSONResponse(content=report, status_code=200 if report["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus scrape endpoint (stage and request latency histograms).
+    """
+    return PlainTextResponse(telemetry.render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,35 @@
+"""
+Per-image inference output shared by the model service, the inference server
+and its clients. Kept free of torch/cv2 imports so API workers can unpickle
+results received from the inference server.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+
+class DetectionResult(NamedTuple):
+    """
+    Per-image output of run_model_on_images.
+
+    image_bytes is the full-size annotated JPEG, or None when server-side
+    rendering is disabled; preview_bytes is the downscaled preview rendition
+    and renditions holds the encoded thumbnails/tile pyramid (see
+    services.rendition_service). cls, xywhn and conf are the raw box arrays
+    kept in the session detections store. duplicate_of names the earlier
+    frame this one is a near-duplicate of (see services.frame_dedup); reused
+    results were copied from it instead of inferred.
+    """
+    dugong_count: int
+    calf_count: int
+    image_class: str
+    image_bytes: Optional[bytes]
+    label_content: str
+    image_name: str
+    preview_bytes: Optional[bytes] = None
+    renditions: Optional[dict] = None
+    cls: Optional[np.ndarray] = None
+    xywhn: Optional[np.ndarray] = None
+    conf: Optional[np.ndarray] = None
+    duplicate_of: Optional[str] = None
+    reused: bool = False
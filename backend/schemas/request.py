@@ -1,7 +1,35 @@
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal, Optional
 
 class MoveImageRequest(BaseModel):
     sessionId: str
     imageName: str
-    targetClass: Literal["feeding", "resting"] 
\ No newline at end of file
+    targetClass: Literal["feeding", "resting"]
+
+
+class FalsePositiveMove(BaseModel):
+    imageName: str
+    targetClass: Literal["feeding", "resting"]
+
+
+class MoveImagesRequest(BaseModel):
+    sessionId: Optional[str] = None
+    images: List[FalsePositiveMove] = Field(..., min_length=1, max_length=1000)
+
+
+class UploadFileSpec(BaseModel):
+    filename: str
+    contentType: str
+    size: int = Field(..., ge=0)
+
+
+class UploadUrlsRequest(BaseModel):
+    sessionId: Optional[str] = None
+    files: List[UploadFileSpec] = Field(..., min_length=1)
+
+
+class UploadCompleteRequest(BaseModel):
+    sessionId: Optional[str] = None
+    filenames: List[str] = Field(..., min_length=1)
+    # Near-duplicate frame handling (services.frame_dedup); None uses DEDUP_MODE
+    duplicates: Optional[Literal["off", "flag", "skip"]] = None
@@ -3,6 +3,7 @@ Response schema for dugong image classification results.
 Defines the structure of the AI model's output data.
 """
 
+from typing import Optional
 from pydantic import BaseModel
 
 class ImageResult(BaseModel):
@@ -12,7 +13,11 @@ class ImageResult(BaseModel):
     Attributes:
         imageId: Unique identifier for the processed image
         imageUrl: URL to access the processed image
-        labelUrl: URL to access the labeled/annotated image
+        previewUrl: URL to a downscaled preview of the image
+        thumbnailUrl: URL to a small WebP/JPEG thumbnail
+        tiles: Tile pyramid manifest (width, height, tileSize, levels), if tiled
+        labelUrl: URL to the YOLO label file for the image
+        annotated: Whether boxes are drawn into imageUrl (otherwise the client draws them)
         dugongCount: Number of dugongs detected
         calfCount: Number of calves detected
         imageClass: Classification grade (A/B/C)
@@ -21,6 +26,11 @@ class ImageResult(BaseModel):
 
     imageId: int
     imageUrl: str
+    previewUrl: Optional[str] = None
+    thumbnailUrl: Optional[str] = None
+    tiles: Optional[dict] = None
+    labelUrl: Optional[str] = None
+    annotated: bool = True
     dugongCount: int
     calfCount: int
     imageClass: str
@@ -1,22 +1,87 @@
 import os
+import json
 from google.cloud import storage
+from google.api_core.exceptions import NotFound
 from datetime import timedelta
+from typing import List
+from core.config import SIGNED_URL_HOURS
+from core.logger import setup_logger
+
+logger = setup_logger("gcs", "logs/gcs.log")
 
 class GCSService:
     BUCKET_NAME = os.getenv("BUCKET_NAME", "dugongstorage")
     KEY_PATH = os.path.join(os.path.dirname(__file__), "key.json")
+    _client = None
 
     @staticmethod
     def get_client():
-        if not os.path.exists(GCSService.KEY_PATH):
-            raise FileNotFoundError(f"GCS key file not found at {GCSService.KEY_PATH}")
-        return storage.Client.from_service_account_json(GCSService.KEY_PATH)
+        # Reuse one client (and its HTTP connection pool) per process
+        # instead of re-reading the key file on every call.
+        if GCSService._client is None:
+            if not os.path.exists(GCSService.KEY_PATH):
+                raise FileNotFoundError(f"GCS key file not found at {GCSService.KEY_PATH}")
+            GCSService._client = storage.Client.from_service_account_json(GCSService.KEY_PATH)
+        return GCSService._client
 
     @staticmethod
     def get_bucket():
         client = GCSService.get_client()
         return client.bucket(GCSService.BUCKET_NAME)
 
+    @staticmethod
+    def upload_bytes(blob_path: str, data: bytes, content_type: str = "application/octet-stream"):
+        bucket = GCSService.get_bucket()
+        bucket.blob(blob_path).upload_from_string(data, content_type=content_type)
+
+    @staticmethod
+    def upload_json(blob_path: str, data: dict):
+        GCSService.upload_bytes(blob_path, json.dumps(data, indent=2), content_type="application/json")
+
+    @staticmethod
+    def download_json(blob_path: str) -> dict:
+        bucket = GCSService.get_bucket()
+        try:
+            content = bucket.blob(blob_path).download_as_bytes()
+        except NotFound:
+            raise FileNotFoundError(f"Blob not found: {blob_path}")
+        return json.loads(content)
+
+    @staticmethod
+    def generate_signed_url(blob_path: str, hours_valid: int = SIGNED_URL_HOURS) -> str:
+        bucket = GCSService.get_bucket()
+        return bucket.blob(blob_path).generate_signed_url(
+            version="v4",
+            expiration=timedelta(hours=hours_valid),
+            method="GET"
+        )
+
+    @staticmethod
+    def generate_signed_urls(blob_paths: List[str], hours_valid: int = SIGNED_URL_HOURS) -> List[str]:
+        """generate_signed_url for many blobs, resolving the bucket and expiry once."""
+        bucket = GCSService.get_bucket()
+        expiration = timedelta(hours=hours_valid)
+        return [
+            bucket.blob(blob_path).generate_signed_url(version="v4", expiration=expiration, method="GET")
+            for blob_path in blob_paths
+        ]
+
+    @staticmethod
+    def generate_resumable_upload_url(blob_path: str, content_type: str, minutes_valid: int = 30,
+                                      headers: dict = None) -> str:
+        """
+        Signed URL that starts a resumable upload (POST with x-goog-resumable:
+        start, the same Content-Type and `headers`) of one object.
+        """
+        bucket = GCSService.get_bucket()
+        return bucket.blob(blob_path).generate_signed_url(
+            version="v4",
+            expiration=timedelta(minutes=minutes_valid),
+            method="RESUMABLE",
+            content_type=content_type,
+            headers=headers
+        )
+
     @staticmethod
     def upload_file(local_path: str, folder_prefix: str, file_name: str, url_expiration_hours: int = 1) -> str:
         if not os.path.exists(local_path):
@@ -27,14 +92,13 @@ class GCSService:
         blob = bucket.blob(blob_path)
         blob.upload_from_filename(local_path)
 
-        print(f"Uploaded {local_path} to gs://{GCSService.BUCKET_NAME}/{blob_path}")
+        logger.debug(f"Uploaded {local_path} to gs://{GCSService.BUCKET_NAME}/{blob_path}")
 
         signed_url = blob.generate_signed_url(
             version="v4",
             expiration=timedelta(hours=url_expiration_hours),
             method="GET"
         )
-        print(f"Signed URL: {signed_url}")
         return signed_url
 
     @staticmethod
@@ -43,7 +107,7 @@ class GCSService:
         blob_path = f"{folder_prefix.rstrip('/')}/{file_name}"
         blob = bucket.blob(blob_path)
         blob.download_to_filename(destination_path)
-        print(f"Downloaded {blob_path} to {destination_path}")
+        logger.debug(f"Downloaded {blob_path} to {destination_path}")
 
     @staticmethod
     def move_image_to_false_positive(session_id: str, image_name: str, target_class: str):
@@ -69,8 +133,9 @@ class GCSService:
             return {"deleted": False, "message": f"No files found for session_id: {session_id}"}
 
         for blob in blobs:
-            print(f"Deleting blob: {blob.name}")
+            logger.debug(f"Deleting blob: {blob.name}")
             blob.delete()
+        logger.info(f"Deleted {len(blobs)} blob(s) for session {session_id}")
 
         return {
             "deleted": True,
@@ -0,0 +1,261 @@
+"""
+Resumable, chunked backfill of detection results for images already stored
+under a session's images/ folder in GCS.
+
+Images are processed in chunks of BACKFILL_BATCH_SIZE. While the model runs on
+one chunk, the next chunk is downloaded and decoded into memory by the prefetch
+pool (see services.image_prefetch). After every chunk the results are merged
+into session_metadata.json, which doubles as the checkpoint: a restarted or
+repeated backfill only sees images that are not in the metadata yet. The
+merge is generation-guarded (services.session_metadata), so it neither drops
+nor is dropped by a concurrent upload.
+
+Each checkpoint also records the run's owner (host:pid) and time in
+metadata["backfill"]; `backfill_status` reports a "running" entry that has
+not been updated for BACKFILL_STALE_SECONDS as "stale", e.g. after a crash.
+
+Triggers that arrive while a session is being backfilled (direct uploads
+finishing one after another) go through request_backfill, which folds them
+into one more pass of the running backfill.
+
+Every chunk holds an inference admission ticket (see BatchScheduler.admit)
+while it is inferred and stored, so backfills, including those of direct
+uploads, count against the same budgets as /upload-multiple/. Instead of a
+429 they wait for room, up to BACKFILL_ADMISSION_TIMEOUT_SECONDS.
+"""
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+from uuid import uuid4
+from core.config import (
+    BACKFILL_ADMISSION_TIMEOUT_SECONDS,
+    BACKFILL_BATCH_SIZE,
+    BACKFILL_MAX_CONCURRENT,
+    BACKFILL_STALE_SECONDS,
+)
+from core.logger import setup_logger
+from core.telemetry import span
+from services.GCS_service import GCSService
+from services.exif_service import read_blob_geo
+from services.geo_index import index_images
+from services.result_service import store_detection_result
+from services.detections_store import append_detections
+from services.session_metadata import merge_file_records, update_session_metadata
+
+logger = setup_logger("backfill", "logs/backfill.log")
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".webp")
+
+# Sessions with a backfill currently running in this process, and those
+# whose running backfill must take another pass for images added meanwhile
+_running_sessions = set()
+_rerun_sessions = set()
+_running_lock = threading.Lock()
+# Bounds the decoded images held by concurrent backfills; others wait their turn
+_backfill_slots = threading.BoundedSemaphore(max(1, BACKFILL_MAX_CONCURRENT))
+
+
+class BackfillInProgress(Exception):
+    """Raised when a backfill is already running for the session."""
+
+
+def _load_metadata(metadata_path: str) -> dict:
+    try:
+        return GCSService.download_json(metadata_path)
+    except FileNotFoundError:
+        return {}
+
+
+def _list_unprocessed(session_id: str, processed: set) -> list:
+    bucket = GCSService.get_bucket()
+    blobs = bucket.list_blobs(prefix=f"{session_id}/images/")
+    return [
+        b for b in blobs
+        if b.name.lower().endswith(IMAGE_SUFFIXES) and Path(b.name).name not in processed
+    ]
+
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _checkpoint(session_id: str, run_id: str, new_files: List[dict], processed: int, remaining: int,
+                status: Optional[str] = None, error: Optional[str] = None) -> dict:
+    """
+    Merge new file records into the latest session metadata and write it back,
+    guarded by its generation. Records are merged by filename, which makes
+    re-applying the same chunk a no-op.
+    """
+    def apply(metadata: dict):
+        if status == "failed" and not metadata:
+            return False  # nothing was ever stored for the session
+        now = datetime.utcnow().isoformat()
+        merge_file_records(metadata, new_files)
+        metadata.update({
+            "session_id": session_id,
+            "created_at": metadata.get("created_at", now),
+            "last_activity": now,
+            "backfill": {
+                "status": status or ("running" if remaining else "completed"),
+                "runId": run_id,
+                "owner": _OWNER,
+                "processed": processed,
+                "remaining": remaining,
+                "updatedAt": now,
+                **({"error": error} if error else {})
+            }
+        })
+
+    return update_session_metadata(session_id, apply)
+
+
+def backfill_status(metadata: dict, now: Optional[datetime] = None) -> Optional[dict]:
+    """
+    The metadata's backfill record, with a "running" one that has not been
+    checkpointed for BACKFILL_STALE_SECONDS reported as "stale".
+    """
+    backfill = metadata.get("backfill")
+    if not backfill or backfill.get("status") != "running":
+        return backfill
+    updated_at = datetime.fromisoformat(backfill["updatedAt"])
+    if (now or datetime.utcnow()) - updated_at > timedelta(seconds=BACKFILL_STALE_SECONDS):
+        return {**backfill, "status": "stale"}
+    return backfill
+
+
+def run_backfill(session_id: str, batch_size: int = BACKFILL_BATCH_SIZE, duplicates: Optional[str] = None) -> dict:
+    """
+    Run detection on every image of the session that has no metadata record yet.
+
+    Args:
+        session_id: Session whose images/ folder is scanned
+        batch_size: Number of images passed to the model per chunk
+        duplicates: Near-duplicate frame mode (services.frame_dedup), None for DEDUP_MODE
+
+    Raises:
+        BackfillInProgress: If this session is already being backfilled
+    """
+    with _running_lock:
+        if session_id in _running_sessions:
+            raise BackfillInProgress(f"Backfill already running for session {session_id}")
+        _running_sessions.add(session_id)
+
+    processed_count = 0
+    run_id = uuid4().hex
+    try:
+        with _backfill_slots:
+            while True:
+                summary = _backfill_pass(session_id, run_id, batch_size, duplicates)
+                processed_count += summary["processed_count"]
+                with _running_lock:
+                    if session_id not in _rerun_sessions:
+                        _running_sessions.discard(session_id)
+                        return {**summary, "processed_count": processed_count}
+                    _rerun_sessions.discard(session_id)
+    except BaseException as err:
+        with _running_lock:
+            _running_sessions.discard(session_id)
+            _rerun_sessions.discard(session_id)
+        try:
+            _checkpoint(session_id, run_id, [], processed_count, 0, status="failed", error=str(err))
+        except Exception as checkpoint_err:
+            logger.error(f"Could not record the failed backfill of {session_id}: {checkpoint_err}")
+        raise
+
+
+def request_backfill(session_id: str, batch_size: int = BACKFILL_BATCH_SIZE,
+                     duplicates: Optional[str] = None) -> Optional[dict]:
+    """
+    Run a backfill for the session, or, when one is already running, have
+    it make another pass once done so images added meanwhile are picked up.
+
+    Returns:
+        The run_backfill summary, or None when handed to the running backfill
+    """
+    try:
+        return run_backfill(session_id, batch_size, duplicates)
+    except BackfillInProgress:
+        with _running_lock:
+            if session_id in _running_sessions:
+                _rerun_sessions.add(session_id)
+                return None
+        # It finished in between; the images it missed are still unprocessed
+        return request_backfill(session_id, batch_size, duplicates)
+
+
+@contextmanager
+def _admission(backend, session_id: str, images: int, timeout: float = BACKFILL_ADMISSION_TIMEOUT_SECONDS):
+    """
+    Hold an admission ticket for `images` images, waiting while inference is at capacity.
+
+    Raises:
+        SchedulerBusy: If no ticket was granted within `timeout` seconds
+    """
+    from services.batch_scheduler import SchedulerBusy
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ticket = backend.admit(session_id, images)
+            break
+        except SchedulerBusy as err:
+            if time.monotonic() + err.retry_after > deadline:
+                raise
+            logger.info(f"Backfill of {session_id} waiting {err.retry_after}s for inference capacity")
+            time.sleep(err.retry_after)
+    try:
+        yield
+    finally:
+        backend.release(ticket)
+
+
+def _backfill_pass(session_id: str, run_id: str, batch_size: int, duplicates: Optional[str] = None) -> dict:
+    metadata = _load_metadata(f"{session_id}/session_metadata.json")
+    processed_names = {f["filename"] for f in metadata.get("files", [])}
+    unprocessed = _list_unprocessed(session_id, processed_names)
+
+    if not unprocessed:
+        return {
+            "processed_count": 0,
+            "files": metadata.get("files", [])
+        }
+
+    from services.inference_client import inference_backend
+
+    batch_size = max(1, batch_size)
+    logger.info(f"Backfilling {len(unprocessed)} image(s) for session {session_id} in chunks of {batch_size}")
+
+    processed_count = 0
+    blob_paths = [b.name for b in unprocessed]
+    backend = inference_backend()
+    batches = backend.run_model_on_blobs(blob_paths, session_id, batch_size, duplicates=duplicates)
+    while True:
+        with _admission(backend, session_id, min(batch_size, len(unprocessed) - processed_count)):
+            detection_results = next(batches, None)
+            if detection_results is None:
+                break
+            new_files = []
+            for result in detection_results:
+                with span("exif"):
+                    geo = read_blob_geo(f"{session_id}/images/{result.image_name}")
+                with span("result_upload"):
+                    new_files.append(store_detection_result(session_id, result.image_name, result, geo))
+            with span("metadata_write", target="detections"):
+                append_detections(session_id, detection_results)
+
+            processed_count += len(new_files)
+            with span("metadata_write", target="session_metadata"):
+                metadata = _checkpoint(session_id, run_id, new_files, processed_count,
+                                       len(unprocessed) - processed_count)
+            with span("geo_index"):
+                index_images(session_id, new_files)
+        logger.info(f"Backfill checkpoint for {session_id}: {processed_count}/{len(unprocessed)}")
+
+    return {
+        "processed_count": processed_count,
+        "files": metadata.get("files", [])
+    }
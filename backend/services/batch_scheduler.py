@@ -0,0 +1,462 @@
+"""
+Micro-batching, fair sharing and admission control in front of the model.
+
+Uploads usually carry a handful of images, and each used to run its own
+model.predict. The BatchScheduler queues the images of every caller and
+one worker thread feeds them to the model in batches of up to
+`max_batch_size` images. A batch is dispatched once it is full, or once
+its oldest image has waited `max_wait` seconds. Small concurrent uploads
+therefore share a predict call, and large uploads are split into
+batches of the same size. Each caller blocks until all of its own
+images are done and gets its results back in input order.
+
+Queued images wait in one queue per session (backfills get a queue of their
+own). Batches are filled weighted round-robin across the queues, image by
+image: each queue in turn contributes up to its weight in images. A session
+uploading hundreds of images therefore cannot hold back another session's
+single image for more than a batch or two.
+
+Uploads are admitted before any work is done for them (`admit`). While the
+admitted requests, admitted images, one session's admitted images or the
+decoded bytes waiting in the queues are over budget, new requests are
+refused with SchedulerBusy, which carries a Retry-After estimate based on
+recent throughput. A request that exceeds a budget on its own is still
+admitted when nothing else holds that budget.
+
+The worker is also the only thread that calls the model, so the scheduler
+serialises inference (the YOLO predictors are not thread-safe).
+"""
+import contextvars
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from core.config import (
+    ADMISSION_MAX_IMAGES,
+    ADMISSION_MAX_QUEUED_BYTES,
+    ADMISSION_MAX_REQUESTS,
+    ADMISSION_SESSION_MAX_IMAGES,
+    ADMISSION_TICKET_TTL_SECONDS,
+    BACKFILL_BATCH_SIZE,
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    SCHEDULER_BACKFILL_WEIGHT,
+    SCHEDULER_UPLOAD_WEIGHT,
+)
+from core.logger import setup_logger
+from core.telemetry import Counter, Gauge, Histogram, register_metric
+from schemas.detection import DetectionResult
+
+logger = setup_logger("batch_scheduler", "logs/batch_scheduler.log")
+
+BATCH_IMAGES = register_metric(Histogram(
+    "dugong_inference_batch_images", "Images per model call made by the batch scheduler.", (),
+    (1, 2, 4, 8, 16, 32, 64)
+))
+BATCH_REQUESTS = register_metric(Histogram(
+    "dugong_inference_batch_requests", "Requests sharing one model call.", (), (1, 2, 4, 8, 16, 32)
+))
+BATCH_QUEUE_SECONDS = register_metric(Histogram(
+    "dugong_inference_queue_seconds", "Time from submitting images until their batch started.", (),
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+))
+ADMISSION_REJECTED = register_metric(Counter(
+    "dugong_admission_rejected_total", "Requests refused by admission control, by exhausted budget.", ("budget",)
+))
+
+
+class SchedulerBusy(Exception):
+    """
+    Raised when admitting a request would exceed a budget; retry_after is
+    the suggested wait in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Request:
+    """
+    One caller's images and the slots their results are routed back to.
+    """
+
+    def __init__(self, images: List, session_id: str, queue: str):
+        self.images = images
+        self.session_id = session_id
+        self.queue = queue
+        self.results: List[Optional[DetectionResult]] = [None] * len(images)
+        self.next_index = 0   # first image not yet taken into a batch
+        self.remaining = len(images)
+        self.nbytes = [_image_bytes(image) for image in images]
+        self.submitted = time.monotonic()
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+
+
+class _Ticket:
+    def __init__(self, session_id: str, images: int, ttl: float):
+        self.session_id = session_id
+        self.images = images
+        self.expires = time.monotonic() + ttl
+
+
+def _image_bytes(image) -> int:
+    return getattr(image[1], "nbytes", 0) if isinstance(image, tuple) else 0
+
+
+class BatchScheduler:
+    """
+    Args:
+        run_batch: Called as run_batch(images, session_id) on the worker thread;
+            returns one result per image. Default: the model service's
+            run_model_on_images (resolved per call, so a stubbed module is used)
+        max_batch_size: Most images per model call; 0 disables batching
+            (each request is one call of its own, still serialised)
+        max_wait: Seconds the oldest queued image may wait for a batch to fill
+        max_requests: Admitted requests in flight
+        max_images: Admitted images in flight, over all sessions
+        session_max_images: Admitted images in flight for one session
+        max_queued_bytes: Decoded image bytes waiting in the queues
+        ticket_ttl: Seconds after which an unreleased admission lapses
+    """
+
+    def __init__(self, run_batch: Optional[Callable] = None, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait: float = BATCH_MAX_WAIT_MS / 1000, max_requests: int = ADMISSION_MAX_REQUESTS,
+                 max_images: int = ADMISSION_MAX_IMAGES, session_max_images: int = ADMISSION_SESSION_MAX_IMAGES,
+                 max_queued_bytes: int = ADMISSION_MAX_QUEUED_BYTES,
+                 ticket_ttl: float = ADMISSION_TICKET_TTL_SECONDS):
+        self.run_batch = run_batch or _model_service_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_requests = max_requests
+        self.max_images = max_images
+        self.session_max_images = session_max_images
+        self.max_queued_bytes = max_queued_bytes
+        self.ticket_ttl = ticket_ttl
+        # Round-robin order: the queue at the front is served next
+        self._queues: "OrderedDict[str, deque[_Request]]" = OrderedDict()
+        self._weights: Dict[str, int] = {}
+        self._queued_images = 0
+        self._queued_bytes = 0
+        self._tickets: Dict[str, _Ticket] = {}
+        self._admitted_images = 0
+        self._session_images: Dict[str, int] = {}
+        self._images_per_second = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def queued_images(self) -> int:
+        return self._queued_images
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued_images": self._queued_images,
+                "queued_mb": round(self._queued_bytes / 2**20, 1),
+                "queues": len(self._queues),
+                "admitted_requests": len(self._tickets),
+                "admitted_images": self._admitted_images,
+                "images_per_second": round(self._images_per_second, 2),
+            }
+
+    def admit(self, session_id: str, images: int) -> str:
+        """
+        Reserve room for a request of `images` images; returns a ticket to
+        pass to `release` once the request is done.
+
+        Raises:
+            SchedulerBusy: A budget is exhausted
+        """
+        with self._cond:
+            self._expire_tickets()
+            session_images = self._session_images.get(session_id, 0)
+            if len(self._tickets) >= self.max_requests:
+                budget = "requests"
+            elif self._tickets and self._admitted_images + images > self.max_images:
+                budget = "images"
+            elif session_images and session_images + images > self.session_max_images:
+                budget = "session_images"
+            elif self._queued_bytes >= self.max_queued_bytes:
+                budget = "memory"
+            else:
+                ticket = uuid.uuid4().hex
+                self._tickets[ticket] = _Ticket(session_id, images, self.ticket_ttl)
+                self._admitted_images += images
+                self._session_images[session_id] = session_images + images
+                return ticket
+            retry_after = self._retry_after()
+        ADMISSION_REJECTED.inc(budget)
+        raise SchedulerBusy(f"Inference is at capacity ({budget} budget); retry in {retry_after}s", retry_after)
+
+    def release(self, ticket: str):
+        with self._cond:
+            self._drop_ticket(ticket)
+
+    def _drop_ticket(self, ticket: str):
+        entry = self._tickets.pop(ticket, None)
+        if entry is None:
+            return
+        self._admitted_images -= entry.images
+        remaining = self._session_images.get(entry.session_id, 0) - entry.images
+        if remaining > 0:
+            self._session_images[entry.session_id] = remaining
+        else:
+            self._session_images.pop(entry.session_id, None)
+
+    def _expire_tickets(self):
+        # Tickets of requests whose worker died without releasing them
+        now = time.monotonic()
+        for ticket in [t for t, entry in self._tickets.items() if entry.expires < now]:
+            logger.warning(f"Admission ticket of session {self._tickets[ticket].session_id} expired unreleased")
+            self._drop_ticket(ticket)
+
+    def _retry_after(self) -> int:
+        outstanding = max(self._admitted_images, self._queued_images)
+        if self._images_per_second <= 0:
+            return 1
+        return int(min(60, max(1, math.ceil(outstanding / self._images_per_second))))
+
+    def submit(self, images: Iterable, session_id: str, queue: Optional[str] = None,
+               weight: int = SCHEDULER_UPLOAD_WEIGHT) -> Future:
+        """
+        Queue images for inference; the future resolves to their results in order.
+
+        Args:
+            images: Paths or decoded (filename, BGR array) pairs
+            session_id: Passed on to the model service
+            queue: Round-robin queue to wait in (default: the session's)
+            weight: Images the queue contributes per round-robin turn
+        """
+        request = _Request(list(images), session_id, queue or session_id)
+        if not request.images:
+            request.future.set_result([])
+            return request.future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batch scheduler is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+                self._thread.start()
+            self._queues.setdefault(request.queue, deque()).append(request)
+            self._weights[request.queue] = max(1, weight)
+            self._queued_images += len(request.images)
+            self._queued_bytes += sum(request.nbytes)
+            self._cond.notify()
+        return request.future
+
+    def run_model_on_images(self, images: Iterable, session_id: str,
+                            duplicates: Optional[str] = None) -> List[DetectionResult]:
+        """
+        Blocking submit; same signature as model_service.run_model_on_images,
+        plus the near-duplicate mode (services.frame_dedup, default DEDUP_MODE).
+        """
+        from services.frame_dedup import run_deduplicated
+
+        return run_deduplicated(
+            images, session_id, lambda batch: self.submit(batch, session_id).result(), duplicates
+        )
+
+    def run_model_on_blobs(
+        self, blob_paths: Iterable[str], session_id: str, batch_size: int = BACKFILL_BATCH_SIZE,
+        duplicates: Optional[str] = None, **prefetch_kwargs
+    ) -> Iterator[List[DetectionResult]]:
+        """
+        Backfill through the scheduler, in a lower-weight queue of its own:
+        its batches share model calls with uploads instead of holding the
+        model to themselves.
+        """
+        from services.frame_dedup import run_deduplicated
+        from services.image_prefetch import iter_prefetched_batches
+
+        def infer(batch):
+            return self.submit(
+                batch, session_id, queue=f"{session_id}/backfill", weight=SCHEDULER_BACKFILL_WEIGHT
+            ).result()
+
+        for batch in iter_prefetched_batches(blob_paths, batch_size, **prefetch_kwargs):
+            yield run_deduplicated(batch, session_id, infer, duplicates)
+
+    def _take(self, request: _Request, count: int) -> tuple:
+        start = request.next_index
+        stop = min(len(request.images), start + count)
+        request.next_index = stop
+        self._queued_images -= stop - start
+        self._queued_bytes -= sum(request.nbytes[start:stop])
+        return request, start, stop
+
+    def _take_batch(self) -> list:
+        """
+        Wait for a batch to fill or its deadline to pass, then take it off the
+        queues as (request, start, stop) slices. Returns [] once closed.
+        """
+        with self._cond:
+            while not self._queues and not self._closed:
+                self._cond.wait()
+            if not self._queues:
+                return []
+            if self.max_batch_size <= 0:
+                queue, requests = next(iter(self._queues.items()))
+                request = requests.popleft()
+                self._rotate(queue, requests)
+                return [self._take(request, len(request.images))]
+            deadline = min(requests[0].submitted for requests in self._queues.values()) + self.max_wait
+            while self._queued_images < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            slices = []
+            room = self.max_batch_size
+            while room and self._queues:
+                queue, requests = next(iter(self._queues.items()))
+                quota = min(room, self._weights[queue])
+                while quota and requests:
+                    request = requests[0]
+                    request_slice = self._take(request, quota)
+                    taken = request_slice[2] - request_slice[1]
+                    # Consecutive slices of one request are merged
+                    if slices and slices[-1][0] is request:
+                        slices[-1] = (request, slices[-1][1], request_slice[2])
+                    else:
+                        slices.append(request_slice)
+                    quota -= taken
+                    room -= taken
+                    if request.next_index == len(request.images):
+                        requests.popleft()
+                self._rotate(queue, requests)
+            return slices
+
+    def _rotate(self, queue: str, requests: deque):
+        # Called with the lock held: move a served queue to the back, or drop it once empty
+        if requests:
+            self._queues.move_to_end(queue)
+        else:
+            del self._queues[queue]
+            del self._weights[queue]
+
+    def _run(self):
+        while True:
+            slices = self._take_batch()
+            if not slices:
+                return
+            started = time.monotonic()
+            for request, start, _ in slices:
+                if start == 0:
+                    BATCH_QUEUE_SECONDS.observe(started - request.submitted)
+            images = sum(stop - start for _, start, stop in slices)
+            BATCH_IMAGES.observe(images)
+            BATCH_REQUESTS.observe(len(slices))
+            try:
+                self._dispatch(slices)
+            except Exception as err:
+                # Fail this batch's callers rather than the worker thread, which
+                # would leave every queued and later request waiting forever
+                logger.exception(f"Dispatching a batch of {images} images failed: {err}")
+                for request, _, _ in slices:
+                    self._fail(request, err)
+                continue
+            rate = images / max(time.monotonic() - started, 1e-6)
+            with self._cond:
+                self._images_per_second = rate if not self._images_per_second else (
+                    0.8 * self._images_per_second + 0.2 * rate
+                )
+
+    def _dispatch(self, slices: list):
+        images = [image for request, start, stop in slices for image in request.images[start:stop]]
+        first = slices[0][0]
+        try:
+            # Spans of the shared call nest under the first caller's trace
+            results = first.context.run(self.run_batch, images, first.session_id)
+            if len(results) != len(images):
+                # Slicing would hand callers each other's results
+                raise RuntimeError(f"Model returned {len(results)} results for {len(images)} images")
+        except Exception as err:
+            if len(slices) == 1:
+                self._fail(first, err)
+                return
+            # Retry each caller's share alone so one bad input does not fail the others
+            logger.warning(f"Batch of {len(images)} images from {len(slices)} requests failed ({err}); retrying apart")
+            for request_slice in slices:
+                self._dispatch([request_slice])
+            return
+        offset = 0
+        for request, start, stop in slices:
+            request.results[start:stop] = results[offset:offset + stop - start]
+            offset += stop - start
+            request.remaining -= stop - start
+            if request.remaining == 0 and not request.future.done():
+                request.future.set_result(request.results)
+
+    def _fail(self, request: _Request, err: Exception):
+        if request.future.done():
+            return
+        request.future.set_exception(err)
+        # Drop the rest of a failed request instead of running it for nothing
+        with self._cond:
+            requests = self._queues.get(request.queue)
+            if requests is not None and request in requests:
+                requests.remove(request)
+                self._take(request, len(request.images))
+                if not requests:
+                    del self._queues[request.queue]
+                    del self._weights[request.queue]
+
+    def close(self):
+        """
+        Stop the worker once the queued images have been processed.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+
+def _model_service_batch(images: List, session_id: str) -> List[DetectionResult]:
+    import services.model_service as model_service
+    return model_service.run_model_on_images(images, session_id)
+
+
+_scheduler: Optional[BatchScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> BatchScheduler:
+    """
+    The process-wide scheduler in front of the model service.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = BatchScheduler()
+        return _scheduler
+
+
+def _stat(key: str):
+    return lambda: _scheduler.stats()[key] if _scheduler is not None else 0
+
+
+register_metric(Gauge(
+    "dugong_inference_queued_images", "Images waiting in the batch scheduler for a model call.",
+    _stat("queued_images")
+))
+register_metric(Gauge(
+    "dugong_inference_queued_megabytes", "Decoded image data waiting in the batch scheduler.", _stat("queued_mb")
+))
+register_metric(Gauge(
+    "dugong_inference_queues", "Session and backfill queues with images waiting.", _stat("queues")
+))
+register_metric(Gauge(
+    "dugong_admission_in_flight", "Admitted uploads not yet finished, as requests and images.",
+    lambda: {("requests",): _stat("admitted_requests")(), ("images",): _stat("admitted_images")()},
+    ("resource",)
+))
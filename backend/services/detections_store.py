@@ -0,0 +1,242 @@
+"""
+Columnar per-session detections store and bulk YOLO export.
+
+All detections of a session live in one NumPy archive,
+{session_id}/detections.npz, with one row per box:
+
+    image   (N,)   image filename
+    cls     (N,)   class id (int16)
+    xywhn   (N, 4) normalized center-x, center-y, width, height (float32)
+    conf    (N,)   confidence (float32)
+
+plus `images`, every processed filename (including frames without
+detections), so exports also cover empty frames.
+
+Writes are read-modify-write guarded by the blob generation, so concurrent
+uploads and backfills of the same session do not lose each other's rows.
+"""
+import io
+import tarfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from core.logger import setup_logger
+from services.GCS_service import GCSService
+
+logger = setup_logger("detections_store", "logs/detections_store.log")
+
+CLASS_NAMES = {0: "dugong", 1: "calf"}
+_WRITE_RETRIES = 5
+_EXPORT_PREFETCH = 4
+
+
+def detections_blob_path(session_id: str) -> str:
+    return f"{session_id}/detections.npz"
+
+
+def format_yolo_labels(cls: np.ndarray, xywhn: np.ndarray) -> str:
+    """
+    Format boxes as YOLO label lines: "<class> <cx> <cy> <w> <h>".
+    """
+    if not len(cls):
+        return ""
+    buf = io.StringIO()
+    np.savetxt(buf, np.column_stack([cls, xywhn]), fmt=["%d", "%.6f", "%.6f", "%.6f", "%.6f"])
+    return buf.getvalue()
+
+
+def _empty() -> Dict[str, np.ndarray]:
+    return {
+        "images": np.array([], dtype=str),
+        "image": np.array([], dtype=str),
+        "cls": np.zeros(0, dtype=np.int16),
+        "xywhn": np.zeros((0, 4), dtype=np.float32),
+        "conf": np.zeros(0, dtype=np.float32)
+    }
+
+
+def _read(session_id: str) -> Tuple[Dict[str, np.ndarray], int]:
+    """
+    Load the store and the generation it was read at (0 if it does not exist).
+    """
+    blob = GCSService.get_bucket().get_blob(detections_blob_path(session_id))
+    if blob is None:
+        return _empty(), 0
+    try:
+        data = blob.download_as_bytes(if_generation_match=blob.generation)
+    except (NotFound, PreconditionFailed):
+        # Replaced between the metadata read and the download; caller retries
+        raise PreconditionFailed("detections store changed while reading")
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}, blob.generation
+
+
+def load_detections(session_id: str) -> Dict[str, np.ndarray]:
+    for _ in range(_WRITE_RETRIES):
+        try:
+            return _read(session_id)[0]
+        except PreconditionFailed:
+            continue
+    return _read(session_id)[0]
+
+
+def append_detections(session_id: str, results: Iterable) -> None:
+    """
+    Add the detections of processed images to the session store.
+
+    Rows already stored for the same images are replaced, so re-processing
+    an image (e.g. a resumed backfill) does not duplicate its boxes.
+
+    Args:
+        session_id: Session the images belong to
+        results: DetectionResult entries from run_model_on_images
+    """
+    results = [r for r in results if r.cls is not None]
+    if not results:
+        return
+
+    names = [r.image_name for r in results]
+    new_image = np.concatenate([np.full(len(r.cls), r.image_name) for r in results]).astype(str)
+    new_cls = np.concatenate([np.asarray(r.cls, dtype=np.int16) for r in results])
+    new_xywhn = np.concatenate([np.asarray(r.xywhn, dtype=np.float32).reshape(-1, 4) for r in results])
+    new_conf = np.concatenate([np.asarray(r.conf, dtype=np.float32) for r in results])
+
+    for attempt in range(_WRITE_RETRIES):
+        try:
+            store, generation = _read(session_id)
+            keep = ~np.isin(store["image"], names)
+            merged = {
+                "images": np.union1d(store["images"], names),
+                "image": np.concatenate([store["image"][keep], new_image]),
+                "cls": np.concatenate([store["cls"][keep], new_cls]),
+                "xywhn": np.concatenate([store["xywhn"][keep], new_xywhn]),
+                "conf": np.concatenate([store["conf"][keep], new_conf])
+            }
+            buf = io.BytesIO()
+            np.savez_compressed(buf, **merged)
+            GCSService.get_bucket().blob(detections_blob_path(session_id)).upload_from_string(
+                buf.getvalue(), content_type="application/octet-stream", if_generation_match=generation
+            )
+            return
+        except PreconditionFailed:
+            logger.info(f"Detections store for {session_id} changed concurrently, retrying ({attempt + 1})")
+            time.sleep(0.05 * (attempt + 1))
+    raise RuntimeError(f"Could not update detections store for session {session_id}")
+
+
+def iter_yolo_labels(store: Dict[str, np.ndarray]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (image filename, YOLO label text) for every image in the store.
+    """
+    order = np.argsort(store["image"], kind="stable")
+    image = store["image"][order]
+    names, starts = np.unique(image, return_index=True)
+    bounds = dict(zip(names.tolist(), zip(starts.tolist(), np.append(starts[1:], len(image)).tolist())))
+    for name in store["images"].tolist():
+        start, end = bounds.get(name, (0, 0))
+        rows = order[start:end]
+        yield name, format_yolo_labels(store["cls"][rows], store["xywhn"][rows])
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only, non-seekable file object that collects written bytes so an
+    archive can be streamed out chunk by chunk instead of staged on disk.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_image_bytes(session_id: str, names: List[str]) -> Iterator[Tuple[str, bytes]]:
+    """
+    Fetch original images a few ahead of the archive writer; images that are
+    no longer in images/ (e.g. moved to False positives) are skipped.
+    """
+    bucket = GCSService.get_bucket()
+
+    def fetch(name):
+        try:
+            return bucket.blob(f"{session_id}/images/{name}").download_as_bytes()
+        except NotFound:
+            return None
+
+    pending = deque()
+    names_iter = iter(names)
+    with ThreadPoolExecutor(max_workers=_EXPORT_PREFETCH) as pool:
+        while True:
+            while len(pending) < _EXPORT_PREFETCH:
+                name = next(names_iter, None)
+                if name is None:
+                    break
+                pending.append((name, pool.submit(fetch, name)))
+            if not pending:
+                return
+            name, future = pending.popleft()
+            data = future.result()
+            if data is not None:
+                yield name, data
+
+
+def _dataset_yaml() -> bytes:
+    lines = ["path: .", "train: images", "val: images", "names:"]
+    lines += [f"  {cls_id}: {name}" for cls_id, name in CLASS_NAMES.items()]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _archive_entries(session_id: str, include_images: bool) -> Iterator[Tuple[str, bytes]]:
+    store = load_detections(session_id)
+    yield "data.yaml", _dataset_yaml()
+    for name, labels in iter_yolo_labels(store):
+        yield f"labels/{Path(name).stem}.txt", labels.encode("utf-8")
+    if include_images:
+        for name, data in _iter_image_bytes(session_id, store["images"].tolist()):
+            yield f"images/{name}", data
+
+
+def stream_session_export(session_id: str, fmt: str = "zip", include_images: bool = True) -> Iterator[bytes]:
+    """
+    Stream a YOLO-format dataset (labels, images, data.yaml) for the session
+    as a ZIP or TAR archive, one entry at a time.
+    """
+    sink = _ChunkSink()
+    if fmt == "tar":
+        with tarfile.open(fileobj=sink, mode="w|") as archive:
+            for arcname, data in _archive_entries(session_id, include_images):
+                info = tarfile.TarInfo(arcname)
+                info.size = len(data)
+                info.mtime = int(time.time())
+                archive.addfile(info, io.BytesIO(data))
+                yield sink.drain()
+    else:
+        with zipfile.ZipFile(sink, mode="w") as archive:
+            for arcname, data in _archive_entries(session_id, include_images):
+                # JPEG/PNG are already compressed; only deflate the label text
+                compress = zipfile.ZIP_STORED if arcname.startswith("images/") else zipfile.ZIP_DEFLATED
+                archive.writestr(arcname, data, compress_type=compress)
+                yield sink.drain()
+    yield sink.drain()
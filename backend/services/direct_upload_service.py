@@ -0,0 +1,158 @@
+"""
+Direct-to-storage uploads: the browser sends raw images straight to GCS
+instead of through nginx and the API.
+
+1. /upload-urls/ validates the announced files (name, type, size) and signs a
+   resumable-upload URL for each `{session_id}/images/{filename}` blob. The
+   browser POSTs to it with `x-goog-resumable: start` and PUTs the file, in
+   chunks, to the session URI returned in Location. An interrupted upload
+   resumes from the offset GCS reports (308 + Range).
+2. Completion enqueues inference for the new blobs through the session
+   backfill (services.backfill_service.request_backfill). It is triggered
+   either by the browser calling /upload-complete/, or by a GCS
+   OBJECT_FINALIZE notification pushed through Pub/Sub to /storage-events/.
+   The second path also covers browsers that vanish before calling back.
+   Signed uploads carry UPLOAD_MODE_METADATA, so notifications for images
+   stored by /upload-multiple/ (processed inline) are ignored.
+
+The API only signs URLs (no storage round trip) and reads blob metadata;
+image bytes never pass through the Python process on the way in.
+"""
+import base64
+import json
+from pathlib import Path
+from typing import List, Optional
+
+from core.config import ALLOWED_EXTENSIONS, DIRECT_UPLOAD_URL_MINUTES, MAX_FILE_SIZE
+from core.logger import setup_logger
+from services.GCS_service import GCSService
+
+logger = setup_logger("direct_upload", "logs/direct_upload.log")
+
+# Custom metadata the browser must send with the signed upload (it is part of the signature)
+UPLOAD_MODE_METADATA = ("upload-mode", "direct")
+
+
+def image_blob_path(session_id: str, filename: str) -> str:
+    return f"{session_id}/images/{filename}"
+
+
+def _rejection(filename: str, content_type: str, size: int) -> Optional[str]:
+    if not filename or Path(filename).name != filename or filename.startswith("."):
+        return "invalid filename"
+    if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        return "invalid file type"
+    if not content_type.startswith("image/"):
+        return "not an image"
+    if size > MAX_FILE_SIZE:
+        return "file too large"
+    return None
+
+
+def _processed_filenames(session_id: str) -> set:
+    try:
+        metadata = GCSService.download_json(f"{session_id}/session_metadata.json")
+    except FileNotFoundError:
+        return set()
+    return {f["filename"] for f in metadata.get("files", [])}
+
+
+def issue_upload_urls(session_id: str, files: List[dict]) -> dict:
+    """
+    Signed resumable-upload URLs for the files the browser is about to send.
+
+    Args:
+        session_id: Session the images are uploaded to
+        files: {"filename", "contentType", "size"} per file
+
+    Returns:
+        {"uploads": [{"filename", "blobPath", "uploadUrl", "uploadHeaders"}],
+         "skipped": [filenames already processed], "rejected": [{"filename", "reason"}]}
+        uploadHeaders are the headers to start the resumable upload with.
+    """
+    processed = _processed_filenames(session_id)
+    uploads, skipped, rejected = [], [], []
+    for spec in files:
+        filename, content_type = spec["filename"], spec["contentType"]
+        reason = _rejection(filename, content_type, spec["size"])
+        if reason:
+            rejected.append({"filename": filename, "reason": reason})
+            continue
+        if filename in processed:
+            skipped.append(filename)
+            continue
+        blob_path = image_blob_path(session_id, filename)
+        metadata_header = f"x-goog-meta-{UPLOAD_MODE_METADATA[0]}"
+        headers = {metadata_header: UPLOAD_MODE_METADATA[1]}
+        uploads.append({
+            "filename": filename,
+            "blobPath": blob_path,
+            "uploadUrl": GCSService.generate_resumable_upload_url(
+                blob_path, content_type, DIRECT_UPLOAD_URL_MINUTES, headers
+            ),
+            "uploadHeaders": {"x-goog-resumable": "start", "Content-Type": content_type, **headers},
+        })
+    logger.info(f"Issued {len(uploads)} upload URL(s) for session {session_id}")
+    return {"uploads": uploads, "skipped": skipped, "rejected": rejected}
+
+
+def verify_uploads(session_id: str, filenames: List[str]) -> dict:
+    """
+    Check that the announced uploads arrived. Blobs over MAX_FILE_SIZE are
+    deleted (a signed URL cannot cap the size on its own).
+
+    Returns:
+        {"accepted": [...], "missing": [...], "rejected": [{"filename", "reason"}]}
+    """
+    bucket = GCSService.get_bucket()
+    accepted, missing, rejected = [], [], []
+    for filename in filenames:
+        reason = _rejection(filename, "image/", 0)
+        if reason:
+            rejected.append({"filename": filename, "reason": reason})
+            continue
+        blob = bucket.get_blob(image_blob_path(session_id, filename))
+        if blob is None:
+            missing.append(filename)
+        elif blob.size > MAX_FILE_SIZE:
+            blob.delete()
+            rejected.append({"filename": filename, "reason": "file too large"})
+        else:
+            accepted.append(filename)
+    return {"accepted": accepted, "missing": missing, "rejected": rejected}
+
+
+def session_of_image_blob(name: str) -> Optional[str]:
+    """
+    Session id of a `{session_id}/images/{filename}` blob name, else None.
+    """
+    parts = name.split("/")
+    if len(parts) != 3 or parts[1] != "images" or not parts[0] or not parts[2]:
+        return None
+    if Path(parts[2]).suffix.lower() not in ALLOWED_EXTENSIONS:
+        return None
+    return parts[0]
+
+
+def parse_storage_event(envelope: dict) -> Optional[str]:
+    """
+    Blob name from a Pub/Sub push message carrying a GCS OBJECT_FINALIZE
+    notification (JSON_API_V1 payload) for a direct upload to this bucket,
+    or None for anything else.
+    """
+    message = envelope.get("message") or {}
+    attributes = message.get("attributes") or {}
+    if attributes.get("eventType") != "OBJECT_FINALIZE":
+        return None
+    if attributes.get("bucketId") != GCSService.BUCKET_NAME:
+        return None
+    try:
+        resource = json.loads(base64.b64decode(message.get("data") or ""))
+    except ValueError:
+        return None
+    if not isinstance(resource, dict):
+        return None
+    key, value = UPLOAD_MODE_METADATA
+    if (resource.get("metadata") or {}).get(key) != value:
+        return None
+    return resource.get("name") or attributes.get("objectId") or None
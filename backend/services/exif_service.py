@@ -0,0 +1,160 @@
+"""
+Position and capture time of survey images, from their EXIF (and DJI XMP)
+metadata.
+
+Only the JPEG header segments are parsed; the pixels are never decoded, so
+extraction costs microseconds on bytes already in memory (uploads), and a
+ranged read of EXIF_HEADER_BYTES for images already in storage (backfills).
+"""
+import io
+import re
+import struct
+from datetime import datetime, timedelta
+from typing import Optional
+
+from PIL import ExifTags, Image
+
+from core.config import EXIF_HEADER_BYTES
+from core.logger import setup_logger
+from services.GCS_service import GCSService
+
+logger = setup_logger("exif", "logs/exif.log")
+
+_EXIF_PREFIX = b"Exif\x00\x00"
+_XMP_PREFIX = b"http://ns.adobe.com/xap/1.0/\x00"
+_RELATIVE_ALTITUDE = re.compile(rb'drone-dji:RelativeAltitude(?:="|>)([+-]?[0-9.]+)')
+
+# GPS IFD tags
+_LAT_REF, _LAT, _LON_REF, _LON, _ALT_REF, _ALT, _TIME, _DATE = 1, 2, 3, 4, 5, 6, 7, 29
+# Exif IFD tags
+_DATETIME_ORIGINAL, _OFFSET_TIME_ORIGINAL = 36867, 36881
+
+
+def _jpeg_app_segments(data: bytes) -> dict:
+    """
+    Exif and XMP APP1 payloads of a JPEG, read up to the start of scan.
+    A truncated header (a ranged read) yields whatever segments it holds.
+    """
+    segments = {}
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xDA or marker == 0xD9:
+            break
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        payload = data[pos + 4:pos + 2 + length]
+        if marker == 0xE1 and payload.startswith(_EXIF_PREFIX):
+            segments.setdefault("exif", payload)
+        elif marker == 0xE1 and payload.startswith(_XMP_PREFIX):
+            segments.setdefault("xmp", payload)
+        pos += 2 + length
+    return segments
+
+
+def _read_exif(data: bytes) -> tuple:
+    if data[:2] == b"\xff\xd8":
+        segments = _jpeg_app_segments(data)
+        exif = None
+        if "exif" in segments:
+            exif = Image.Exif()
+            exif.load(segments["exif"])
+        return exif, segments.get("xmp")
+    # PNG/WebP keep EXIF in a chunk that needs the container parsed
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return img.getexif(), None
+    except (OSError, SyntaxError, ValueError):
+        return None, None
+
+
+def _degrees(dms, ref) -> float:
+    degrees, minutes, seconds = (float(v) for v in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if ref in ("S", "W") else value
+
+
+def _capture_time(gps: dict, exif_ifd: dict) -> Optional[datetime]:
+    """
+    Capture time in UTC: the GPS timestamp when present, else
+    DateTimeOriginal shifted by OffsetTimeOriginal (left as camera local
+    time when the offset is missing).
+    """
+    if _DATE in gps and _TIME in gps:
+        try:
+            day = datetime.strptime(str(gps[_DATE]).strip(), "%Y:%m:%d")
+            hours, minutes, seconds = (float(v) for v in gps[_TIME])
+            return day + timedelta(hours=hours, minutes=minutes, seconds=seconds)
+        except (ValueError, TypeError, ZeroDivisionError):
+            pass
+    original = exif_ifd.get(_DATETIME_ORIGINAL)
+    if not original:
+        return None
+    try:
+        taken = datetime.strptime(str(original).strip(), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    offset = str(exif_ifd.get(_OFFSET_TIME_ORIGINAL) or "").strip()
+    if re.fullmatch(r"[+-]\d{2}:\d{2}", offset):
+        sign = -1 if offset[0] == "-" else 1
+        taken -= sign * timedelta(hours=int(offset[1:3]), minutes=int(offset[4:6]))
+    return taken
+
+
+def extract_geo(data: bytes) -> Optional[dict]:
+    """
+    GPS position, altitude and capture time of an encoded image.
+
+    Args:
+        data: The image bytes, or at least their first EXIF_HEADER_BYTES
+
+    Returns:
+        {"lat", "lon", "altitude", "relativeAltitude", "takenAt"} (altitudes
+        in metres, takenAt ISO 8601 UTC; each may be None except lat/lon),
+        or None when the image carries no usable GPS position
+    """
+    try:
+        exif, xmp = _read_exif(data)
+        if exif is None:
+            return None
+        gps = exif.get_ifd(ExifTags.IFD.GPSInfo)
+        if _LAT not in gps or _LON not in gps:
+            return None
+        lat = _degrees(gps[_LAT], gps.get(_LAT_REF))
+        lon = _degrees(gps[_LON], gps.get(_LON_REF))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+            return None
+
+        altitude = None
+        if _ALT in gps:
+            altitude = float(gps[_ALT])
+            if gps.get(_ALT_REF) in (1, b"\x01"):
+                altitude = -altitude
+        relative_altitude = None
+        match = _RELATIVE_ALTITUDE.search(xmp) if xmp else None
+        if match:
+            relative_altitude = float(match.group(1))
+        taken_at = _capture_time(gps, exif.get_ifd(ExifTags.IFD.Exif))
+    except (ValueError, TypeError, ZeroDivisionError, struct.error, SyntaxError) as err:
+        logger.debug(f"Unreadable EXIF: {err}")
+        return None
+
+    return {
+        "lat": round(lat, 7),
+        "lon": round(lon, 7),
+        "altitude": round(altitude, 2) if altitude is not None else None,
+        "relativeAltitude": relative_altitude,
+        "takenAt": taken_at.isoformat() if taken_at else None
+    }
+
+
+def read_blob_geo(blob_path: str) -> Optional[dict]:
+    """
+    extract_geo for an image already in storage, from a ranged read of its
+    first EXIF_HEADER_BYTES. Storage errors are logged and yield None.
+    """
+    try:
+        header = GCSService.get_bucket().blob(blob_path).download_as_bytes(start=0, end=EXIF_HEADER_BYTES - 1)
+    except Exception as err:
+        logger.warning(f"Could not read EXIF header of {blob_path}: {err}")
+        return None
+    return extract_geo(header)
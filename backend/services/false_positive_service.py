@@ -0,0 +1,105 @@
+"""
+Bulk reclassification of images as false positives.
+
+Reviewers correct many images at once; doing them one request at a time
+costs an existence check, a copy and a delete per image plus a full
+session_metadata.json download and re-upload each. Here the copy/delete
+pairs run concurrently and the metadata is updated once for the whole
+batch: re-read after the moves and written back only if nobody changed it
+in between (services.session_metadata), so the batch neither loses nor
+overwrites an upload that finished while the images were being moved.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from google.api_core.exceptions import NotFound
+
+from core.config import FALSE_POSITIVE_WORKERS
+from core.logger import setup_logger
+from services.GCS_service import GCSService
+from services.geo_index import set_image_classes
+from services.session_metadata import update_session_metadata
+
+logger = setup_logger("false_positive", "logs/false_positive.log")
+
+OPPOSITE_CLASS = {"feeding": "resting", "resting": "feeding"}
+
+
+def _move_blob(bucket, session_id: str, image_name: str, image_class: str):
+    source_blob = bucket.blob(f"{session_id}/images/{image_name}")
+    # copy_blob raises NotFound for a missing source, so no exists() round trip
+    bucket.copy_blob(source_blob, bucket, f"{session_id}/False positives/{image_class}/{image_name}")
+    source_blob.delete()
+
+
+def move_to_false_positives(session_id: str, moves: Iterable[Tuple[str, str]]) -> dict:
+    """
+    Move images to the session's "False positives/<opposite class>/" folder
+    and give them the opposite class in the session metadata.
+
+    Args:
+        session_id: Session the images belong to
+        moves: (image name, current class) pairs; names may carry a signed
+            URL query string, and the last entry for a name wins
+
+    Returns:
+        {"moved": [{"imageName", "imageClass"}], "notFound": [names],
+         "failed": [{"imageName", "error"}]}
+
+    Raises:
+        ValueError: If a class is not "feeding" or "resting"
+        FileNotFoundError: If the session has no metadata
+    """
+    targets = {}
+    for image_name, target_class in moves:
+        if target_class.lower() not in OPPOSITE_CLASS:
+            raise ValueError("Invalid targetClass. Must be 'feeding' or 'resting'.")
+        targets[image_name.split("?")[0]] = OPPOSITE_CLASS[target_class.lower()]
+
+    metadata = GCSService.download_json(f"{session_id}/session_metadata.json")
+    known = {f["filename"] for f in metadata.get("files", [])}
+
+    not_found = [name for name in targets if name not in known]
+    pending = {name: image_class for name, image_class in targets.items() if name in known}
+
+    bucket = GCSService.get_bucket()
+    moved, failed = {}, []
+
+    def move(item):
+        image_name, image_class = item
+        try:
+            _move_blob(bucket, session_id, image_name, image_class)
+            return image_name, image_class, None
+        except Exception as err:
+            return image_name, image_class, err
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(FALSE_POSITIVE_WORKERS, len(pending))) as pool:
+            for image_name, image_class, err in pool.map(move, pending.items()):
+                if err is None:
+                    moved[image_name] = image_class
+                elif isinstance(err, NotFound):
+                    not_found.append(image_name)
+                else:
+                    logger.error(f"Could not move {session_id}/{image_name}: {err}")
+                    failed.append({"imageName": image_name, "error": str(err)})
+
+    if moved:
+        def reclassify(latest: dict):
+            now = datetime.utcnow().isoformat()
+            for record in latest.get("files", []):
+                image_class = moved.get(record["filename"])
+                if image_class is not None:
+                    record["imageClass"] = image_class
+                    record["updatedAt"] = now
+
+        update_session_metadata(session_id, reclassify)
+        set_image_classes(session_id, moved)
+        logger.info(f"Moved {len(moved)} image(s) of session {session_id} to false positives")
+
+    return {
+        "moved": [{"imageName": name, "imageClass": image_class} for name, image_class in moved.items()],
+        "notFound": not_found,
+        "failed": failed
+    }
@@ -0,0 +1,308 @@
+"""
+Near-duplicate frame detection in front of the model.
+
+Every decoded frame gets two 64-bit perceptual hashes: a pHash (signs of the
+low 8x8 DCT coefficients of a 32x32 grey thumbnail, against their median)
+and a dHash (horizontal gradient signs of a 9x8 thumbnail). Both are
+computed for a whole batch at once in NumPy; only the per-frame resize
+is done by OpenCV. A frame is a near-duplicate of an earlier one when
+both hashes are within DEDUP_MAX_DISTANCE bits (Hamming distance).
+Requiring both keeps false matches on featureless water rare.
+
+Hashes of processed frames are kept per session in {session_id}/frame_index.npz,
+together with each frame's class, counts and boxes, so a later frame can
+reuse a result without the detections store having been written yet.
+Writes are guarded by the blob generation, as in services.detections_store.
+
+Modes (DEDUP_MODE, or per request):
+
+    off   every frame is inferred, nothing is hashed
+    flag  every frame is inferred; near-duplicates are marked (duplicate_of)
+    skip  near-duplicates are not inferred: they reuse the matched frame's
+          boxes and class, rendered over their own pixels (reused=True)
+
+Perceptual hashes match frames of the same scene: hovering, bursts, re-shot
+frames. Consecutive frames of a moving survey that only overlap are shifted
+too far to match. In skip mode an animal that appears in the duplicate but
+not in the original frame is missed, so it is opt-in. So is flag: both modes
+read and rewrite the whole frame index for every batch, and the default
+(off) skips that storage round trip.
+"""
+import io
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from core.config import DEDUP_MAX_DISTANCE, DEDUP_MODE
+from core.logger import setup_logger
+from core.telemetry import Counter, register_metric, span
+from schemas.detection import DetectionResult
+from services.GCS_service import GCSService
+from services.detections_store import format_yolo_labels
+
+logger = setup_logger("frame_dedup", "logs/frame_dedup.log")
+
+DEDUP_MODES = ("off", "flag", "skip")
+
+DEDUP_FRAMES = register_metric(Counter(
+    "dugong_dedup_frames_total", "Frames checked for near-duplicates, by outcome.", ("outcome",)
+))
+
+_WRITE_RETRIES = 5
+_DCT_SIZE = 32
+_HASH_SIDE = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix.astype(np.float32)
+
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """(N, 64) booleans -> (N,) uint64."""
+    return np.packbits(bits, axis=1).view(">u8").astype(np.uint64).ravel()
+
+
+def frame_hashes(images: List[np.ndarray]) -> np.ndarray:
+    """
+    pHash and dHash of BGR (or grey) images.
+
+    Returns:
+        (N, 2) uint64 array: pHash, dHash per image
+    """
+    if not images:
+        return np.zeros((0, 2), dtype=np.uint64)
+    thumbs, gradients = [], []
+    for image in images:
+        grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        thumb = cv2.resize(grey, (_DCT_SIZE, _DCT_SIZE), interpolation=cv2.INTER_AREA)
+        thumbs.append(thumb)
+        gradients.append(cv2.resize(thumb, (_HASH_SIDE + 1, _HASH_SIDE), interpolation=cv2.INTER_AREA))
+    thumbs = np.stack(thumbs).astype(np.float32)
+    gradients = np.stack(gradients).astype(np.int16)
+
+    low = (_DCT @ thumbs @ _DCT.T)[:, :_HASH_SIDE, :_HASH_SIDE].reshape(len(images), -1)
+    # The DC term only tracks brightness; leave it out of the median
+    phash = _pack_bits(low > np.median(low[:, 1:], axis=1, keepdims=True))
+    dhash = _pack_bits((gradients[:, :, 1:] > gradients[:, :, :-1]).reshape(len(images), -1))
+    return np.column_stack([phash, dhash])
+
+
+def hash_distances(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    (N, M) distances between two sets of frame_hashes: the larger of the
+    pHash and dHash Hamming distances.
+    """
+    return np.bitwise_count(a[:, None, :] ^ b[None, :, :]).max(axis=2)
+
+
+def frame_index_blob_path(session_id: str) -> str:
+    return f"{session_id}/frame_index.npz"
+
+
+def _empty_index() -> Dict[str, np.ndarray]:
+    return {
+        "image": np.array([], dtype=str),
+        "hashes": np.zeros((0, 2), dtype=np.uint64),
+        "image_class": np.array([], dtype=str),
+        "box_image": np.array([], dtype=str),
+        "cls": np.zeros(0, dtype=np.int16),
+        "xywhn": np.zeros((0, 4), dtype=np.float32),
+        "conf": np.zeros(0, dtype=np.float32)
+    }
+
+
+def _read_index(session_id: str) -> Tuple[Dict[str, np.ndarray], int]:
+    blob = GCSService.get_bucket().get_blob(frame_index_blob_path(session_id))
+    if blob is None:
+        return _empty_index(), 0
+    try:
+        data = blob.download_as_bytes(if_generation_match=blob.generation)
+    except (NotFound, PreconditionFailed):
+        raise PreconditionFailed("frame index changed while reading")
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return {key: npz[key] for key in npz.files}, blob.generation
+
+
+def load_frame_index(session_id: str) -> Dict[str, np.ndarray]:
+    for _ in range(_WRITE_RETRIES):
+        try:
+            return _read_index(session_id)[0]
+        except PreconditionFailed:
+            continue
+    return _read_index(session_id)[0]
+
+
+def _append_index(session_id: str, hashes: np.ndarray, results: List[DetectionResult]):
+    """
+    Add processed frames to the session's index, replacing entries of the
+    same filenames.
+    """
+    names = [r.image_name for r in results]
+    with_boxes = [r for r in results if r.cls is not None]
+    new = {
+        "image": np.array(names, dtype=str),
+        "hashes": hashes,
+        "image_class": np.array([r.image_class for r in results], dtype=str),
+        "box_image": np.concatenate(
+            [np.full(len(r.cls), r.image_name) for r in with_boxes] or [np.array([], dtype=str)]
+        ).astype(str),
+        "cls": np.concatenate([np.asarray(r.cls, dtype=np.int16) for r in with_boxes] or [np.zeros(0, np.int16)]),
+        "xywhn": np.concatenate(
+            [np.asarray(r.xywhn, dtype=np.float32).reshape(-1, 4) for r in with_boxes] or [np.zeros((0, 4), np.float32)]
+        ),
+        "conf": np.concatenate([np.asarray(r.conf, dtype=np.float32) for r in with_boxes] or [np.zeros(0, np.float32)])
+    }
+    for attempt in range(_WRITE_RETRIES):
+        try:
+            index, generation = _read_index(session_id)
+            keep = ~np.isin(index["image"], names)
+            keep_boxes = ~np.isin(index["box_image"], names)
+            merged = {
+                key: np.concatenate([index[key][keep if key in ("image", "hashes", "image_class") else keep_boxes],
+                                     new[key]])
+                for key in new
+            }
+            buf = io.BytesIO()
+            np.savez_compressed(buf, **merged)
+            GCSService.get_bucket().blob(frame_index_blob_path(session_id)).upload_from_string(
+                buf.getvalue(), content_type="application/octet-stream", if_generation_match=generation
+            )
+            return
+        except PreconditionFailed:
+            time.sleep(0.05 * (attempt + 1))
+    raise RuntimeError(f"Could not update frame index for session {session_id}")
+
+
+def _match(hashes: np.ndarray, names: List[str], index: Dict[str, np.ndarray],
+           max_distance: int) -> List[Optional[str]]:
+    """
+    For each frame, the name of the closest earlier frame within
+    max_distance: an indexed frame, or a unique frame earlier in the batch.
+    """
+    known = hash_distances(hashes, index["hashes"]) if len(index["image"]) else np.zeros((len(names), 0), int)
+    # Re-processing an image must not match its own entry
+    known[np.asarray(names)[:, None] == index["image"][None, :]] = max_distance + 1
+    within = hash_distances(hashes, hashes)
+
+    matches: List[Optional[str]] = []
+    unique: List[int] = []
+    for i, name in enumerate(names):
+        best, best_distance = None, max_distance + 1
+        if known.shape[1]:
+            j = int(known[i].argmin())
+            if known[i, j] < best_distance:
+                best, best_distance = str(index["image"][j]), known[i, j]
+        for j in unique:
+            if within[i, j] < best_distance and names[j] != name:
+                best, best_distance = names[j], within[i, j]
+        matches.append(best)
+        if best is None:
+            unique.append(i)
+    return matches
+
+
+def _source_boxes(name: str, batch_results: Dict[str, DetectionResult], index: Dict[str, np.ndarray]) -> tuple:
+    """(image_class, cls, xywhn, conf) of a processed frame."""
+    result = batch_results.get(name)
+    if result is not None:
+        return result.image_class, result.cls, result.xywhn, result.conf
+    row = int(np.flatnonzero(index["image"] == name)[0])
+    rows = index["box_image"] == name
+    return str(index["image_class"][row]), index["cls"][rows], index["xywhn"][rows], index["conf"][rows]
+
+
+def _reused_results(images: List, matches: List[Optional[str]], batch_results: Dict[str, DetectionResult],
+                    index: Dict[str, np.ndarray]) -> Dict[int, DetectionResult]:
+    """
+    Results for skipped duplicates: the matched frame's boxes and class,
+    rendered over the duplicate's own pixels.
+    """
+    from services.render_service import submit_render
+
+    pending = []
+    for i, ((name, image), source) in enumerate(zip(images, matches)):
+        if source is None:
+            continue
+        image_class, cls, xywhn, conf = _source_boxes(source, batch_results, index)
+        cls = np.asarray(cls, dtype=np.int16)
+        xywhn = np.asarray(xywhn, dtype=np.float32).reshape(-1, 4)
+        height, width = image.shape[:2]
+        xyxy = np.column_stack([xywhn[:, :2] - xywhn[:, 2:] / 2, xywhn[:, :2] + xywhn[:, 2:] / 2]) * [
+            width, height, width, height
+        ]
+        pending.append((i, name, source, image_class, cls, xywhn, conf, submit_render(image, xyxy, cls)))
+
+    reused = {}
+    for i, name, source, image_class, cls, xywhn, conf, render in pending:
+        image_bytes, preview_bytes, renditions = render.result()
+        class_ids = cls.tolist()
+        reused[i] = DetectionResult(
+            class_ids.count(0), class_ids.count(1), image_class, image_bytes, format_yolo_labels(cls, xywhn), name,
+            preview_bytes, renditions, cls, xywhn, np.asarray(conf, dtype=np.float32), source, True
+        )
+    return reused
+
+
+def run_deduplicated(images: List, session_id: str, run_batch: Callable[[List], List[DetectionResult]],
+                     mode: Optional[str] = None, max_distance: int = DEDUP_MAX_DISTANCE) -> List[DetectionResult]:
+    """
+    Run `run_batch` on the frames that need inference and fill in the rest.
+
+    Args:
+        images: Decoded (filename, BGR array) pairs; paths are always inferred
+        session_id: Session whose frame index is matched and updated
+        run_batch: Inference for a list of images, one result per image
+        mode: "off", "flag" or "skip" (default DEDUP_MODE)
+        max_distance: Largest Hamming distance (per hash) of a near-duplicate
+
+    Returns:
+        One result per image, in input order
+    """
+    mode = mode or DEDUP_MODE
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown duplicates mode {mode!r}")
+    images = list(images)
+    if mode == "off" or not images or not all(isinstance(image, tuple) for image in images):
+        return run_batch(images)
+
+    names = [name for name, _ in images]
+    with span("frame_hash", images=len(images)):
+        hashes = frame_hashes([image for _, image in images])
+    try:
+        index = load_frame_index(session_id)
+    except Exception as err:
+        logger.warning(f"Frame index of {session_id} unavailable, inferring every frame: {err}")
+        index = _empty_index()
+    matches = _match(hashes, names, index, max_distance)
+    unique = [i for i, match in enumerate(matches) if match is None]
+
+    if mode == "flag":
+        results = [r._replace(duplicate_of=match) for r, match in zip(run_batch(images), matches)]
+    else:
+        inferred = run_batch([images[i] for i in unique]) if unique else []
+        batch_results = {r.image_name: r for r in inferred}
+        reused = _reused_results(images, matches, batch_results, index)
+        inferred_iter = iter(inferred)
+        results = [reused[i] if i in reused else next(inferred_iter) for i in range(len(images))]
+
+    duplicates = len(images) - len(unique)
+    DEDUP_FRAMES.inc("unique", amount=len(unique))
+    if duplicates:
+        DEDUP_FRAMES.inc("skipped" if mode == "skip" else "flagged", amount=duplicates)
+        logger.info(f"{duplicates}/{len(images)} near-duplicate frame(s) in session {session_id} ({mode})")
+
+    if unique:
+        try:
+            _append_index(session_id, hashes[unique], [results[i] for i in unique])
+        except Exception as err:
+            logger.warning(f"Could not update frame index of {session_id}: {err}")
+    return results
@@ -0,0 +1,233 @@
+"""
+Spatial index of processed images, for density maps across sessions
+without reading every session's metadata.
+
+One MongoDB document per geotagged image (collection detection_geo, see
+core.database), holding its position, geohash, capture time and detection
+counts. A bounding-box query is covered by at most GEO_QUERY_MAX_CELLS
+geohash cells; each becomes a prefix range on the (geohash, taken_at) index,
+and the exact box and time window are applied to what those ranges return.
+Boxes are placed at the image position: per-box coordinates would need the
+camera footprint, which the index does not model.
+
+The index is derived from session_metadata.json (file records carry `geo`),
+so write failures are logged rather than failing the upload.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from core.config import GEO_QUERY_MAX_CELLS
+from core.database import get_detection_geo_collection
+from core.logger import setup_logger
+
+logger = setup_logger("geo_index", "logs/geo_index.log")
+
+GEOHASH_PRECISION = 9
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+# Sorts after every base32 character: [cell, cell + _PREFIX_END) is the prefix range
+_PREFIX_END = "~"
+
+
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def geohash_center(cell: str) -> tuple:
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def _cell_size(precision: int) -> tuple:
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def cover_bbox(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               max_cells: int = GEO_QUERY_MAX_CELLS) -> List[str]:
+    """
+    Geohash cells that together cover the box: the finest precision that
+    needs no more than `max_cells` of them.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = range(int((min_lat + 90) // height), min(int((max_lat + 90) // height), int(180 / height) - 1) + 1)
+        cols = range(int((min_lon + 180) // width), min(int((max_lon + 180) // width), int(360 / width) - 1) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            return sorted({
+                geohash_encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+                for row in rows for col in cols
+            })
+    return []
+
+
+def index_images(session_id: str, file_records: Iterable[dict]) -> int:
+    """
+    Add or refresh the index entries of processed images.
+
+    Args:
+        session_id: Session the images belong to
+        file_records: session_metadata.json file records; those without a
+            `geo` position are skipped
+
+    Returns:
+        Number of images indexed
+    """
+    now = datetime.utcnow()
+    ops = []
+    for record in file_records:
+        geo = record.get("geo")
+        if not geo:
+            continue
+        taken_at = datetime.fromisoformat(geo["takenAt"]) if geo.get("takenAt") else None
+        ops.append(UpdateOne({"_id": f"{session_id}/{record['filename']}"}, {"$set": {
+            "session_id": session_id,
+            "filename": record["filename"],
+            "geohash": geohash_encode(geo["lat"], geo["lon"]),
+            "lat": geo["lat"],
+            "lon": geo["lon"],
+            "altitude": geo.get("altitude"),
+            "taken_at": taken_at,
+            "dugongs": record.get("dugongCount", 0),
+            "calves": record.get("calfCount", 0),
+            "image_class": record.get("imageClass"),
+            "indexed_at": now
+        }}, upsert=True))
+    if not ops:
+        return 0
+    try:
+        get_detection_geo_collection().bulk_write(ops, ordered=False)
+    except PyMongoError as err:
+        logger.error(f"Could not index {len(ops)} image(s) of session {session_id}: {err}")
+        return 0
+    return len(ops)
+
+
+def set_image_class(session_id: str, filename: str, image_class: str):
+    try:
+        get_detection_geo_collection().update_one(
+            {"_id": f"{session_id}/{filename}"}, {"$set": {"image_class": image_class}}
+        )
+    except PyMongoError as err:
+        logger.error(f"Could not update index entry {session_id}/{filename}: {err}")
+
+
+def set_image_classes(session_id: str, image_classes: dict):
+    """set_image_class for many images in one round trip ({filename: image_class})."""
+    if not image_classes:
+        return
+    try:
+        get_detection_geo_collection().bulk_write([
+            UpdateOne({"_id": f"{session_id}/{filename}"}, {"$set": {"image_class": image_class}})
+            for filename, image_class in image_classes.items()
+        ], ordered=False)
+    except PyMongoError as err:
+        logger.error(f"Could not update {len(image_classes)} index entries of session {session_id}: {err}")
+
+
+def remove_session(session_id: str) -> int:
+    try:
+        return get_detection_geo_collection().delete_many({"session_id": session_id}).deleted_count
+    except PyMongoError as err:
+        logger.error(f"Could not remove index entries of session {session_id}: {err}")
+        return 0
+
+
+def query_density(min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  precision: int = 6, session_id: Optional[str] = None) -> dict:
+    """
+    Image and detection counts per geohash cell inside a box and time window.
+
+    Args:
+        min_lat, min_lon, max_lat, max_lon: Box in degrees (no antimeridian wrap)
+        start, end: Capture time window in UTC, end exclusive; images without
+            a capture time are left out when either is given
+        precision: Geohash length of the returned cells (1-9)
+        session_id: Only count this session's images
+
+    Returns:
+        {"precision", "images", "dugongs", "calves",
+         "cells": [{"geohash", "lat", "lon", "images", "dugongs", "calves"}]}
+
+    Raises:
+        ValueError: If the box or precision is invalid
+    """
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise ValueError("Invalid bounding box")
+    if not 1 <= precision <= GEOHASH_PRECISION:
+        raise ValueError(f"precision must be between 1 and {GEOHASH_PRECISION}")
+
+    match = {
+        "$or": [{"geohash": {"$gte": cell, "$lt": cell + _PREFIX_END}}
+                for cell in cover_bbox(min_lat, min_lon, max_lat, max_lon)],
+        "lat": {"$gte": min_lat, "$lte": max_lat},
+        "lon": {"$gte": min_lon, "$lte": max_lon}
+    }
+    if start or end:
+        match["taken_at"] = {}
+        if start:
+            match["taken_at"]["$gte"] = start
+        if end:
+            match["taken_at"]["$lt"] = end
+    if session_id:
+        match["session_id"] = session_id
+
+    # $substr is byte-based, which is exact for the ASCII geohash alphabet
+    rows = get_detection_geo_collection().aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"$substr": ["$geohash", 0, precision]},
+            "images": {"$sum": 1},
+            "dugongs": {"$sum": "$dugongs"},
+            "calves": {"$sum": "$calves"}
+        }}
+    ])
+    cells = []
+    for row in sorted(rows, key=lambda r: r["_id"]):
+        lat, lon = geohash_center(row["_id"])
+        cells.append({
+            "geohash": row["_id"],
+            "lat": round(lat, 6),
+            "lon": round(lon, 6),
+            "images": row["images"],
+            "dugongs": row["dugongs"],
+            "calves": row["calves"]
+        })
+    return {
+        "precision": precision,
+        "images": sum(c["images"] for c in cells),
+        "dugongs": sum(c["dugongs"] for c in cells),
+        "calves": sum(c["calves"] for c in cells),
+        "cells": cells
+    }
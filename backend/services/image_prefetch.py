@@ -0,0 +1,159 @@
+"""
+Producer/consumer prefetching of inference inputs from GCS.
+
+A thread pool downloads and decodes upcoming images straight into memory
+(no temp files) while the caller runs the model on the current batch.
+Decoded images waiting to be consumed are bounded by a byte budget.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from core.config import PREFETCH_WORKERS, PREFETCH_DEPTH, PREFETCH_MAX_BYTES
+from core.telemetry import span, submit_in_context
+from services.GCS_service import GCSService
+
+DecodedImage = Tuple[str, np.ndarray]
+
+
+def fetch_blob_bytes(blob_path: str) -> bytes:
+    """
+    Download a GCS blob into memory.
+    """
+    return GCSService.get_bucket().blob(blob_path).download_as_bytes()
+
+
+def decode_image_bytes(data: bytes) -> np.ndarray:
+    """
+    Decode encoded image bytes into a BGR array, as cv2.imread would.
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image data")
+    return img
+
+
+class _MemoryBudget:
+    """
+    Byte budget for decoded images that have been prefetched but not yet
+    taken by the consumer.
+
+    Reservations are granted in submission order, so the image the consumer
+    waits for next is never starved by images queued behind it. A single
+    image larger than the whole budget is still admitted when nothing else
+    is held.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._next_seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self, seq: int, nbytes: int):
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._closed or (
+                    self._next_seq == seq and (self.used == 0 or self.used + nbytes <= self.max_bytes)
+                )
+            )
+            self.used += nbytes
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def skip(self, seq: int):
+        with self._cond:
+            self._cond.wait_for(lambda: self._closed or self._next_seq == seq)
+            self._next_seq += 1
+            self._cond.notify_all()
+
+    def release(self, nbytes: int):
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+    def close(self):
+        """Wake every waiting worker so the pool can shut down."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+def iter_prefetched_images(
+    blob_paths: Iterable[str],
+    fetch: Callable[[str], bytes] = fetch_blob_bytes,
+    workers: int = PREFETCH_WORKERS,
+    depth: int = PREFETCH_DEPTH,
+    max_bytes: int = PREFETCH_MAX_BYTES
+) -> Iterator[DecodedImage]:
+    """
+    Yield (filename, image) pairs in input order while up to `depth` images
+    ahead are fetched and decoded in the background.
+
+    Args:
+        blob_paths: Storage paths to fetch
+        fetch: Callable returning the encoded bytes for a path
+        workers: Download/decode threads
+        depth: Maximum images requested ahead of the consumer
+        max_bytes: Budget for decoded images not yet consumed
+    """
+    budget = _MemoryBudget(max_bytes)
+
+    def load(seq: int, blob_path: str) -> DecodedImage:
+        try:
+            with span("download"):
+                data = fetch(blob_path)
+            with span("decode"):
+                img = decode_image_bytes(data)
+        except BaseException:
+            budget.skip(seq)
+            raise
+        budget.acquire(seq, img.nbytes)
+        return Path(blob_path).name, img
+
+    paths = iter(blob_paths)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        seq = 0
+        try:
+            while True:
+                while len(pending) < max(1, depth):
+                    blob_path = next(paths, None)
+                    if blob_path is None:
+                        break
+                    pending.append(submit_in_context(pool, load, seq, blob_path))
+                    seq += 1
+                if not pending:
+                    return
+                name, img = pending.popleft().result()
+                budget.release(img.nbytes)
+                yield name, img
+        finally:
+            for future in pending:
+                future.cancel()
+            budget.close()
+
+
+def iter_prefetched_batches(
+    blob_paths: Iterable[str],
+    batch_size: int,
+    **kwargs
+) -> Iterator[List[DecodedImage]]:
+    """
+    Group iter_prefetched_images output into batches of `batch_size`.
+    Prefetching of the next batch continues while the caller processes one.
+    """
+    batch = []
+    for item in iter_prefetched_images(blob_paths, **kwargs):
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,181 @@
+"""
+Client side of the inference server (see services.inference_server).
+
+`inference_backend()` is what request handlers call inference through: with
+INFERENCE_SOCKET set it returns the process-wide InferenceClient, otherwise
+the in-process batch scheduler in front of services.model_service. Both expose
+run_model_on_images and run_model_on_blobs with the same signatures, so
+callers do not care which topology is running.
+"""
+import queue
+from multiprocessing.connection import Client
+from typing import Iterable, Iterator, List, Optional
+
+from core.config import (
+    BACKFILL_BATCH_SIZE,
+    INFERENCE_AUTHKEY,
+    INFERENCE_SHARED_MEMORY,
+    INFERENCE_SOCKET,
+    INFERENCE_TIMEOUT,
+)
+from schemas.detection import DetectionResult
+from services.batch_scheduler import SchedulerBusy
+from services.shared_frames import FramePool, pack_frames
+
+
+class InferenceError(RuntimeError):
+    """The inference server failed the request or could not be reached."""
+
+
+class InferenceClient:
+    """
+    Connection-pooled client; safe to share between threads. A connection
+    is owned by one request at a time and returned to the pool afterwards,
+    or discarded if the request failed mid-way.
+
+    Args:
+        address: Unix socket path of the inference server
+        authkey: Shared secret configured on the server
+        timeout: Seconds to wait for each reply
+        shared_memory: Hand decoded frames over in shared memory rather
+            than pickled through the socket
+    """
+
+    def __init__(self, address: str, authkey: bytes = INFERENCE_AUTHKEY, timeout: float = INFERENCE_TIMEOUT,
+                 shared_memory: bool = INFERENCE_SHARED_MEMORY):
+        if not authkey:
+            raise ValueError("INFERENCE_AUTHKEY must be set to use an inference server")
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+        self.shared_memory = shared_memory
+        self._idle = queue.LifoQueue()
+        self._frame_pool = FramePool()
+
+    def _connect(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        except OSError as err:
+            raise InferenceError(f"Inference server unavailable at {self.address}: {err}") from err
+
+    def _recv(self, conn):
+        if not conn.poll(self.timeout):
+            raise InferenceError(f"No reply from the inference server within {self.timeout:.0f}s")
+        kind, payload = conn.recv()
+        if kind == "error":
+            raise InferenceError(payload)
+        if kind == "busy":
+            raise SchedulerBusy(*payload)
+        return kind, payload
+
+    def _request(self, op: str, **kwargs) -> Iterator[tuple]:
+        conn = self._connect()
+        finished = False
+        try:
+            conn.send((op, kwargs))
+            while True:
+                try:
+                    kind, payload = self._recv(conn)
+                except SchedulerBusy:
+                    finished = True  # a complete reply; the connection stays usable
+                    raise
+                finished = kind in ("ok", "done")
+                yield kind, payload
+                if finished:
+                    return
+        except (EOFError, OSError) as err:
+            raise InferenceError(f"Inference server connection lost: {err}") from err
+        finally:
+            # A connection with unread replies cannot be reused
+            if finished:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def _call(self, op: str, **kwargs):
+        for _, payload in self._request(op, **kwargs):
+            return payload
+
+    def status(self) -> dict:
+        return self._call("status")
+
+    def admit(self, session_id: str, images: int) -> str:
+        """
+        Admission ticket from the server's scheduler (see BatchScheduler.admit).
+
+        Raises:
+            SchedulerBusy: The inference server is at capacity
+            InferenceError: The inference server could not be reached
+        """
+        return self._call("admit", session_id=session_id, images=images)
+
+    def release(self, ticket: str):
+        self._call("release", ticket=ticket)
+
+    def run_model_on_images(self, images: List, session_id: str,
+                            duplicates: Optional[str] = None) -> List[DetectionResult]:
+        """
+        Run detection on decoded (filename, BGR array) pairs in the inference server.
+        """
+        images = list(images)
+        packed = pack_frames(images, self._frame_pool) if self.shared_memory else None
+        if packed is None:
+            return self._call("images", images=images, session_id=session_id, duplicates=duplicates)
+        block, handle, frames = packed
+        try:
+            return self._call("frames", shm=handle, frames=frames, session_id=session_id, duplicates=duplicates)
+        finally:
+            self._frame_pool.release(block)
+
+    def run_model_on_blobs(
+        self, blob_paths: Iterable[str], session_id: str, batch_size: int = BACKFILL_BATCH_SIZE,
+        duplicates: Optional[str] = None
+    ) -> Iterator[List[DetectionResult]]:
+        """
+        Have the inference server fetch and process GCS images, yielding
+        each batch's results as soon as it is done.
+        """
+        for kind, payload in self._request("blobs", blob_paths=list(blob_paths), session_id=session_id,
+                                           batch_size=batch_size, duplicates=duplicates):
+            if kind == "batch":
+                yield payload
+
+    def close(self):
+        self._frame_pool.close()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_client = InferenceClient(INFERENCE_SOCKET) if INFERENCE_SOCKET else None
+
+
+def inference_backend():
+    """
+    The remote client when an inference server is configured, else the
+    in-process batch scheduler (the model service, and torch with it, is
+    imported on the first model call).
+    """
+    if _client is not None:
+        return _client
+    from services.batch_scheduler import get_scheduler
+    return get_scheduler()
+
+
+def model_status() -> dict:
+    """
+    Model readiness as reported by whichever process holds the models.
+    """
+    if _client is None:
+        from services.model_registry import model_registry
+        return model_registry.status()
+    try:
+        return _client.status()
+    except InferenceError as err:
+        return {"state": "unavailable", "error": str(err), "timings": {}}
@@ -0,0 +1,151 @@
+"""
+Inference server: the one process that holds the models when the API runs as
+several workers.
+
+API workers (see services.inference_client) connect over a Unix socket using
+multiprocessing.connection and send one request per message:
+
+    ("status", {})                                      -> ("ok", status dict)
+    ("admit",  {"session_id": ..., "images": n})        -> ("ok", ticket) | ("busy", (message, retry_after))
+    ("release", {"ticket": ...})                        -> ("ok", None)
+    ("images", {"images": [...], "session_id": ..., "duplicates": mode})
+                                                        -> ("ok", [DetectionResult])
+    ("frames", {"shm": (name, token), "frames": [...], "session_id": ..., "duplicates": mode})
+                                                        -> ("ok", [DetectionResult])
+    ("blobs",  {"blob_paths": [...], "session_id": ..., "batch_size": n, "duplicates": mode})
+                                                        -> ("batch", [DetectionResult]) ...
+                                                           ("done", None)
+
+"frames" carries decoded images in a shared-memory block (see
+services.shared_frames) instead of pickled arrays; "images" is the fallback
+when /dev/shm has no room. Failures are answered with ("error", message). Each connection is served on
+its own thread and hands its images to the batch scheduler
+(services.batch_scheduler), whose single worker coalesces images from all
+connections into model calls; rendering and uploads of finished results
+still overlap on their own pools.
+
+Run from backend/:
+    INFERENCE_SOCKET=/tmp/dugong-inference.sock python -m services.inference_server
+"""
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+from core.config import INFERENCE_AUTHKEY, INFERENCE_SOCKET, WARMUP_ENABLED
+from core.logger import setup_logger
+from services.batch_scheduler import SchedulerBusy, get_scheduler
+from services.model_registry import model_registry
+from services.shared_frames import attach_frames
+
+logger = setup_logger("inference_server", "logs/inference_server.log")
+
+
+class InferenceServer:
+    """
+    Args:
+        address: Unix socket path to listen on
+        authkey: Shared secret clients must present
+    """
+
+    def __init__(self, address: str, authkey: bytes = INFERENCE_AUTHKEY):
+        if not authkey:
+            raise ValueError("INFERENCE_AUTHKEY must be set to run the inference server")
+        self.address = address
+        self.authkey = authkey
+        self._listener = None
+        self._closed = threading.Event()
+
+    def _status(self) -> dict:
+        import psutil
+
+        return {**model_registry.status(), "pid": os.getpid(),
+                "rss_mb": round(psutil.Process().memory_info().rss / 2**20, 1),
+                "scheduler": get_scheduler().stats()}
+
+    def _handle_request(self, conn, op: str, kwargs: dict):
+        if op == "status":
+            conn.send(("ok", self._status()))
+        elif op == "admit":
+            conn.send(("ok", get_scheduler().admit(kwargs["session_id"], kwargs["images"])))
+        elif op == "release":
+            get_scheduler().release(kwargs["ticket"])
+            conn.send(("ok", None))
+        elif op == "images":
+            results = get_scheduler().run_model_on_images(
+                kwargs["images"], kwargs["session_id"], kwargs.get("duplicates")
+            )
+            conn.send(("ok", results))
+        elif op == "frames":
+            # The views must stay valid until the scheduler has run every frame
+            with attach_frames(kwargs["shm"], kwargs["frames"]) as frames:
+                results = get_scheduler().run_model_on_images(frames, kwargs["session_id"], kwargs.get("duplicates"))
+            conn.send(("ok", results))
+        elif op == "blobs":
+            batches = get_scheduler().run_model_on_blobs(
+                kwargs["blob_paths"], kwargs["session_id"], kwargs["batch_size"], kwargs.get("duplicates")
+            )
+            for results in batches:
+                conn.send(("batch", results))
+            conn.send(("done", None))
+        else:
+            conn.send(("error", f"unknown operation {op!r}"))
+
+    def _serve_connection(self, conn):
+        with conn:
+            while not self._closed.is_set():
+                try:
+                    op, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    self._handle_request(conn, op, kwargs)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                except SchedulerBusy as err:
+                    conn.send(("busy", (str(err), err.retry_after)))
+                except Exception as err:
+                    logger.exception(f"Inference request {op!r} failed")
+                    try:
+                        conn.send(("error", f"{type(err).__name__}: {err}"))
+                    except OSError:
+                        return
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        os.chmod(self.address, 0o660)
+        logger.info(f"Inference server listening on {self.address} (pid {os.getpid()})")
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn = self._listener.accept()
+                except (OSError, AuthenticationError):
+                    if self._closed.is_set():
+                        break
+                    logger.exception("Rejected inference client connection")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+def main():
+    if not INFERENCE_SOCKET:
+        raise SystemExit("INFERENCE_SOCKET is not set")
+    if not INFERENCE_AUTHKEY:
+        raise SystemExit("INFERENCE_AUTHKEY is not set")
+    if WARMUP_ENABLED:
+        model_registry.start_background_warmup()
+    InferenceServer(INFERENCE_SOCKET).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Loading, fusing and warming of the detection and classification models.
+
+Weights are downloaded once to MODEL_PATH / CLASSIFICATION_MODEL_PATH. The
+first load fuses Conv+BatchNorm layers and saves the fused model, in FP32,
+next to the weights ({stem}.fused-fp32.pt); later starts load the fused copy
+directly. With WEIGHTS_MMAP the fused checkpoint is memory-mapped instead of
+read: its tensors stay backed by the page cache, so every process loading the
+same file shares one copy of the weights (FP32 on disk means no conversion
+copies them at load). At app
+startup `start_background_warmup` loads both models and runs a dummy batch
+through them in a background thread, so the first real request does not pay
+for CUDA/kernel initialisation; a failed load is retried every
+WARMUP_RETRY_SECONDS. Requests arriving earlier simply wait for the load in
+progress. With WARMUP_ENABLED=false the models load on the first request and
+count as ready until then.
+
+ultralytics (and with it torch) is imported on the first load, so importing
+this module to report readiness costs nothing.
+"""
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Tuple
+
+import numpy as np
+import requests
+
+from core.config import (
+    CLASSIFICATION_MODEL_PATH,
+    CLASSIFICATION_MODEL_URL,
+    DETECTION_MODEL_URL,
+    MODEL_DOWNLOAD_TIMEOUT,
+    MODEL_PATH,
+    WARMUP_BATCH_SIZE,
+    WARMUP_ENABLED,
+    WARMUP_IMAGE_SIZE,
+    WARMUP_RETRY_SECONDS,
+    WEIGHTS_MMAP,
+)
+from core.logger import setup_logger
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+logger = setup_logger("model_registry", "logs/model_registry.log")
+
+
+def download_weights(url: str, path: Path) -> Path:
+    """
+    Download model weights to `path` unless they are already there.
+    The file is written to a temporary name first, so an interrupted
+    download never leaves a truncated checkpoint behind.
+    """
+    if path.exists() and path.stat().st_size > 0:
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    logger.info(f"Downloading {url} -> {path}")
+    with requests.get(url, stream=True, timeout=MODEL_DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    os.replace(tmp, path)
+    return path
+
+
+def fused_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.stem}.fused-fp32.pt")
+
+
+def load_checkpoint(path: Path, mmap: bool = WEIGHTS_MMAP) -> "YOLO":
+    """
+    Load a YOLO checkpoint, memory-mapping its tensors when `mmap` is set.
+    """
+    from ultralytics import YOLO
+
+    if not mmap:
+        return YOLO(str(path))
+    try:
+        from torch.utils.serialization import config as serialization_config
+    except ImportError:
+        logger.warning("This torch version cannot memory-map checkpoints; loading into memory")
+        return YOLO(str(path))
+    # ultralytics calls torch.load itself; the serialization config is the
+    # way to make that call map the file rather than read it
+    previous = serialization_config.load.mmap
+    serialization_config.load.mmap = True
+    try:
+        return YOLO(str(path))
+    finally:
+        serialization_config.load.mmap = previous
+
+
+def save_fused(model: "YOLO", path: Path):
+    """
+    Save a fused model as an FP32 checkpoint (YOLO.save would store FP16,
+    which has to be converted, and so copied, when loaded). Each call writes
+    its own temporary file, so workers fusing at the same time never rename
+    another one's partial file into place.
+    """
+    import torch
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            torch.save({**model.ckpt, "ema": None, "model": model.model}, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_fused(path: Path) -> "YOLO":
+    """
+    Load a YOLO model with fused layers, reusing the cached fused checkpoint
+    when it is newer than the weights it was built from.
+    """
+    from ultralytics import YOLO
+
+    fused = fused_path_for(path)
+    if fused.exists() and fused.stat().st_mtime >= path.stat().st_mtime:
+        try:
+            return load_checkpoint(fused)
+        except Exception as err:
+            logger.warning(f"Ignoring unreadable fused checkpoint {fused}: {err}")
+
+    model = YOLO(str(path))
+    model.fuse()
+    try:
+        save_fused(model, fused)
+        logger.info(f"Cached fused weights at {fused}")
+    except Exception as err:
+        # A read-only disk only costs the fuse on the next start
+        logger.warning(f"Could not cache fused weights at {fused}: {err}")
+        return model
+    if WEIGHTS_MMAP:
+        # Swap the private copy for the mapped one so this process shares too
+        try:
+            return load_checkpoint(fused)
+        except Exception as err:
+            logger.warning(f"Could not map fused weights {fused}: {err}")
+    return model
+
+
+class ModelRegistry:
+    """
+    Process-wide holder of the two models; `load()` is idempotent and
+    thread-safe, concurrent callers wait for the first load.
+    """
+
+    def __init__(self):
+        self.state = "pending"        # pending -> loading -> loaded -> warming -> ready | failed
+        self.error: Optional[str] = None
+        self.timings = {}
+        self._models: Optional[Tuple["YOLO", "YOLO"]] = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def load(self) -> Tuple["YOLO", "YOLO"]:
+        """
+        Return (detection model, classification model), loading them on first use.
+        """
+        if self._models is not None:
+            return self._models
+        with self._lock:
+            if self._models is None:
+                self.state = "loading"
+                try:
+                    start = time.perf_counter()
+                    detection_path = download_weights(DETECTION_MODEL_URL, MODEL_PATH)
+                    classification_path = download_weights(CLASSIFICATION_MODEL_URL, CLASSIFICATION_MODEL_PATH)
+                    self.timings["download_s"] = round(time.perf_counter() - start, 3)
+
+                    start = time.perf_counter()
+                    models = (load_fused(detection_path), load_fused(classification_path))
+                    self.timings["load_s"] = round(time.perf_counter() - start, 3)
+                except Exception as err:
+                    self.state = "failed"
+                    self.error = str(err)
+                    logger.error(f"Model load failed: {err}")
+                    raise
+                self._models = models
+                self.error = None
+                self.state = "loaded" if WARMUP_ENABLED else "ready"
+        return self._models
+
+    def warm(self):
+        """
+        Load the models and run one dummy batch through each.
+        """
+        detection_model, classification_model = self.load()
+        if self.state == "ready":
+            return
+        self.state = "warming"
+        start = time.perf_counter()
+        dummy = [np.zeros((WARMUP_IMAGE_SIZE, WARMUP_IMAGE_SIZE, 3), dtype=np.uint8)] * max(1, WARMUP_BATCH_SIZE)
+        try:
+            detection_model.predict(source=dummy, save=False, verbose=False)
+            classification_model.predict(dummy[0], save=False, verbose=False)
+        except Exception as err:
+            # The models work without warm-up; readiness should not hinge on it
+            logger.warning(f"Model warm-up failed: {err}")
+        self.timings["warmup_s"] = round(time.perf_counter() - start, 3)
+        self.state = "ready"
+        logger.info(f"Models ready: {self.timings}")
+
+    def start_background_warmup(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while True:
+                try:
+                    self.warm()
+                    return
+                except Exception:
+                    # state/error already recorded by load(); a request may
+                    # also retry the load meanwhile
+                    logger.info(f"Retrying model load in {WARMUP_RETRY_SECONDS}s")
+                    time.sleep(WARMUP_RETRY_SECONDS)
+
+        self._thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self) -> bool:
+        # Without warm-up nothing loads before the first request
+        return self.state == "ready" or (not WARMUP_ENABLED and self.state in ("pending", "loading"))
+
+    def status(self) -> dict:
+        return {"state": self.state, "ready": self.ready, "error": self.error, "timings": dict(self.timings)}
+
+
+model_registry = ModelRegistry()
@@ -1,55 +1,30 @@
-
-import requests
 from pathlib import Path
-from ultralytics import YOLO
-from core.config import MODEL_PATH, CLASSIFICATION_MODEL_PATH
 from core.logger import setup_logger
-from typing import List, Tuple
+from core.telemetry import span
+from typing import Iterable, Iterator, List, Tuple, Union
 
 import numpy as np
 import torch
 import os
 import cv2
-import tempfile
-
-from google.cloud import storage
-from google.oauth2 import service_account
-from tempfile import TemporaryDirectory
-from pathlib import Path
-from typing import List, Tuple
-import logging
-
-# Initialize your service account credentials and GCS client
-creds = service_account.Credentials.from_service_account_file("/content/dugongmonitoring.json")
-gcs_client = storage.Client(credentials=creds)
-logger = logging.getLogger(__name__)
 
-def download_gcs_image(gcs_url: str, download_dir: Path) -> Path:
-    # Example: https://storage.googleapis.com/dugongstorage/folder/image.jpg
-    bucket_name = "dugongstorage"
-    blob_path = gcs_url.replace("https://storage.googleapis.com/dugongstorage/", "")
-    blob = gcs_client.bucket(bucket_name).blob(blob_path)
-
-    local_path = download_dir / Path(blob_path).name
-    blob.download_to_filename(str(local_path))
-    return local_path
+from core.config import (
+    BACKFILL_BATCH_SIZE,
+    CASCADE_ENABLED,
+    CASCADE_SCREEN_CONF,
+    CASCADE_SCREEN_SIZE,
+    EMPTY_FRAME_CLASS,
+    EMPTY_FRAME_FAST_PATH,
+)
+from services.image_prefetch import DecodedImage, iter_prefetched_batches
+from services.render_service import submit_render
+from services.rendition_service import resize_to_max_side
+from services.detections_store import format_yolo_labels
+from services.model_registry import model_registry
+from schemas.detection import DetectionResult
 
 logger = setup_logger("model_service", "logs/model_service.log")
-url = "https://storage.googleapis.com/dugong_models/best.pt"
-url = "https://storage.googleapis.com/dugong_models/classification_model.pt"
-
-response = requests.get(url)
-# Save to disk
-with open("MLmodel.pt", "wb") as f:
-    f.write(response.content)
-model = YOLO("MLmodel.pt")
-
-response = requests.get(url)
-# Save to disk
-with open("classification_model.pt", "wb") as f:
-    f.write(response.content)
-    
-classification_model = YOLO("classification_model.pt")
+
 
 def fully_dynamic_nms(preds, iou_min=0.1, iou_max=0.6):
     from ultralytics.engine.results import Boxes
@@ -81,7 +56,9 @@ def fully_dynamic_nms(preds, iou_min=0.1, iou_max=0.6):
         clipped_size = np.clip(median_size, min_size, max_size)
         relative_size = (clipped_size - min_size) / (max_size - min_size)
         iou_thr = iou_max - relative_size * (iou_max - iou_min)
-        print(f"[{os.path.basename(res.path)}] Median size: {median_size:.2f}, IoU: {iou_thr:.3f}, Relative size : {relative_size}")
+        logger.debug(
+            f"[{os.path.basename(res.path)}] Median size: {median_size:.2f}, IoU: {iou_thr:.3f}, Relative size : {relative_size}"
+        )
         keep = torch.ops.torchvision.nms(boxes, scores, float(iou_thr))
 
         kept_boxes = boxes[keep]
@@ -95,73 +72,139 @@ def fully_dynamic_nms(preds, iou_min=0.1, iou_max=0.6):
     return processed_results
 
 
-def run_model_on_images(
-    image_paths: List[Path], session_id: str
-) -> List[Tuple[int, int, str, bytes, str, str]]:
+def _load_image(image: Union[Path, str, DecodedImage]) -> DecodedImage:
+    if isinstance(image, tuple):
+        return image
+    path = Path(image)
+    img = cv2.imread(str(path))
+    if img is None:
+        raise ValueError(f"Could not read image: {path}")
+    return path.name, img
+
+
+def _screen(model, arrays: List[np.ndarray], screen_size: int, screen_conf: float) -> List[bool]:
     """
-    Run dugong detection model on a batch of images and return detection results as bytes and label content.
+    First stage of the detection cascade: whether each frame may hold an
+    animal, from one low-resolution pass at a recall-leaning confidence.
+    Frames are downscaled with area averaging first, which keeps small
+    blobs visible better than the letterbox resize would.
     """
-    results = []
-    
-    with TemporaryDirectory() as tmpdir:
-        local_paths = []
-    
-        for path in image_paths:
-            if path.startswith("https://storage.googleapis.com/dugongstorage/"):
-                local_path = download_gcs_image(path, Path(tmpdir))
-            else:
-                local_path = Path(path)  # Already local
-            local_paths.append(str(local_path))
-    
-        # Now call the model
-        batch_results = model.predict(
-            source=local_paths,
-            conf=0.3,
-            save=False,
-            show_labels=False,
-            show_conf=False,
-            project=None,
-            name=None,
+    thumbs = [resize_to_max_side(img, screen_size) for img in arrays]
+    with span("screen", images=len(arrays)):
+        screened = model.predict(
+            source=thumbs,
+            imgsz=screen_size,
+            conf=screen_conf,
             iou=0.3,
-            max_det=1000
+            max_det=1,
+            save=False,
+            verbose=False
         )
+    return [len(res.boxes) > 0 for res in screened]
 
 
-    # 2. Apply the custom NMS function to the results
-    processed_results = fully_dynamic_nms(batch_results)
+def _box_arrays(res) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(xyxy, cls, xywhn, conf) of one result; empty arrays when the frame was not detected on."""
+    if res is None or res.boxes is None:
+        return (np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int16),
+                np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32))
+    return (
+        res.boxes.xyxy.cpu().numpy(),
+        res.boxes.cls.cpu().numpy().astype(np.int16),
+        res.boxes.xywhn.cpu().numpy().astype(np.float32),
+        res.boxes.conf.cpu().numpy().astype(np.float32)
+    )
 
-    # Define colors for classes (B, G, R)
-    color_map = {
-        0: (255, 0, 0),   # Blue for Dugong (class 0)
-        1: (0, 0, 255)    # Red for Calf (class 1)
-    }
 
-    for image_path, res in zip(image_paths, processed_results):
-        class_ids = res.boxes.cls.int().tolist() if res.boxes is not None else []
+def run_model_on_images(
+    images: List[Union[Path, str, DecodedImage]],
+    session_id: str,
+    cascade: bool = CASCADE_ENABLED,
+    screen_size: int = CASCADE_SCREEN_SIZE,
+    screen_conf: float = CASCADE_SCREEN_CONF,
+    empty_fast_path: bool = EMPTY_FRAME_FAST_PATH
+) -> List[DetectionResult]:
+    """
+    Run dugong detection model on a batch of images and return detection results as bytes and label content.
+    Annotation and JPEG encoding happen on the render pool, in parallel with classification.
+
+    Images may be local paths or already-decoded (filename, BGR array) pairs;
+    decoded images are used as-is, so nothing is re-read from disk for annotation.
+
+    With `cascade`, only frames the low-resolution screen flags go through
+    full detection. With `empty_fast_path`, frames left without boxes are
+    not classified (image_class is EMPTY_FRAME_CLASS) and get no annotated
+    full-size rendition, only the preview and viewer renditions.
+    """
+    model, classification_model = model_registry.load()
+    results = []
+    named_images = [_load_image(image) for image in images]
+    arrays = [img for _, img in named_images]
+
+    candidates = _screen(model, arrays, screen_size, screen_conf) if cascade else [True] * len(arrays)
+    detect_indices = [i for i, candidate in enumerate(candidates) if candidate]
+    processed_results = [None] * len(arrays)
+    if detect_indices:
+        with span("detect", images=len(detect_indices)):
+            batch_results = model.predict(
+                source=[arrays[i] for i in detect_indices],
+                conf=0.3,
+                save=False,
+                show_labels=False,
+                show_conf=False,
+                project=None,
+                name=None,
+                iou=0.3,
+                max_det=1000
+            )
+
+        # 2. Apply the custom NMS function to the results
+        with span("nms"):
+            for i, res in zip(detect_indices, fully_dynamic_nms(batch_results)):
+                processed_results[i] = res
+
+    # Rendering runs on the render pool while the classifier works below
+    boxes = [_box_arrays(res) for res in processed_results]
+    render_futures = []
+    for (_, original), (xyxy, cls, _, _) in zip(named_images, boxes):
+        if empty_fast_path and not len(cls):
+            render_futures.append(submit_render(original, xyxy, cls, draw_boxes=False))
+        else:
+            render_futures.append(submit_render(original, xyxy, cls.astype(int)))
+
+    for (image_name, original), (_, cls, xywhn, conf), render_future in zip(named_images, boxes, render_futures):
+        class_ids = cls.tolist()
         dugong_count = class_ids.count(0)
         calf_count = class_ids.count(1)
-        # find the class of the image
-        temp_results = classification_model.predict(image_path,  save=False,show_conf=False,project=None)
-        top5_class_names = temp_results[0].names
-        top1_class_id = temp_results[0].probs.top1
-        image_class = top5_class_names[top1_class_id]
-        label_content = ""
-        for box, cls_id in zip(res.boxes.xywhn, res.boxes.cls.int()):
-            cx, cy, w, h = box.tolist()
-            label_content += f"{cls_id} {cx:.6f} {cy:.6f} {w:.6f} {h:.6f}\n"
-
-        # Draw bounding boxes on the image in memory
-        img = cv2.imread(str(image_path))
-        if img is not None and len(res.boxes) > 0:
-            boxes = res.boxes.xyxy.cpu().numpy()
-            classes = res.boxes.cls.cpu().numpy().astype(int)
-            for box, cls in zip(boxes, classes):
-                x1, y1, x2, y2 = map(int, box)
-                color = color_map.get(cls, (0, 255, 0))
-                cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-        # Encode image to bytes in memory
-        _, img_encoded = cv2.imencode('.jpg', img)
-        image_bytes = img_encoded.tobytes()
-        results.append((dugong_count, calf_count, image_class, image_bytes, label_content, image_path.name))
+        if empty_fast_path and not class_ids:
+            image_class = EMPTY_FRAME_CLASS
+        else:
+            # find the class of the image
+            with span("classify"):
+                temp_results = classification_model.predict(original,  save=False,show_conf=False,project=None)
+            top5_class_names = temp_results[0].names
+            top1_class_id = temp_results[0].probs.top1
+            image_class = top5_class_names[top1_class_id]
+        label_content = format_yolo_labels(cls, xywhn)
+
+        image_bytes, preview_bytes, renditions = render_future.result()
+        results.append(DetectionResult(
+            dugong_count, calf_count, image_class, image_bytes, label_content, image_name, preview_bytes, renditions,
+            cls, xywhn, conf
+        ))
 
     return results
+
+
+def run_model_on_blobs(
+    blob_paths: Iterable[str], session_id: str, batch_size: int = BACKFILL_BATCH_SIZE, **prefetch_kwargs
+) -> Iterator[List[DetectionResult]]:
+    """
+    Run the model over images stored in GCS, one batch at a time.
+
+    The next batch is downloaded and decoded into memory by the prefetch pool
+    while the model works on the current one. Yields the run_model_on_images
+    results for each batch.
+    """
+    for batch in iter_prefetched_batches(blob_paths, batch_size, **prefetch_kwargs):
+        yield run_model_on_images(batch, session_id)
@@ -0,0 +1,89 @@
+"""
+Annotated image rendering: draws detection boxes and encodes the full-size,
+preview and viewer (thumbnail/tile) renditions of a processed image.
+
+Rendering runs on a small thread pool (OpenCV releases the GIL while drawing,
+resizing and encoding), so it overlaps with classification instead of being
+serial with inference.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.config import (
+    JPEG_QUALITY,
+    PREVIEW_JPEG_QUALITY,
+    PREVIEW_MAX_SIDE,
+    RENDER_WORKERS,
+    RENDITION_TILES,
+    RENDITIONS_ENABLED,
+    SERVER_SIDE_RENDERING,
+)
+from core.telemetry import span, submit_in_context
+from services.rendition_service import build_renditions, encode_jpeg, resize_to_max_side
+
+# Colors for classes (B, G, R)
+COLOR_MAP = {
+    0: (255, 0, 0),   # Blue for Dugong (class 0)
+    1: (0, 0, 255)    # Red for Calf (class 1)
+}
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+    return _executor
+
+
+def render_image(
+    image: np.ndarray,
+    boxes_xyxy: np.ndarray,
+    classes: np.ndarray,
+    draw_boxes: bool = SERVER_SIDE_RENDERING
+) -> Tuple[Optional[bytes], bytes, Optional[Dict]]:
+    """
+    Produce the (full, preview, viewer renditions) of one image.
+
+    With draw_boxes=False no full-size rendition is produced (the client
+    draws boxes over the original from the label file) and the preview is
+    left unannotated.
+
+    Args:
+        image: Original BGR image; it is not modified
+        boxes_xyxy: (N, 4) pixel boxes
+        classes: (N,) class ids
+        draw_boxes: Whether to burn boxes into the renditions
+    """
+    with span("annotate", boxes=len(boxes_xyxy)):
+        full_bytes = None
+        if draw_boxes and len(boxes_xyxy):
+            img = image.copy()
+            for box, cls in zip(boxes_xyxy, classes):
+                x1, y1, x2, y2 = map(int, box)
+                cv2.rectangle(img, (x1, y1), (x2, y2), COLOR_MAP.get(int(cls), (0, 255, 0)), 2)
+        else:
+            img = image
+
+        if draw_boxes:
+            full_bytes = encode_jpeg(img, JPEG_QUALITY)
+        preview_bytes = encode_jpeg(resize_to_max_side(img, PREVIEW_MAX_SIDE), PREVIEW_JPEG_QUALITY)
+        # Nothing to zoom in on in empty frames, so they only get thumbnails
+        renditions = build_renditions(img, tiles=RENDITION_TILES and len(boxes_xyxy) > 0) if RENDITIONS_ENABLED else None
+    return full_bytes, preview_bytes, renditions
+
+
+def submit_render(
+    image: np.ndarray,
+    boxes_xyxy: np.ndarray,
+    classes: np.ndarray,
+    draw_boxes: bool = SERVER_SIDE_RENDERING
+) -> Future:
+    """
+    Queue render_image on the rendering pool; the future resolves to render_image's tuple.
+    """
+    return submit_in_context(_get_executor(), render_image, image, boxes_xyxy, classes, draw_boxes)
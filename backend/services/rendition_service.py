@@ -0,0 +1,170 @@
+"""
+Multi-resolution renditions of processed images for the results viewer.
+
+At ingest each image gets small WebP/JPEG thumbnails and a tiled zoom pyramid,
+stored under {session_id}/renditions/{image filename}/:
+
+    manifest.json              width, height, tileSize, levels
+    thumb.webp, thumb.jpg      THUMBNAIL_MAX_SIDE thumbnails
+    tiles/{level}/{col}_{row}.jpg
+
+Level `levels - 1` is full resolution and every level below halves it, down to
+level 0 which fits in a single tile. Only frames with detections get tiles
+(levels is 0 otherwise); the viewer shows the preview for the rest. The sidebar loads the thumbnails and the
+viewer requests signed URLs only for the tiles it is showing.
+
+cv2 is imported by the encoding functions only; the URL helpers are used by
+request handlers that should not pay for loading OpenCV.
+"""
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.config import (
+    JPEG_QUALITY,
+    RENDITION_TILES,
+    RENDITION_UPLOAD_WORKERS,
+    THUMBNAIL_MAX_SIDE,
+    TILE_JPEG_QUALITY,
+    TILE_SIZE,
+)
+from services.GCS_service import GCSService
+
+
+def encode_jpeg(img: np.ndarray, quality: int = JPEG_QUALITY) -> bytes:
+    import cv2
+
+    ok, encoded = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("JPEG encoding failed")
+    return encoded.tobytes()
+
+
+def resize_to_max_side(img: np.ndarray, max_side: int) -> np.ndarray:
+    import cv2
+
+    height, width = img.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1:
+        return img
+    return cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+def rendition_prefix(session_id: str, filename: str) -> str:
+    # The full filename, extension included, so a.jpg and a.png do not share renditions
+    return f"{session_id}/renditions/{filename}"
+
+
+def pyramid_levels(width: int, height: int, tile_size: int = TILE_SIZE) -> int:
+    """
+    Number of pyramid levels needed until the image fits in one tile.
+    """
+    longest = max(width, height)
+    if longest <= tile_size:
+        return 1
+    return math.ceil(math.log2(longest / tile_size)) + 1
+
+
+def build_renditions(img: np.ndarray, tile_size: int = TILE_SIZE, tiles: bool = RENDITION_TILES) -> Dict[str, bytes]:
+    """
+    Encode thumbnails and (optionally) the tile pyramid of an image.
+
+    Returns a mapping of path relative to the rendition prefix -> encoded
+    bytes, plus the manifest under "manifest" as a dict.
+    """
+    import cv2
+
+    height, width = img.shape[:2]
+    thumb = resize_to_max_side(img, THUMBNAIL_MAX_SIDE)
+    ok, webp = cv2.imencode(".webp", thumb, [cv2.IMWRITE_WEBP_QUALITY, 70])
+
+    renditions = {
+        "thumb.jpg": encode_jpeg(thumb, 70),
+    }
+    if ok:
+        renditions["thumb.webp"] = webp.tobytes()
+
+    levels = pyramid_levels(width, height, tile_size) if tiles else 0
+    level_img = img
+    for level in reversed(range(levels)):
+        h, w = level_img.shape[:2]
+        for row in range(math.ceil(h / tile_size)):
+            for col in range(math.ceil(w / tile_size)):
+                tile = level_img[row * tile_size:(row + 1) * tile_size, col * tile_size:(col + 1) * tile_size]
+                renditions[f"tiles/{level}/{col}_{row}.jpg"] = encode_jpeg(tile, TILE_JPEG_QUALITY)
+        if level:
+            level_img = cv2.resize(
+                level_img, (max(1, math.ceil(w / 2)), max(1, math.ceil(h / 2))), interpolation=cv2.INTER_AREA
+            )
+
+    renditions["manifest"] = {
+        "width": width,
+        "height": height,
+        "tileSize": tile_size,
+        "levels": levels
+    }
+    return renditions
+
+
+def upload_renditions(session_id: str, filename: str, renditions: Dict) -> dict:
+    """
+    Upload encoded renditions in parallel and return the stored manifest.
+    """
+    prefix = rendition_prefix(session_id, filename)
+    manifest = dict(renditions["manifest"])
+    manifest["thumbnails"] = sorted(k for k in renditions if k.startswith("thumb."))
+
+    def upload(item):
+        name, data = item
+        content_type = "image/webp" if name.endswith(".webp") else "image/jpeg"
+        GCSService.upload_bytes(f"{prefix}/{name}", data, content_type=content_type)
+
+    items = [(k, v) for k, v in renditions.items() if k != "manifest"]
+    with ThreadPoolExecutor(max_workers=RENDITION_UPLOAD_WORKERS) as pool:
+        list(pool.map(upload, items))
+    GCSService.upload_json(f"{prefix}/manifest.json", manifest)
+    return manifest
+
+
+def thumbnail_url(session_id: str, filename: str, manifest: dict) -> Optional[str]:
+    """
+    Signed URL of the preferred (smallest-format) thumbnail.
+    """
+    thumbnails = manifest.get("thumbnails", [])
+    name = "thumb.webp" if "thumb.webp" in thumbnails else "thumb.jpg"
+    if name not in thumbnails:
+        return None
+    return GCSService.generate_signed_url(f"{rendition_prefix(session_id, filename)}/{name}")
+
+
+def visible_tiles(manifest: dict, level: int, x0: float, y0: float, x1: float, y1: float) -> List[tuple]:
+    """
+    (col, row) of the tiles at `level` intersecting the normalized viewport
+    [x0, x1] x [y0, y1].
+    """
+    scale = 2 ** (manifest["levels"] - 1 - level)
+    tile = manifest["tileSize"]
+    w = math.ceil(manifest["width"] / scale)
+    h = math.ceil(manifest["height"] / scale)
+    cols, rows = math.ceil(w / tile), math.ceil(h / tile)
+
+    def clamp(v, hi):
+        return min(max(v, 0), hi - 1)
+
+    c0, c1 = clamp(int(x0 * w // tile), cols), clamp(int(math.ceil(x1 * w / tile)) - 1, cols)
+    r0, r1 = clamp(int(y0 * h // tile), rows), clamp(int(math.ceil(y1 * h / tile)) - 1, rows)
+    return [(c, r) for r in range(r0, r1 + 1) for c in range(c0, c1 + 1)]
+
+
+def signed_tile_urls(session_id: str, filename: str, manifest: dict, level: int, viewport: tuple) -> List[dict]:
+    prefix = rendition_prefix(session_id, filename)
+    return [
+        {
+            "col": col,
+            "row": row,
+            "url": GCSService.generate_signed_url(f"{prefix}/tiles/{level}/{col}_{row}.jpg")
+        }
+        for col, row in visible_tiles(manifest, level, *viewport)
+    ]
@@ -0,0 +1,67 @@
+"""
+Persists per-image detection output (annotated image, preview, viewer
+renditions, label file) to GCS and builds the session metadata record for it.
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+from core.config import SIGNED_URL_HOURS
+from services.GCS_service import GCSService
+from services.rendition_service import thumbnail_url, upload_renditions
+
+
+def store_detection_result(session_id: str, filename: str, result, geo: Optional[dict] = None) -> dict:
+    """
+    Upload the renditions and YOLO label file for one image and return its
+    session_metadata.json file record.
+
+    When the result carries no server-rendered image, imageUrl points at the
+    original upload and the dashboard draws the boxes from labelUrl.
+
+    Args:
+        session_id: Session the image belongs to
+        filename: Original image filename
+        result: One DetectionResult returned by run_model_on_images
+        geo: Position and capture time from services.exif_service.extract_geo
+    """
+    stem = Path(filename).stem
+    # Taken before signing, so the recorded expiry is never later than the URLs'
+    signed_at = datetime.utcnow()
+
+    if result.image_bytes is not None:
+        image_blob_path = f"{session_id}/results/{filename}"
+        GCSService.upload_bytes(image_blob_path, result.image_bytes, content_type="image/jpeg")
+    else:
+        image_blob_path = f"{session_id}/images/{filename}"
+
+    preview_url = None
+    if result.preview_bytes is not None:
+        preview_blob_path = f"{session_id}/previews/{stem}.jpg"
+        GCSService.upload_bytes(preview_blob_path, result.preview_bytes, content_type="image/jpeg")
+        preview_url = GCSService.generate_signed_url(preview_blob_path)
+
+    manifest = None
+    if result.renditions:
+        manifest = upload_renditions(session_id, filename, result.renditions)
+
+    label_blob_path = f"{session_id}/labels/{stem}.txt"
+    GCSService.upload_bytes(label_blob_path, result.label_content.encode("utf-8"), content_type="text/plain")
+
+    return {
+        "filename": filename,
+        "imageUrl": GCSService.generate_signed_url(image_blob_path),
+        "previewUrl": preview_url,
+        "thumbnailUrl": thumbnail_url(session_id, filename, manifest) if manifest else None,
+        "tiles": {k: manifest[k] for k in ("width", "height", "tileSize", "levels")} if manifest else None,
+        "labelUrl": GCSService.generate_signed_url(label_blob_path),
+        "annotated": result.image_bytes is not None,
+        "dugongCount": result.dugong_count,
+        "calfCount": result.calf_count,
+        "totalCount": result.dugong_count + 2 * result.calf_count,
+        "imageClass": result.image_class,
+        "geo": geo,
+        "urlsExpireAt": (signed_at + timedelta(hours=SIGNED_URL_HOURS)).isoformat(timespec="seconds"),
+        "duplicateOf": result.duplicate_of,
+        "inferenceSkipped": result.reused,
+        "createdAt": datetime.utcnow().isoformat()
+    }
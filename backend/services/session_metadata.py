@@ -0,0 +1,91 @@
+"""
+Read-modify-write of a session's session_metadata.json.
+
+Several writers share the file: uploads, backfill checkpoints and
+false-positive moves (and the signed-URL refresh, which keeps its own
+give-up-on-conflict loop). Each update re-reads the metadata, applies its
+change and writes it back only if the blob generation is still the one it
+read, retrying on a conflict, so no writer drops records another one added
+in between.
+"""
+import json
+import time
+from typing import Callable, List, Optional, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from core.logger import setup_logger
+from services.GCS_service import GCSService
+
+logger = setup_logger("session_metadata", "logs/session_metadata.log")
+
+_WRITE_RETRIES = 8
+
+
+def metadata_blob_path(session_id: str) -> str:
+    return f"{session_id}/session_metadata.json"
+
+
+def read_session_metadata(session_id: str) -> Tuple[dict, int]:
+    """
+    The metadata and the generation it was read at ({} and 0 if it does not exist).
+
+    Raises:
+        PreconditionFailed: If it was replaced while being read
+    """
+    blob = GCSService.get_bucket().get_blob(metadata_blob_path(session_id))
+    if blob is None:
+        return {}, 0
+    try:
+        data = blob.download_as_bytes(if_generation_match=blob.generation)
+    except (NotFound, PreconditionFailed):
+        raise PreconditionFailed("session metadata changed while reading")
+    return json.loads(data), blob.generation
+
+
+def update_session_metadata(session_id: str, update: Callable[[dict], Optional[bool]]) -> dict:
+    """
+    Apply `update` to the latest metadata and write it back, guarded by its generation.
+
+    Args:
+        session_id: Session whose metadata is updated
+        update: Mutates the metadata in place; may run several times, once
+            per attempt, on a fresh copy each time. Returning False skips
+            the write.
+
+    Returns:
+        The metadata as written
+
+    Raises:
+        RuntimeError: If it kept changing for every attempt
+    """
+    for attempt in range(_WRITE_RETRIES):
+        try:
+            metadata, generation = read_session_metadata(session_id)
+            if update(metadata) is False:
+                return metadata
+            GCSService.get_bucket().blob(metadata_blob_path(session_id)).upload_from_string(
+                json.dumps(metadata, indent=2), content_type="application/json", if_generation_match=generation
+            )
+            return metadata
+        except PreconditionFailed:
+            logger.info(f"Metadata of session {session_id} changed concurrently, retrying ({attempt + 1})")
+            time.sleep(0.05 * (attempt + 1))
+    raise RuntimeError(f"Could not update metadata of session {session_id}")
+
+
+def merge_file_records(metadata: dict, records: List[dict]) -> List[dict]:
+    """
+    Append file records whose filename is not in the metadata yet and keep
+    file_count in step. Returns the records that were added.
+    """
+    files = metadata.setdefault("files", [])
+    known = {f["filename"] for f in files}
+    added = []
+    for record in records:
+        if record["filename"] not in known:
+            files.append(record)
+            known.add(record["filename"])
+            added.append(record)
+    metadata["file_count"] = len(files)
+    return added
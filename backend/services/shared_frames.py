@@ -0,0 +1,181 @@
+"""
+Shared-memory handoff of decoded image batches to the inference server.
+
+The API worker copies a batch of decoded frames once into a single
+multiprocessing.shared_memory block and sends only a small descriptor
+(block name plus name/shape/dtype/offset per frame). The inference server
+maps the same block and wraps each frame in a numpy view, so no pixel data
+is pickled, sent through the socket or copied on the receiving side.
+
+The sender owns the block. Blocks are reused from a per-client FramePool
+(creating, faulting in and unlinking a fresh block per request costs more
+than pickling at 1080p), so the server must drop its views before replying
+(`attach_frames` is a context manager for that) and caches its mappings of
+recently used blocks.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+FrameDescriptor = Tuple[str, tuple, str, int]
+# (block name, token): the token tells a reused block from a new block that
+# happens to get the name of an unlinked one
+BlockHandle = Tuple[str, str]
+
+SHM_DIR = "/dev/shm"
+# Keep this much of /dev/shm free; writing past a full tmpfs raises SIGBUS
+SHM_HEADROOM = 16 * 2**20
+
+
+def shm_available(nbytes: int) -> bool:
+    """
+    Whether /dev/shm has room for a block of `nbytes` (containers often cap
+    it at 64 MB, which a handful of 4K frames exceeds).
+    """
+    try:
+        stats = os.statvfs(SHM_DIR)
+    except OSError:
+        return False
+    return stats.f_bavail * stats.f_frsize - SHM_HEADROOM >= nbytes
+
+
+class FramePool:
+    """
+    Idle shared-memory blocks of the sending process, reused across batches.
+    Sizes are rounded up to BLOCK_ROUNDING so similar batches share blocks;
+    at most `max_idle` blocks are kept, larger surpluses are unlinked.
+    """
+    BLOCK_ROUNDING = 8 * 2**20
+
+    def __init__(self, max_idle: int = 4):
+        self.max_idle = max_idle
+        self._idle: List[shared_memory.SharedMemory] = []
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes: int) -> Optional[shared_memory.SharedMemory]:
+        with self._lock:
+            fitting = [block for block in self._idle if block.size >= nbytes]
+            if fitting:
+                block = min(fitting, key=lambda b: b.size)
+                self._idle.remove(block)
+                return block
+        size = -(-nbytes // self.BLOCK_ROUNDING) * self.BLOCK_ROUNDING
+        if not shm_available(size):
+            return None
+        block = shared_memory.SharedMemory(create=True, size=size)
+        block.token = os.urandom(8).hex()
+        return block
+
+    def release(self, block: shared_memory.SharedMemory):
+        with self._lock:
+            self._idle.append(block)
+            if len(self._idle) <= self.max_idle:
+                return
+            block = min(self._idle, key=lambda b: b.size)
+            self._idle.remove(block)
+        _unlink(block)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for block in idle:
+            _unlink(block)
+
+
+def _unlink(block: shared_memory.SharedMemory):
+    block.close()
+    try:
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def pack_frames(images: List[Tuple[str, np.ndarray]], pool: FramePool
+                ) -> Optional[Tuple[shared_memory.SharedMemory, BlockHandle, List[FrameDescriptor]]]:
+    """
+    Copy (name, array) frames into one shared-memory block from `pool`.
+
+    Returns the block, its handle for the receiver and the frame
+    descriptors, or None when the batch does
+    not fit in /dev/shm; the caller then sends the frames inline. The block
+    goes back to the pool once the server has replied.
+    """
+    total = sum(array.nbytes for _, array in images)
+    if total == 0:
+        return None
+    block = pool.acquire(total)
+    if block is None:
+        return None
+    descriptors = []
+    offset = 0
+    for name, array in images:
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=offset)
+        view[...] = array
+        descriptors.append((name, array.shape, array.dtype.str, offset))
+        offset += array.nbytes
+    del view
+    return block, (block.name, block.token), descriptors
+
+
+class _Attachments:
+    """
+    Receiver-side LRU of mapped blocks, so a reused block is mapped once.
+    An evicted block whose sender has unlinked it is freed on unmapping.
+    """
+
+    def __init__(self, max_blocks: int = 16):
+        self.max_blocks = max_blocks
+        self._blocks: "OrderedDict[BlockHandle, shared_memory.SharedMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, handle: BlockHandle) -> shared_memory.SharedMemory:
+        with self._lock:
+            block = self._blocks.get(handle)
+            if block is not None:
+                self._blocks.move_to_end(handle)
+                return block
+        block = shared_memory.SharedMemory(name=handle[0])
+        # The sender unlinks the block; stop this process's resource tracker
+        # from unlinking it (and warning about a leak) when this process exits
+        resource_tracker.unregister(block._name, "shared_memory")
+        with self._lock:
+            stale = [self._blocks.pop(key) for key in list(self._blocks) if key[0] == handle[0]]
+            self._blocks[handle] = block
+            evicted = [self._blocks.popitem(last=False)[1] for _ in range(len(self._blocks) - self.max_blocks)]
+        for old in stale + evicted:
+            _close_quietly(old)
+        return block
+
+
+def _close_quietly(block: shared_memory.SharedMemory):
+    try:
+        block.close()
+    except BufferError:
+        # A view escaped (kept by a result); the mapping goes when it is collected
+        pass
+
+
+_attachments = _Attachments()
+
+
+@contextmanager
+def attach_frames(handle: BlockHandle, descriptors: List[FrameDescriptor]) -> Iterator[List[Tuple[str, np.ndarray]]]:
+    """
+    Map a block created by pack_frames in another process and yield
+    (name, array) views into it. Views must not outlive the context: the
+    sender reuses the block for its next batch.
+    """
+    block = _attachments.get(tuple(handle))
+    frames = [
+        (name, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf, offset=offset))
+        for name, shape, dtype, offset in descriptors
+    ]
+    try:
+        yield frames
+    finally:
+        frames.clear()
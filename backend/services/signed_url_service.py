@@ -0,0 +1,188 @@
+"""
+Keeps the signed URLs stored in session_metadata.json usable.
+
+File records carry imageUrl, previewUrl, thumbnailUrl and labelUrl, signed
+when the image was processed and valid for SIGNED_URL_HOURS; urlsExpireAt
+records when they lapse (older records fall back to createdAt plus the
+lifetime). Status reads check the expiry column of all records at once and
+re-sign only the records due:
+
+    expiring within SIGNED_URL_MIN_TTL_MINUTES   re-signed before responding,
+                                                 up to SIGNED_URL_INLINE_MAX_RECORDS
+    expiring within SIGNED_URL_REFRESH_MINUTES   still returned as they are,
+                                                 re-signed in the background
+
+A session left alone past the URL lifetime has every record due at once, so
+the inline cap bounds that read; the records beyond it are reported as
+pending and re-signed by the background job. Signing is spread over
+SIGNED_URL_WORKERS threads in chunks.
+
+The background job writes the refreshed records back to the metadata,
+guarded by its generation so it never overwrites a concurrent upload; when
+it loses that race the next status read simply finds the records due again.
+So a polled session re-signs each record about once per lifetime instead of
+once per poll.
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from core.config import (
+    SIGNED_URL_HOURS,
+    SIGNED_URL_INLINE_MAX_RECORDS,
+    SIGNED_URL_MIN_TTL_MINUTES,
+    SIGNED_URL_REFRESH_MINUTES,
+    SIGNED_URL_WORKERS,
+)
+from core.logger import setup_logger
+from core.telemetry import span
+from services.GCS_service import GCSService
+
+logger = setup_logger("signed_urls", "logs/signed_urls.log")
+
+URL_FIELDS = ("imageUrl", "previewUrl", "thumbnailUrl", "labelUrl")
+
+_WRITE_RETRIES = 3
+_SIGN_CHUNK = 64
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=SIGNED_URL_WORKERS, thread_name_prefix="sign-urls")
+    return _executor
+
+
+def url_expiries(files: List[dict]) -> np.ndarray:
+    """
+    datetime64 expiry of each record's URLs; NaT when it cannot be told,
+    which callers treat as expired.
+    """
+    stamped = np.array([f.get("urlsExpireAt") or "" for f in files], dtype="datetime64[s]")
+    missing = np.isnat(stamped)
+    if missing.any():
+        created = np.array([f.get("createdAt") or "" for f, m in zip(files, missing) if m], dtype="datetime64[us]")
+        stamped[missing] = (created + np.timedelta64(SIGNED_URL_HOURS, "h")).astype("datetime64[s]")
+    return stamped
+
+
+def due_records(files: List[dict], within: timedelta, now: Optional[datetime] = None) -> np.ndarray:
+    """Indices of the records whose URLs expire within `within` of now (UTC)."""
+    if not files:
+        return np.zeros(0, dtype=int)
+    deadline = np.datetime64((now or datetime.utcnow()) + within, "s")
+    # Comparisons with NaT are False, so unknown expiries count as due
+    return np.flatnonzero(~(url_expiries(files) >= deadline))
+
+
+def _blob_path(url: str) -> str:
+    # https://storage.googleapis.com/<bucket>/<quoted blob path>?X-Goog-...
+    return unquote(urlsplit(url).path.split("/", 2)[2])
+
+
+def resign_records(files: List[dict], indices: np.ndarray) -> int:
+    """
+    Re-sign every URL of the given records in place and stamp their new
+    expiry. Returns the number of URLs signed.
+    """
+    fields = [(files[i], field) for i in indices for field in URL_FIELDS if files[i].get(field)]
+    paths = [_blob_path(record[field]) for record, field in fields]
+    chunks = [paths[start:start + _SIGN_CHUNK] for start in range(0, len(paths), _SIGN_CHUNK)]
+    signed_at = datetime.utcnow()
+    with span("sign_urls", records=len(indices), urls=len(paths)):
+        if len(chunks) > 1 and SIGNED_URL_WORKERS > 1:
+            urls = [url for chunk in _get_executor().map(GCSService.generate_signed_urls, chunks) for url in chunk]
+        else:
+            urls = GCSService.generate_signed_urls(paths)
+    for (record, field), url in zip(fields, urls):
+        record[field] = url
+    expires_at = (signed_at + timedelta(hours=SIGNED_URL_HOURS)).isoformat(timespec="seconds")
+    for i in indices:
+        files[i]["urlsExpireAt"] = expires_at
+    return len(urls)
+
+
+def refresh_session_urls(metadata: dict, max_records: int = SIGNED_URL_INLINE_MAX_RECORDS) -> dict:
+    """
+    Re-sign, in place, the URLs of up to `max_records` records about to
+    lapse before they are returned, and count those left to the background.
+
+    Args:
+        metadata: Parsed session_metadata.json
+        max_records: Records re-signed inline, in metadata order
+
+    Returns:
+        {"resigned": {filename: re-signed URL fields and urlsExpireAt},
+         "pending": number of records returned with lapsing URLs,
+         "prewarm": number of records to re-sign in the background}
+    """
+    files = metadata.get("files", [])
+    urgent = due_records(files, timedelta(minutes=SIGNED_URL_MIN_TTL_MINUTES))
+    inline = urgent[:max_records]
+    resign_records(files, inline)
+    prewarm = due_records(files, timedelta(minutes=SIGNED_URL_REFRESH_MINUTES))
+    resigned = {
+        files[i]["filename"]: {k: files[i][k] for k in (*URL_FIELDS, "urlsExpireAt") if k in files[i]}
+        for i in inline
+    }
+    return {"resigned": resigned, "pending": len(urgent) - len(inline), "prewarm": len(prewarm)}
+
+
+def persist_refreshed_urls(session_id: str, resigned: Optional[Dict[str, dict]] = None):
+    """
+    Background half of the refresh: re-read the metadata, take the URLs
+    already re-signed by the request (`resigned`, by filename), re-sign
+    the records still due within SIGNED_URL_REFRESH_MINUTES and write it
+    back if nobody else wrote it meanwhile. One job per session at a time.
+    """
+    with _refreshing_lock:
+        if session_id in _refreshing:
+            return
+        _refreshing.add(session_id)
+    metadata_path = f"{session_id}/session_metadata.json"
+    try:
+        bucket = GCSService.get_bucket()
+        for attempt in range(_WRITE_RETRIES):
+            blob = bucket.get_blob(metadata_path)
+            if blob is None:
+                return
+            try:
+                metadata = json.loads(blob.download_as_bytes(if_generation_match=blob.generation))
+            except (NotFound, PreconditionFailed):
+                continue
+            files = metadata.get("files", [])
+            for record in files:
+                fresh = (resigned or {}).get(record["filename"])
+                if fresh and fresh.get("urlsExpireAt", "") > (record.get("urlsExpireAt") or ""):
+                    record.update(fresh)
+            due = due_records(files, timedelta(minutes=SIGNED_URL_REFRESH_MINUTES))
+            signed = resign_records(files, due)
+            if not signed and not resigned:
+                return
+            try:
+                bucket.blob(metadata_path).upload_from_string(
+                    json.dumps(metadata, indent=2), content_type="application/json",
+                    if_generation_match=blob.generation
+                )
+            except PreconditionFailed:
+                time.sleep(0.05 * (attempt + 1))
+                continue
+            logger.info(f"Refreshed signed URLs of {len(due)} record(s) in session {session_id}")
+            return
+        logger.info(f"Session {session_id} metadata kept changing; its URLs are refreshed on a later read")
+    except Exception as err:
+        logger.error(f"Could not refresh signed URLs of session {session_id}: {err}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(session_id)
+
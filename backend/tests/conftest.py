@@ -0,0 +1,78 @@
+"""
+Shared fixtures: the API routers on an in-memory GCS bucket and a mongomock
+database (installed through core.database.set_clients), with bcrypt at its
+lowest cost so logins stay fast.
+"""
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+
+from benchmarks.fake_gcs import install_fake_gcs
+from benchmarks.fake_mongo import install_fake_mongo
+from core import database
+
+# Read by auth.login at import, before any test module imports the routes
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+
+PASSWORD = "test-secret"
+
+
+@pytest.fixture
+def bucket():
+    from services.GCS_service import GCSService
+
+    previous = GCSService._client
+    yield install_fake_gcs()
+    GCSService._client = previous
+
+
+@pytest.fixture
+def mongo():
+    client = install_fake_mongo()
+    yield client[database.DB_NAME]
+    database.set_clients(None, None)
+
+
+@pytest.fixture
+def users(mongo):
+    """Adds a user: users(email, session_id=None, stored_password=bcrypt hash of PASSWORD)."""
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(PASSWORD)
+
+    def add(email: str, session_id: str = None, stored_password: str = None):
+        user = {"email": email, "username": email.split("@")[0], "hashed_password": hashed}
+        if stored_password is not None:
+            user["hashed_password"] = stored_password
+        if session_id:
+            user["session_id"] = session_id
+        mongo["users"].insert_one(user)
+        return user
+
+    return add
+
+
+@pytest.fixture
+def app(bucket, mongo):
+    from api.routes import router as api_router
+    from auth.jwt_auth import token_cache
+    from auth.login import router as login_router
+
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api")
+    app.include_router(login_router, prefix="/api")
+    token_cache.clear()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def login(client, email: str, password: str = PASSWORD) -> dict:
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return response.json()
@@ -0,0 +1,80 @@
+from jose import jwt
+
+from auth.login import ALGORITHM, SECRET_KEY
+from tests.conftest import PASSWORD, login
+
+
+def test_login_returns_token_with_session_claim(client, users):
+    users("ann@example.com", session_id="session-ann")
+
+    body = login(client, "ann@example.com")
+
+    assert body["session_id"] == "session-ann"
+    assert body["email"] == "ann@example.com"
+    claims = jwt.decode(body["access_token"], SECRET_KEY, algorithms=[ALGORITHM])
+    assert claims["sub"] == "ann@example.com"
+    assert claims["session_id"] == "session-ann"
+
+
+def test_login_assigns_and_stores_a_session_id(client, users, mongo):
+    users("bob@example.com")
+
+    body = login(client, "bob@example.com")
+
+    assert body["session_id"]
+    assert mongo["users"].find_one({"email": "bob@example.com"})["session_id"] == body["session_id"]
+    # The next login keeps the same session
+    assert login(client, "bob@example.com")["session_id"] == body["session_id"]
+
+
+def test_login_rejects_wrong_password(client, users):
+    users("cat@example.com")
+
+    response = client.post("/api/auth/login", json={"email": "cat@example.com", "password": "wrong"})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Incorrect password"
+
+
+def test_login_rejects_unknown_email(client, users):
+    response = client.post("/api/auth/login", json={"email": "nobody@example.com", "password": PASSWORD})
+
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Email not found"
+
+
+def test_login_accepts_legacy_plaintext_password(client, users):
+    users("dev@example.com", stored_password="plain")
+
+    assert login(client, "dev@example.com", "plain")["email"] == "dev@example.com"
+
+
+def test_verifier_counts_are_exported_as_metrics(client, users):
+    from auth.password import VERIFICATIONS
+    from core.telemetry import render_metrics
+
+    users("ann@example.com")
+    completed = VERIFICATIONS.value("completed") + VERIFICATIONS.value("cache_hit")
+    login(client, "ann@example.com")
+
+    assert VERIFICATIONS.value("completed") + VERIFICATIONS.value("cache_hit") == completed + 1
+    metrics = render_metrics()
+    assert 'dugong_password_verifications_total{outcome="completed"}' in metrics
+    assert "dugong_password_verify_in_flight 0" in metrics
+    assert "dugong_password_verify_queued 0" in metrics
+    assert client.get("/api/auth/verifier-stats").status_code == 404
+
+
+def test_no_tokens_without_secret_key(client, users, monkeypatch):
+    import auth.jwt_auth
+    import auth.login
+
+    users("ann@example.com")
+    token = login(client, "ann@example.com")["access_token"]
+    monkeypatch.setattr(auth.login, "SECRET_KEY", "")
+    monkeypatch.setattr(auth.jwt_auth, "SECRET_KEY", "")
+
+    response = client.post("/api/auth/login", json={"email": "ann@example.com", "password": PASSWORD})
+    assert response.status_code == 503
+    response = client.post("/api/cleanup-sessions/ann@example.com", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 503
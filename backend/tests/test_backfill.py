@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from services import backfill_service, session_metadata
+from services.backfill_service import _checkpoint, backfill_status
+from services.session_metadata import read_session_metadata, update_session_metadata
+
+
+def record(name: str) -> dict:
+    return {"filename": name, "imageClass": "resting", "createdAt": datetime.utcnow().isoformat()}
+
+
+def filenames(session_id: str) -> list:
+    return [f["filename"] for f in read_session_metadata(session_id)[0]["files"]]
+
+
+def test_checkpoint_merges_by_filename(bucket):
+    _checkpoint("s1", "run", [record("a.jpg"), record("b.jpg")], 2, 1)
+    _checkpoint("s1", "run", [record("b.jpg"), record("c.jpg")], 3, 0)
+
+    metadata, _ = read_session_metadata("s1")
+    assert filenames("s1") == ["a.jpg", "b.jpg", "c.jpg"]
+    assert metadata["file_count"] == 3
+    assert metadata["backfill"]["status"] == "completed"
+    assert metadata["backfill"]["runId"] == "run"
+
+
+def test_checkpoint_keeps_records_of_an_interleaved_upload(bucket, monkeypatch):
+    _checkpoint("s1", "run", [record("a.jpg")], 1, 2)
+    interleaved = []
+
+    def upload(metadata):
+        session_metadata.merge_file_records(metadata, [record("upload.jpg")])
+
+    def update_with_race(session_id, apply):
+        def racing_apply(metadata):
+            # An upload writes between this checkpoint's read and its write
+            if not interleaved:
+                interleaved.append(update_session_metadata(session_id, upload))
+            return apply(metadata)
+        return update_session_metadata(session_id, racing_apply)
+
+    monkeypatch.setattr(backfill_service, "update_session_metadata", update_with_race)
+    _checkpoint("s1", "run", [record("b.jpg")], 2, 1)
+
+    assert interleaved
+    assert sorted(filenames("s1")) == ["a.jpg", "b.jpg", "upload.jpg"]
+
+
+def test_failed_run_is_recorded(bucket, monkeypatch):
+    _checkpoint("s1", "run", [record("a.jpg")], 1, 1)
+
+    def fail(*args):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(backfill_service, "_backfill_pass", fail)
+    try:
+        backfill_service.run_backfill("s1")
+    except RuntimeError:
+        pass
+
+    backfill = read_session_metadata("s1")[0]["backfill"]
+    assert backfill["status"] == "failed"
+    assert backfill["error"] == "model crashed"
+    assert filenames("s1") == ["a.jpg"]
+
+
+def test_failed_run_of_an_empty_session_writes_nothing(bucket, monkeypatch):
+    monkeypatch.setattr(backfill_service, "_backfill_pass", lambda *args: 1 / 0)
+    try:
+        backfill_service.run_backfill("s1")
+    except ZeroDivisionError:
+        pass
+
+    assert read_session_metadata("s1") == ({}, 0)
+
+
+def test_running_backfill_without_recent_checkpoint_is_stale():
+    now = datetime.utcnow()
+    running = {"backfill": {"status": "running", "updatedAt": now.isoformat()}}
+
+    assert backfill_status(running, now + timedelta(seconds=60))["status"] == "running"
+    assert backfill_status(running, now + timedelta(hours=1))["status"] == "stale"
+    assert backfill_status({"backfill": {"status": "completed", "updatedAt": now.isoformat()}},
+                           now + timedelta(hours=1))["status"] == "completed"
+    assert backfill_status({}) is None
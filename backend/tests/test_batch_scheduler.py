@@ -0,0 +1,49 @@
+import pytest
+
+from services.batch_scheduler import BatchScheduler
+
+
+def echo(images, session_id):
+    return [f"{session_id}:{image}" for image in images]
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(run_batch=echo, **kwargs):
+        scheduler = BatchScheduler(run_batch, max_batch_size=8, max_wait=0.01, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_wrong_result_count_fails_the_callers(make_scheduler):
+    scheduler = make_scheduler(lambda images, session_id: echo(images, session_id)[:-1])
+
+    future = scheduler.submit(["a.jpg", "b.jpg"], "s1")
+
+    with pytest.raises(RuntimeError, match="1 results for 2 images"):
+        future.result(timeout=5)
+
+
+def test_worker_survives_a_failing_dispatch(make_scheduler, monkeypatch):
+    scheduler = make_scheduler()
+    dispatch = scheduler._dispatch
+    calls = []
+
+    def fail_once(slices):
+        calls.append(slices)
+        if len(calls) == 1:
+            raise ValueError("broken batch")
+        dispatch(slices)
+
+    monkeypatch.setattr(scheduler, "_dispatch", fail_once)
+
+    with pytest.raises(ValueError):
+        scheduler.submit(["a.jpg"], "s1").result(timeout=5)
+    assert scheduler.submit(["b.jpg"], "s2").result(timeout=5) == ["s2:b.jpg"]
+    assert scheduler.stats()["queued_images"] == 0
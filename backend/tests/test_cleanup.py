@@ -0,0 +1,49 @@
+from tests.conftest import login
+
+
+def seed_session(bucket, session_id: str, names=("images/a.jpg", "results/a.jpg", "session_metadata.json")):
+    for name in names:
+        bucket.blob(f"{session_id}/{name}").upload_from_string(b"x")
+
+
+def test_cleanup_deletes_session_folder_and_clears_session_id(client, users, bucket, mongo):
+    users("ann@example.com", session_id="session-ann")
+    seed_session(bucket, "session-ann")
+    seed_session(bucket, "session-other")
+    headers = {"Authorization": f"Bearer {login(client, 'ann@example.com')['access_token']}"}
+
+    response = client.post("/api/cleanup-sessions/ann@example.com", headers=headers)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["session_id"] == "session-ann"
+    assert response.json()["gcs_deleted"] is True
+    assert response.json()["gcs_file_count"] == 3
+    assert not list(bucket.list_blobs(prefix="session-ann/"))
+    assert len(list(bucket.list_blobs(prefix="session-other/"))) == 3
+    assert "session_id" not in mongo["users"].find_one({"email": "ann@example.com"})
+
+
+def test_cleanup_refuses_another_users_account(client, users, bucket):
+    users("ann@example.com", session_id="session-ann")
+    users("bob@example.com", session_id="session-bob")
+    seed_session(bucket, "session-bob")
+    headers = {"Authorization": f"Bearer {login(client, 'ann@example.com')['access_token']}"}
+
+    response = client.post("/api/cleanup-sessions/bob@example.com", headers=headers)
+
+    assert response.status_code == 403
+    assert len(list(bucket.list_blobs(prefix="session-bob/"))) == 3
+
+
+def test_cleanup_unknown_user(client, mongo):
+    response = client.post("/api/cleanup-sessions/nobody@example.com")
+
+    assert response.status_code == 404
+
+
+def test_cleanup_without_session(client, users):
+    users("ann@example.com")
+
+    response = client.post("/api/cleanup-sessions/ann@example.com")
+
+    assert response.status_code == 400
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from services import detections_store
+from services.detections_store import append_detections, load_detections
+
+
+def result(name: str, boxes: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        image_name=name,
+        cls=np.zeros(boxes, dtype=np.int16),
+        xywhn=np.full((boxes, 4), 0.5, dtype=np.float32),
+        conf=np.full(boxes, 0.9, dtype=np.float32),
+    )
+
+
+def test_append_replaces_rows_of_reprocessed_images(bucket):
+    append_detections("s1", [result("a.jpg", 2), result("b.jpg", 1)])
+    append_detections("s1", [result("a.jpg", 3)])
+
+    store = load_detections("s1")
+    assert sorted(store["images"]) == ["a.jpg", "b.jpg"]
+    assert list(store["image"]).count("a.jpg") == 3
+    assert list(store["image"]).count("b.jpg") == 1
+    assert store["xywhn"].shape == (4, 4)
+
+
+def test_append_retries_when_the_store_changes_concurrently(bucket, monkeypatch):
+    append_detections("s1", [result("a.jpg", 1)])
+    read = detections_store._read
+    raced = []
+
+    def read_then_race(session_id):
+        store = read(session_id)
+        if not raced:
+            # Another writer commits after this read, before the upload
+            raced.append(True)
+            append_detections(session_id, [result("other.jpg", 2)])
+        return store
+
+    monkeypatch.setattr(detections_store, "_read", read_then_race)
+    append_detections("s1", [result("b.jpg", 1)])
+
+    store = load_detections("s1")
+    assert raced
+    assert sorted(store["images"]) == ["a.jpg", "b.jpg", "other.jpg"]
+    assert len(store["image"]) == 4
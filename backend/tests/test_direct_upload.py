@@ -0,0 +1,97 @@
+import base64
+import json
+
+import pytest
+
+from services import backfill_service, inference_client
+from services.batch_scheduler import SchedulerBusy
+from services.GCS_service import GCSService
+
+
+def storage_event(name: str) -> dict:
+    resource = {"name": name, "metadata": {"upload-mode": "direct"}}
+    return {"message": {
+        "attributes": {"eventType": "OBJECT_FINALIZE", "bucketId": GCSService.BUCKET_NAME, "objectId": name},
+        "data": base64.b64encode(json.dumps(resource).encode()).decode()
+    }}
+
+
+@pytest.fixture
+def scheduled(monkeypatch):
+    import api.routes as routes
+
+    calls = []
+    monkeypatch.setattr(routes, "STORAGE_EVENTS_TOKEN", "event-token")
+    monkeypatch.setattr(routes, "_run_backfill_logged", lambda *args: calls.append(args))
+    return calls
+
+
+def test_storage_event_schedules_a_verified_upload(client, bucket, scheduled):
+    bucket.blob("s1/images/a.jpg").upload_from_string(b"x" * 100)
+
+    response = client.post("/api/storage-events/?token=event-token", json=storage_event("s1/images/a.jpg"))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["scheduled"] is True
+    assert [call[0] for call in scheduled] == ["s1"]
+
+
+def test_storage_event_deletes_an_oversized_upload(client, bucket, scheduled, monkeypatch):
+    from services import direct_upload_service
+
+    monkeypatch.setattr(direct_upload_service, "MAX_FILE_SIZE", 10)
+    bucket.blob("s1/images/a.jpg").upload_from_string(b"x" * 100)
+
+    response = client.post("/api/storage-events/?token=event-token", json=storage_event("s1/images/a.jpg"))
+
+    assert response.status_code == 200, response.text
+    assert response.json()["scheduled"] is False
+    assert response.json()["rejected"] == [{"filename": "a.jpg", "reason": "file too large"}]
+    assert "s1/images/a.jpg" not in bucket.objects
+    assert not scheduled
+
+
+class CountingBackend:
+    """Admits after `busy` refusals and records the tickets held while batches are consumed."""
+
+    def __init__(self, busy: int = 0):
+        self.busy = busy
+        self.held = []
+        self.admitted = []
+
+    def admit(self, session_id, images):
+        if self.busy:
+            self.busy -= 1
+            raise SchedulerBusy("at capacity", 0)
+        self.admitted.append(images)
+        self.held.append(images)
+        return len(self.admitted)
+
+    def release(self, ticket):
+        self.held.pop()
+
+    def run_model_on_blobs(self, blob_paths, session_id, batch_size, duplicates=None):
+        for start in range(0, len(blob_paths), batch_size):
+            assert self.held, "batch inferred without an admission ticket"
+            yield []
+
+
+def test_backfill_batches_hold_admission_tickets(bucket, monkeypatch):
+    for i in range(5):
+        bucket.blob(f"s1/images/{i}.jpg").upload_from_string(b"x")
+    backend = CountingBackend(busy=2)
+    monkeypatch.setattr(inference_client, "inference_backend", lambda: backend)
+
+    backfill_service.run_backfill("s1", batch_size=2)
+
+    assert backend.admitted[:3] == [2, 2, 2]
+    assert not backend.held
+
+
+def test_backfill_admission_gives_up_after_the_timeout():
+    backend = CountingBackend(busy=1)
+
+    with pytest.raises(SchedulerBusy):
+        with backfill_service._admission(backend, "s1", 2, timeout=-1):
+            pass
+    assert not backend.admitted
@@ -0,0 +1,81 @@
+import json
+
+from services.session_metadata import read_session_metadata, update_session_metadata
+
+
+def seed_session(bucket, session_id: str, names=("a.jpg", "b.jpg")):
+    for name in names:
+        bucket.blob(f"{session_id}/images/{name}").upload_from_string(b"x")
+    metadata = {"files": [{"filename": name, "imageClass": "feeding"} for name in names]}
+    bucket.blob(f"{session_id}/session_metadata.json").upload_from_string(json.dumps(metadata))
+
+
+def classes(session_id: str) -> dict:
+    return {f["filename"]: f["imageClass"] for f in read_session_metadata(session_id)[0]["files"]}
+
+
+def test_move_one_image(client, bucket):
+    seed_session(bucket, "s1")
+
+    response = client.post("/api/move-to-false-positive/", json={
+        "sessionId": "s1", "imageName": "a.jpg?X-Goog-Signature=abc", "targetClass": "feeding"
+    })
+
+    assert response.status_code == 200, response.text
+    assert "s1/False positives/resting/a.jpg" in bucket.objects
+    assert "s1/images/a.jpg" not in bucket.objects
+    assert classes("s1") == {"a.jpg": "resting", "b.jpg": "feeding"}
+
+
+def test_move_one_image_keeps_concurrent_metadata_changes(client, bucket, monkeypatch):
+    seed_session(bucket, "s1")
+    import api.routes as routes
+
+    def update_after_race(session_id, update):
+        # Another writer adds a file just before the move writes the metadata
+        monkeypatch.setattr(routes, "update_session_metadata", update_session_metadata)
+        update_session_metadata(session_id, lambda m: m["files"].append({"filename": "c.jpg", "imageClass": "resting"}))
+        return update_session_metadata(session_id, update)
+
+    monkeypatch.setattr(routes, "update_session_metadata", update_after_race)
+
+    response = client.post("/api/move-to-false-positive/", json={
+        "sessionId": "s1", "imageName": "b.jpg", "targetClass": "feeding"
+    })
+
+    assert response.status_code == 200, response.text
+    assert classes("s1") == {"a.jpg": "feeding", "b.jpg": "resting", "c.jpg": "resting"}
+
+
+def test_move_missing_image(client, bucket):
+    seed_session(bucket, "s1")
+
+    response = client.post("/api/move-to-false-positive/", json={
+        "sessionId": "s1", "imageName": "missing.jpg", "targetClass": "feeding"
+    })
+
+    assert response.status_code == 404
+
+
+def test_bulk_move_keeps_uploads_that_finish_during_the_moves(bucket, mongo, monkeypatch):
+    from services import false_positive_service
+    from services.false_positive_service import move_to_false_positives
+
+    seed_session(bucket, "s1")
+    move_blob = false_positive_service._move_blob
+
+    def move_while_uploading(bucket_, session_id, image_name, image_class):
+        move_blob(bucket_, session_id, image_name, image_class)
+        update_session_metadata(session_id, lambda m: m["files"].append(
+            {"filename": f"new-{image_name}", "imageClass": "feeding"}
+        ))
+
+    monkeypatch.setattr(false_positive_service, "_move_blob", move_while_uploading)
+
+    summary = move_to_false_positives("s1", [("a.jpg", "feeding"), ("b.jpg", "feeding"), ("gone.jpg", "resting")])
+
+    assert sorted(m["imageName"] for m in summary["moved"]) == ["a.jpg", "b.jpg"]
+    assert summary["notFound"] == ["gone.jpg"]
+    assert classes("s1") == {
+        "a.jpg": "resting", "b.jpg": "resting", "new-a.jpg": "feeding", "new-b.jpg": "feeding"
+    }
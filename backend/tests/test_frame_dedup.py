@@ -0,0 +1,37 @@
+import numpy as np
+
+from schemas.detection import DetectionResult
+from services.frame_dedup import frame_index_blob_path, run_deduplicated
+
+
+def frames(*names):
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    return [(name, image.copy()) for name in names]
+
+
+def infer(images):
+    return [
+        DetectionResult(
+            dugong_count=0, calf_count=0, image_class="resting", image_bytes=b"", label_content="",
+            image_name=name, preview_bytes=b"", renditions=None, cls=np.zeros(0, dtype=np.int16),
+            xywhn=np.zeros((0, 4), dtype=np.float32), conf=np.zeros(0, dtype=np.float32)
+        )
+        for name, _ in images
+    ]
+
+
+def test_default_mode_leaves_the_frame_index_alone(bucket):
+    results = run_deduplicated(frames("a.jpg", "b.jpg"), "s1", infer)
+
+    assert [r.duplicate_of for r in results] == [None, None]
+    assert frame_index_blob_path("s1") not in bucket.objects
+    assert bucket.requests == 0
+
+
+def test_flag_mode_marks_duplicates_across_uploads(bucket):
+    run_deduplicated(frames("a.jpg"), "s1", infer, mode="flag")
+    results = run_deduplicated(frames("b.jpg"), "s1", infer, mode="flag")
+
+    assert results[0].duplicate_of == "a.jpg"
+    assert frame_index_blob_path("s1") in bucket.objects
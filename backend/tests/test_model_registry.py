@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import torch
+
+from services.model_registry import save_fused
+
+
+def test_concurrent_save_fused_publishes_a_complete_checkpoint(tmp_path):
+    path = tmp_path / "best.fused-fp32.pt"
+    models = [SimpleNamespace(ckpt={"epoch": i}, model=torch.nn.Linear(256, 256)) for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda model: save_fused(model, path), models))
+
+    checkpoint = torch.load(path, weights_only=False)
+    assert checkpoint["ema"] is None
+    assert isinstance(checkpoint["model"], torch.nn.Linear)
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
@@ -0,0 +1,28 @@
+import numpy as np
+
+from services.render_service import render_image
+from services.rendition_service import upload_renditions
+
+
+def image(width: int = 1200, height: int = 800) -> np.ndarray:
+    return np.full((height, width, 3), 128, dtype=np.uint8)
+
+
+def test_same_stem_different_extension_keeps_separate_renditions(bucket):
+    _, _, renditions = render_image(image(), np.array([[10, 10, 50, 50]]), np.array([0]))
+    upload_renditions("s1", "a.jpg", renditions)
+    upload_renditions("s1", "a.png", renditions)
+
+    assert "s1/renditions/a.jpg/manifest.json" in bucket.objects
+    assert "s1/renditions/a.png/manifest.json" in bucket.objects
+
+
+def test_tiles_only_for_frames_with_detections():
+    _, _, with_boxes = render_image(image(), np.array([[10, 10, 50, 50]]), np.array([0]))
+    _, _, empty = render_image(image(), np.zeros((0, 4)), np.zeros(0, dtype=int), draw_boxes=False)
+
+    assert with_boxes["manifest"]["levels"] > 1
+    assert any(name.startswith("tiles/") for name in with_boxes)
+    assert empty["manifest"]["levels"] == 0
+    assert not any(name.startswith("tiles/") for name in empty)
+    assert "thumb.jpg" in empty
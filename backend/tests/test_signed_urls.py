@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+from core.config import SIGNED_URL_HOURS
+from services import signed_url_service
+from services.session_metadata import read_session_metadata, update_session_metadata
+from services.signed_url_service import due_records, persist_refreshed_urls, refresh_session_urls
+
+NOW = datetime(2026, 5, 1, 12, 0, 0)
+
+
+def record(name: str, expires_at: datetime = None, created_at: datetime = None) -> dict:
+    entry = {
+        "filename": name,
+        "imageUrl": f"https://storage.googleapis.com/bucket/s1/results/{name}?X-Goog-Signature=old",
+        "previewUrl": f"https://storage.googleapis.com/bucket/s1/previews/{name}?X-Goog-Signature=old",
+        "labelUrl": None,
+        "createdAt": (created_at or NOW).isoformat(),
+    }
+    if expires_at:
+        entry["urlsExpireAt"] = expires_at.isoformat(timespec="seconds")
+    return entry
+
+
+def seed(files: list):
+    update_session_metadata("s1", lambda metadata: metadata.update({"files": files}))
+
+
+def test_due_records():
+    files = [
+        record("fresh.jpg", NOW + timedelta(hours=5)),
+        record("soon.jpg", NOW + timedelta(minutes=5)),
+        record("lapsed.jpg", NOW - timedelta(hours=1)),
+        # Unstamped: createdAt plus the lifetime
+        record("old.jpg", created_at=NOW - timedelta(hours=SIGNED_URL_HOURS)),
+        record("new.jpg", created_at=NOW),
+        {"filename": "unknown.jpg"},
+    ]
+
+    due = due_records(files, timedelta(minutes=15), now=NOW)
+
+    assert [files[i]["filename"] for i in due] == ["soon.jpg", "lapsed.jpg", "old.jpg", "unknown.jpg"]
+
+
+def test_refresh_resigns_lapsing_records_up_to_the_cap(bucket):
+    lapsed = NOW - timedelta(hours=1)
+    metadata = {"files": [record(f"{i}.jpg", lapsed) for i in range(5)] + [
+        record("fresh.jpg", datetime.utcnow() + timedelta(hours=10))]}
+
+    refresh = refresh_session_urls(metadata, max_records=2)
+
+    assert sorted(refresh["resigned"]) == ["0.jpg", "1.jpg"]
+    assert refresh["pending"] == 3
+    assert refresh["prewarm"] == 3
+    files = metadata["files"]
+    assert "X-Goog-Expires" in files[0]["imageUrl"] and "/s1/results/0.jpg" in files[0]["imageUrl"]
+    assert files[0]["labelUrl"] is None
+    assert files[2]["imageUrl"].endswith("X-Goog-Signature=old")
+    assert bucket.signed_urls == 4
+
+
+def test_persist_writes_back_and_signs_the_rest(bucket):
+    seed([record(f"{i}.jpg", NOW - timedelta(hours=1)) for i in range(3)])
+    metadata, _ = read_session_metadata("s1")
+    refresh = refresh_session_urls(metadata, max_records=1)
+    signed = bucket.signed_urls
+
+    persist_refreshed_urls("s1", refresh["resigned"])
+
+    files = read_session_metadata("s1")[0]["files"]
+    assert files[0]["imageUrl"] == metadata["files"][0]["imageUrl"]
+    assert all("X-Goog-Expires" in f["imageUrl"] for f in files)
+    assert not len(due_records(files, timedelta(minutes=15)))
+    # Only the two records not re-signed by the request were signed again
+    assert bucket.signed_urls - signed == 4
+
+
+def test_persist_keeps_a_concurrent_upload(bucket, monkeypatch):
+    seed([record("a.jpg", NOW - timedelta(hours=1))])
+    resign = signed_url_service.resign_records
+    raced = []
+
+    def resign_then_race(files, indices):
+        signed = resign(files, indices)
+        if not raced:
+            raced.append(True)
+            update_session_metadata("s1", lambda metadata: metadata["files"].append(record("upload.jpg")))
+        return signed
+
+    monkeypatch.setattr(signed_url_service, "resign_records", resign_then_race)
+    persist_refreshed_urls("s1")
+
+    files = read_session_metadata("s1")[0]["files"]
+    assert raced
+    assert [f["filename"] for f in files] == ["a.jpg", "upload.jpg"]
+    assert "X-Goog-Expires" in files[0]["imageUrl"]
@@ -0,0 +1,53 @@
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from benchmarks.bench_fairness import run_scenario
+from benchmarks.bench_pipeline import synthetic_aerial
+from benchmarks.stubs import install_model_stub
+
+
+@pytest.fixture
+def model_stub(monkeypatch):
+    """The stub model (10 ms per image) behind the in-process batch scheduler."""
+    import services.batch_scheduler as batch_scheduler
+
+    monkeypatch.delitem(sys.modules, "services.model_service", raising=False)
+    install_model_stub(compute_per_image=0.01)
+    yield
+    if batch_scheduler._scheduler is not None:
+        batch_scheduler._scheduler.close()
+        batch_scheduler._scheduler = None
+
+
+def test_small_uploads_stay_fast_during_a_large_upload(app, model_stub):
+    args = SimpleNamespace(batch_size=4, max_requests=4, small_users=2, large_images=120, quiet_seconds=0)
+    frame = synthetic_aerial(320, 240, seed=0)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+            return await run_scenario("fair", client, frame, args)
+
+    result = asyncio.run(run())
+
+    # A small upload waits for a share of the model, not for the large upload
+    assert result["small_uploads"] >= 4, result
+    assert result["small_max_ms"] < result["large_upload_s"] * 1000 / 3, result
+
+
+def test_upload_refused_when_inference_server_is_unreachable(client, bucket, monkeypatch):
+    import services.inference_client as inference_client
+
+    monkeypatch.setattr(inference_client, "_client",
+                        inference_client.InferenceClient("/nonexistent/inference.sock", b"test-key"))
+
+    response = client.post("/api/upload-multiple/", data={"session_id": "session-ann"},
+                           files=[("files", ("a.jpg", synthetic_aerial(64, 48, seed=0), "image/jpeg"))])
+
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) > 0
+    assert not list(bucket.list_blobs(prefix="session-ann/"))
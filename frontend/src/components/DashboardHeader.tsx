@@ -2,6 +2,7 @@ import { Waves, Upload, Download } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import ImageUploadDialog from "./imageUploadDialog";
 import { useUploadStore } from "@/store/upload";
+import { authHeaders } from "@/store/auth";
 // import Papa from "papaparse";
 
 const API_URL = import.meta.env.VITE_API_URL;
@@ -42,7 +43,8 @@ const DashboardHeader = ({ onImageUpload }: DashboardHeaderProps) => {
     }
     try {
       const response = await fetch(
-        `${API_URL}/export-session-csv/${sessionId}`
+        `${API_URL}/export-session-csv/${sessionId}`,
+        { headers: authHeaders() }
       );
       if (!response.ok) throw new Error("Failed to export CSV");
       const blob = await response.blob();
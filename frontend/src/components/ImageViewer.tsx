@@ -1,18 +1,82 @@
-import { ChevronLeft, ChevronRight } from "lucide-react";
+import { useEffect, useState } from "react";
+import { ChevronLeft, ChevronRight, ZoomIn, ZoomOut } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
+import TiledImage from "@/components/TiledImage";
+import type { TileManifest } from "@/components/TiledImage";
 
 interface ImageViewerProps {
   currentImage: number;
   totalImages: number;
   currentImageData: {
     imageUrl?: string;
+    previewUrl?: string;
+    labelUrl?: string;
+    annotated?: boolean;
+    tiles?: TileManifest | null;
   } | null;
   onPrevious: () => void;
   onNext: () => void;
 }
 
+type LabelBox = { cls: number; cx: number; cy: number; w: number; h: number };
+
+// Same colors the server uses when it burns boxes into the image
+const BOX_COLORS: Record<number, string> = { 0: "#0000ff", 1: "#ff0000" };
+
+// Parse a YOLO label file: "<class> <cx> <cy> <w> <h>" per line, normalized coords
+const parseLabels = (text: string): LabelBox[] =>
+  text
+    .split("\n")
+    .map((line) => line.trim().split(/\s+/).map(Number))
+    .filter((parts) => parts.length >= 5 && parts.every((n) => !isNaN(n)))
+    .map(([cls, cx, cy, w, h]) => ({ cls, cx, cy, w, h }));
+
+const ZOOM_LEVELS = [1, 2, 4, 8];
+
+// Draws detection boxes over an unannotated image from its label file
+const BoxOverlay = ({ labelUrl }: { labelUrl: string }) => {
+  const [boxes, setBoxes] = useState<LabelBox[]>([]);
+
+  useEffect(() => {
+    let cancelled = false;
+    fetch(labelUrl)
+      .then((res) => (res.ok ? res.text() : ""))
+      .then((text) => {
+        if (!cancelled) setBoxes(parseLabels(text));
+      })
+      .catch(() => {
+        if (!cancelled) setBoxes([]);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [labelUrl]);
+
+  return (
+    <svg
+      className="absolute inset-0 w-full h-full pointer-events-none"
+      viewBox="0 0 1 1"
+      preserveAspectRatio="none"
+    >
+      {boxes.map((box, idx) => (
+        <rect
+          key={idx}
+          x={box.cx - box.w / 2}
+          y={box.cy - box.h / 2}
+          width={box.w}
+          height={box.h}
+          fill="none"
+          stroke={BOX_COLORS[box.cls] ?? "#00ff00"}
+          strokeWidth={2}
+          vectorEffect="non-scaling-stroke"
+        />
+      ))}
+    </svg>
+  );
+};
+
 const ImageViewer = ({
   currentImage,
   totalImages,
@@ -20,6 +84,23 @@ const ImageViewer = ({
   onPrevious,
   onNext,
 }: ImageViewerProps) => {
+  const [zoomIndex, setZoomIndex] = useState(0);
+  const zoom = ZOOM_LEVELS[zoomIndex];
+  const tiles = currentImageData?.tiles;
+  const canZoom = !!tiles && tiles.levels > 1;
+  const filename = decodeURIComponent(
+    (currentImageData?.imageUrl || "").split("?")[0].split("/").pop() || ""
+  );
+
+  useEffect(() => {
+    setZoomIndex(0);
+  }, [currentImage]);
+
+  // Show the lightweight preview; the full-resolution image opens on click
+  const displayUrl = currentImageData?.previewUrl || currentImageData?.imageUrl || "";
+  const drawBoxesClientSide =
+    currentImageData?.annotated === false && !!currentImageData?.labelUrl;
+
   return (
     <Card className="border-0 shadow-2xl backdrop-blur-md bg-gradient-to-br from-blue-400 via-teal-500 to-blue-600">
       <CardHeader className="pb-4">
@@ -39,6 +120,31 @@ const ImageViewer = ({
             <Badge className="bg-white/20 backdrop-blur-sm text-white border-white/30 font-medium">
               Image {currentImage} of {totalImages}
             </Badge>
+            {canZoom && (
+              <>
+                <Button
+                  variant="ghost"
+                  size="sm"
+                  className="text-white hover:bg-white/20 hover:text-white"
+                  disabled={zoomIndex === 0}
+                  onClick={() => setZoomIndex((z) => Math.max(0, z - 1))}
+                >
+                  <ZoomOut className="w-4 h-4" />
+                </Button>
+                <Badge className="bg-white/20 backdrop-blur-sm text-white border-white/30 font-medium">
+                  {zoom}x
+                </Badge>
+                <Button
+                  variant="ghost"
+                  size="sm"
+                  className="text-white hover:bg-white/20 hover:text-white"
+                  disabled={zoomIndex === ZOOM_LEVELS.length - 1}
+                  onClick={() => setZoomIndex((z) => Math.min(ZOOM_LEVELS.length - 1, z + 1))}
+                >
+                  <ZoomIn className="w-4 h-4" />
+                </Button>
+              </>
+            )}
           </div>
 
           <Button
@@ -55,20 +161,27 @@ const ImageViewer = ({
       </CardHeader>
 
       <CardContent>
-        <div className="relative overflow-hidden rounded-xl border-2 border-white/30 bg-white/10 backdrop-blur-sm inline-block shadow-lg">
-          {currentImageData && (
-            <img
-              src={
-                currentImageData?.imageUrl
-                  ? `${currentImageData.imageUrl}`
-                  : ""
-              }
-              alt="Dugong monitoring capture"
-              className="w-auto h-auto max-w-full max-h-full object-contain transition-transform duration-300 hover:scale-105"
-            />
-          )}
-          <div className="absolute inset-0 bg-gradient-to-t from-black/20 via-transparent to-transparent pointer-events-none" />
-        </div>
+        {canZoom && zoom > 1 && tiles ? (
+          <div className="relative rounded-xl border-2 border-white/30 bg-white/10 shadow-lg overflow-hidden">
+            <TiledImage filename={filename} tiles={tiles} zoom={zoom} />
+          </div>
+        ) : (
+          <div className="relative overflow-hidden rounded-xl border-2 border-white/30 bg-white/10 backdrop-blur-sm inline-block shadow-lg">
+            {currentImageData && (
+              <a href={currentImageData.imageUrl} target="_blank" rel="noreferrer">
+                <img
+                  src={displayUrl}
+                  alt="Dugong monitoring capture"
+                  className="w-auto h-auto max-w-full max-h-full object-contain transition-transform duration-300 hover:scale-105"
+                />
+              </a>
+            )}
+            {currentImageData && drawBoxesClientSide && (
+              <BoxOverlay labelUrl={currentImageData.labelUrl!} />
+            )}
+            <div className="absolute inset-0 bg-gradient-to-t from-black/20 via-transparent to-transparent pointer-events-none" />
+          </div>
+        )}
       </CardContent>
     </Card>
   );
@@ -13,7 +13,7 @@ import {
 } from "@/components/ui/dropdown-menu";
 import { NavLink, useNavigate } from "react-router-dom";
 import Cookies from "js-cookie";
-import { useAuthStore } from "@/store/auth";
+import { useAuthStore, authHeaders } from "@/store/auth";
 import { useImageStore } from "@/store/image";
 import { useUploadStore } from "@/store/upload";
 import axios from "axios";
@@ -53,7 +53,9 @@ const Navbar: React.FC<NavbarProps> = ({ imageCount = 0 }) => {
       // Call backend cleanup endpoint before logging out
       if (userEmail && sessionId) {
         await axios.post(
-          `${API_URL}/cleanup-sessions/${userEmail}?session_id=${sessionId}`
+          `${API_URL}/cleanup-sessions/${userEmail}?session_id=${sessionId}`,
+          null,
+          { headers: authHeaders() }
         );
       }
     } catch (err) {
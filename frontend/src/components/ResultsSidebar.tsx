@@ -1,9 +1,10 @@
 /* eslint-disable @typescript-eslint/no-unused-vars */
-import { Info, ThumbsDown, Shell } from "lucide-react";
+import { Info, ThumbsDown, Shell, Images } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
 import { useUploadStore } from "@/store/upload";
+import { authHeaders } from "@/store/auth";
 
 
 const FloatingBubble = ({ size = "small", delay = 0 }) => (
@@ -23,12 +24,16 @@ interface ImageData {
   calfCount: number;
   imageClass?: string;
   createdAt?: string;
+  thumbnailUrl?: string;
 }
 
 interface ResultsSidebarProps {
   currentImageData: ImageData;
   markedPoorImages: string[];
   onMarkPoor: (imageId: string) => void;
+  images?: ImageData[];
+  currentImage?: number;
+  onSelectImage?: (imageNumber: number) => void;
 }
 const extractFormattedDate = (imageName: string) => {
   // Regular expression to match the pattern after first underscore with 8 digits (assumed to be YYYYMMDD)
@@ -57,6 +62,9 @@ const ResultsSidebar = ({
   currentImageData,
   markedPoorImages,
   onMarkPoor,
+  images = [],
+  currentImage,
+  onSelectImage,
 }: ResultsSidebarProps) => {
   const sessionId = useUploadStore((state) => state.sessionId);
   const isMarkedPoor =
@@ -80,6 +88,7 @@ const ResultsSidebar = ({
           method: "POST",
           headers: {
             "Content-Type": "application/json",
+            ...authHeaders(),
           },
           body: JSON.stringify({
             sessionId,
@@ -212,6 +221,47 @@ const ResultsSidebar = ({
           </CardContent>
         </Card>
 
+        {/* Session Images (kilobyte thumbnails, loaded lazily) */}
+        {images.some((image) => image.thumbnailUrl) && (
+          <Card className="bg-white/80 backdrop-blur-sm border-2 border-teal-200/50 shadow-xl hover:shadow-2xl transition-all duration-300 relative overflow-hidden">
+            <div className="absolute top-0 left-0 w-full h-1 bg-gradient-to-r from-cyan-400 via-teal-400 to-blue-500"></div>
+            <CardHeader className="bg-gradient-to-r from-cyan-50/80 to-teal-50/80 relative py-2">
+              <CardTitle className="flex items-center gap-2 text-lg font-semibold text-teal-800">
+                <div className="p-1.5 bg-teal-100 rounded-full shadow-md">
+                  <Images className="w-4 h-4 text-teal-600" />
+                </div>
+                Session Images
+              </CardTitle>
+            </CardHeader>
+            <CardContent className="py-3 px-4">
+              <div className="grid grid-cols-4 gap-2 max-h-48 overflow-y-auto">
+                {images.map((image, idx) => (
+                  <button
+                    key={image.imageId}
+                    type="button"
+                    onClick={() => onSelectImage?.(idx + 1)}
+                    className={`rounded-md overflow-hidden border-2 transition-colors ${currentImage === idx + 1
+                      ? "border-teal-500"
+                      : "border-transparent hover:border-teal-300"
+                      }`}
+                  >
+                    {image.thumbnailUrl ? (
+                      <img
+                        src={image.thumbnailUrl}
+                        alt={`Image ${idx + 1}`}
+                        loading="lazy"
+                        className="w-full h-12 object-cover"
+                      />
+                    ) : (
+                      <div className="w-full h-12 bg-teal-100" />
+                    )}
+                  </button>
+                ))}
+              </div>
+            </CardContent>
+          </Card>
+        )}
+
         {/* Quality Assessment */}
         <Card className="bg-white/80 backdrop-blur-sm border-2 border-teal-200/50 shadow-xl hover:shadow-2xl transition-all duration-300 relative overflow-hidden">
           <div className="absolute top-0 left-0 w-full h-1 bg-gradient-to-r from-red-400 via-orange-400 to-pink-400"></div>
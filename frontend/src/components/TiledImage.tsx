@@ -0,0 +1,140 @@
+import { useCallback, useEffect, useRef, useState } from "react";
+import { useUploadStore } from "@/store/upload";
+import { authHeaders } from "@/store/auth";
+
+export interface TileManifest {
+  width: number;
+  height: number;
+  tileSize: number;
+  levels: number;
+}
+
+interface TiledImageProps {
+  filename: string;
+  tiles: TileManifest;
+  zoom: number;
+}
+
+type TileUrl = { col: number; row: number; url: string };
+
+const API_URL = import.meta.env.VITE_API_URL;
+
+// Pixel size of a pyramid level; the top level is full resolution
+const levelSize = (tiles: TileManifest, level: number) => {
+  const scale = 2 ** (tiles.levels - 1 - level);
+  return {
+    width: Math.ceil(tiles.width / scale),
+    height: Math.ceil(tiles.height / scale),
+  };
+};
+
+// Smallest level that is at least as wide as it is rendered on screen
+const pickLevel = (tiles: TileManifest, renderedWidth: number) => {
+  for (let level = 0; level < tiles.levels; level++) {
+    if (levelSize(tiles, level).width >= renderedWidth) return level;
+  }
+  return tiles.levels - 1;
+};
+
+// Zoomable image that only requests the pyramid tiles inside the viewport
+const TiledImage = ({ filename, tiles, zoom }: TiledImageProps) => {
+  const sessionId = useUploadStore((state) => state.sessionId);
+  const containerRef = useRef<HTMLDivElement>(null);
+  const [level, setLevel] = useState(0);
+  const [tileUrls, setTileUrls] = useState<Record<string, string>>({});
+
+  const loadVisibleTiles = useCallback(async () => {
+    const el = containerRef.current;
+    if (!el || !sessionId) return;
+    const renderedWidth = el.clientWidth * zoom * window.devicePixelRatio;
+    const nextLevel = pickLevel(tiles, renderedWidth);
+    setLevel(nextLevel);
+
+    const x0 = el.scrollLeft / el.scrollWidth;
+    const y0 = el.scrollTop / el.scrollHeight;
+    const x1 = Math.min(1, (el.scrollLeft + el.clientWidth) / el.scrollWidth);
+    const y1 = Math.min(1, (el.scrollTop + el.clientHeight) / el.scrollHeight);
+    const params = new URLSearchParams({
+      level: String(nextLevel),
+      x0: String(x0),
+      y0: String(y0),
+      x1: String(x1),
+      y1: String(y1),
+    });
+    try {
+      const response = await fetch(
+        `${API_URL}/renditions/${sessionId}/${encodeURIComponent(filename)}?${params}`,
+        { headers: authHeaders() }
+      );
+      if (!response.ok) return;
+      const data = await response.json();
+      setTileUrls((prev) => {
+        const next = { ...prev };
+        (data.tileUrls as TileUrl[]).forEach((tile) => {
+          next[`${nextLevel}/${tile.col}_${tile.row}`] = tile.url;
+        });
+        return next;
+      });
+    } catch (error) {
+      // console.error("Failed to load tiles", error);
+    }
+  }, [filename, sessionId, tiles, zoom]);
+
+  useEffect(() => {
+    setTileUrls({});
+  }, [filename]);
+
+  useEffect(() => {
+    loadVisibleTiles();
+  }, [loadVisibleTiles]);
+
+  // Debounce scroll so panning does not fire a request per frame
+  const scrollTimer = useRef<number | undefined>(undefined);
+  const handleScroll = () => {
+    window.clearTimeout(scrollTimer.current);
+    scrollTimer.current = window.setTimeout(loadVisibleTiles, 120);
+  };
+
+  const { width: levelWidth, height: levelHeight } = levelSize(tiles, level);
+  const tileEntries = Object.entries(tileUrls).filter(([key]) =>
+    key.startsWith(`${level}/`)
+  );
+
+  return (
+    <div
+      ref={containerRef}
+      onScroll={handleScroll}
+      className="overflow-auto max-h-[75vh] w-full"
+    >
+      <div
+        className="relative"
+        style={{
+          width: `${zoom * 100}%`,
+          aspectRatio: `${tiles.width} / ${tiles.height}`,
+        }}
+      >
+        {tileEntries.map(([key, url]) => {
+          const [col, row] = key.split("/")[1].split("_").map(Number);
+          const left = col * tiles.tileSize;
+          const top = row * tiles.tileSize;
+          return (
+            <img
+              key={key}
+              src={url}
+              alt=""
+              className="absolute"
+              style={{
+                left: `${(left / levelWidth) * 100}%`,
+                top: `${(top / levelHeight) * 100}%`,
+                width: `${(Math.min(tiles.tileSize, levelWidth - left) / levelWidth) * 100}%`,
+                height: `${(Math.min(tiles.tileSize, levelHeight - top) / levelHeight) * 100}%`,
+              }}
+            />
+          );
+        })}
+      </div>
+    </div>
+  );
+};
+
+export default TiledImage;
@@ -14,6 +14,8 @@ import {
   DialogTrigger,
 } from "@/components/ui/dialog";
 import { useUploadStore } from "@/store/upload";
+import { authHeaders } from "@/store/auth";
+import { directUploadsEnabled, uploadDirect } from "@/lib/directUpload";
 
 interface ImageFile {
   url: string;
@@ -35,6 +37,8 @@ const ImageUploadDialog = ({
   const [uploadedImages, setUploadedImages] = useState<ImageFile[]>([]);
   const [dragActive, setDragActive] = useState(false);
   const [isUploading, setIsUploading] = useState(false);
+  // Overlapping survey frames reuse an earlier frame's detections
+  const [skipDuplicates, setSkipDuplicates] = useState(false);
   const { setSessionId, resetSessionTimer, sessionId } = useUploadStore();
 
   const API_URL = import.meta.env.VITE_API_URL;
@@ -102,15 +106,30 @@ const ImageUploadDialog = ({
     setIsUploading(true);
     resetSessionTimer()
     try {
+      if (directUploadsEnabled) {
+        // Straight to storage; the dashboard polls while the images are processed
+        const apiResponse = await uploadDirect(
+          sessionId,
+          uploadedImages.map((image) => image.file),
+          skipDuplicates ? "skip" : undefined
+        );
+        onImageUploaded?.(apiResponse);
+        setSessionId(apiResponse.sessionId);
+        setIsOpen(false);
+        setUploadedImages([]);
+        return;
+      }
       // Create FormData and append files
       const formData = new FormData();
       uploadedImages.forEach((image) => {
         formData.append("files", image.file);
       });
       formData.append("session_id", sessionId);
+      if (skipDuplicates) formData.append("duplicates", "skip");
       // Make API call to your FastAPI endpoint
       const response = await fetch(`${API_URL}/upload-multiple/`, {
         method: "POST",
+        headers: authHeaders(),
         body: formData,
       });
       if (!response.ok) {
@@ -243,6 +262,16 @@ const ImageUploadDialog = ({
           )}
         </div>
 
+        <label className="flex items-center gap-2 text-sm text-gray-600">
+          <input
+            type="checkbox"
+            checked={skipDuplicates}
+            onChange={(e) => setSkipDuplicates(e.target.checked)}
+            disabled={isUploading}
+          />
+          Skip near-duplicate frames
+        </label>
+
         <DialogFooter className="gap-3">
           <Button
             variant="outline"
@@ -0,0 +1,125 @@
+//directUpload.ts
+// Direct-to-storage uploads: the API signs a resumable-upload URL per file,
+// the browser sends the bytes straight to GCS, then tells the API it is done.
+import { authHeaders } from "@/store/auth";
+
+const API_URL = import.meta.env.VITE_API_URL;
+
+// GCS requires chunks in multiples of 256 KiB (except the last one)
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+interface SignedUpload {
+  filename: string;
+  blobPath: string;
+  uploadUrl: string;
+  uploadHeaders: Record<string, string>;
+}
+
+export const directUploadsEnabled = import.meta.env.VITE_DIRECT_UPLOADS === "true";
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Bytes GCS already holds for the upload session, from a 308 reply's Range
+// header ("bytes=0-N"); 0 when it holds none
+const committedBytes = (response: Response) => {
+  const range = response.headers.get("Range");
+  return range ? Number(range.split("-")[1]) + 1 : 0;
+};
+
+const uploadFileResumable = async (upload: SignedUpload, file: File) => {
+  const start = await fetch(upload.uploadUrl, {
+    method: "POST",
+    headers: upload.uploadHeaders,
+  });
+  const sessionUri = start.headers.get("Location");
+  if (!start.ok || !sessionUri) {
+    throw new Error(`Could not start upload of ${file.name}: ${start.status}`);
+  }
+
+  let offset = 0;
+  let retries = 0;
+  while (offset < file.size) {
+    const end = Math.min(offset + CHUNK_SIZE, file.size);
+    let response: Response;
+    try {
+      response = await fetch(sessionUri, {
+        method: "PUT",
+        headers: { "Content-Range": `bytes ${offset}-${end - 1}/${file.size}` },
+        body: file.slice(offset, end),
+      });
+    } catch {
+      response = new Response(null, { status: 503 });
+    }
+    if (response.ok) return;
+    if (response.status === 308) {
+      offset = committedBytes(response);
+      retries = 0;
+      continue;
+    }
+    if (response.status < 500 || ++retries > MAX_RETRIES) {
+      throw new Error(`Upload of ${file.name} failed: ${response.status}`);
+    }
+    await sleep(2 ** retries * 500);
+    // Ask GCS how much arrived before resuming
+    const status = await fetch(sessionUri, {
+      method: "PUT",
+      headers: { "Content-Range": `bytes */${file.size}` },
+    }).catch(() => null);
+    if (status?.ok) return;
+    if (status?.status === 308) offset = committedBytes(status);
+  }
+  // An empty file has no chunk to send
+  if (file.size === 0) {
+    await fetch(sessionUri, { method: "PUT", headers: { "Content-Range": "bytes */0" } });
+  }
+};
+
+export const uploadDirect = async (
+  sessionId: string,
+  files: File[],
+  duplicates?: "off" | "flag" | "skip"
+) => {
+  const headers = { ...authHeaders(), "Content-Type": "application/json" };
+  const signed = await fetch(`${API_URL}/upload-urls/`, {
+    method: "POST",
+    headers,
+    body: JSON.stringify({
+      sessionId,
+      files: files.map((file) => ({
+        filename: file.name,
+        contentType: file.type,
+        size: file.size,
+      })),
+    }),
+  });
+  if (!signed.ok) {
+    throw new Error(`HTTP error! status: ${signed.status}`);
+  }
+  const { uploads } = (await signed.json()) as { uploads: SignedUpload[] };
+  if (uploads.length === 0) return { sessionId, accepted: [] };
+  const byName = new Map(files.map((file) => [file.name, file]));
+
+  // A few files at a time keeps the connection count reasonable
+  const queue = [...uploads];
+  const worker = async () => {
+    for (let upload = queue.shift(); upload; upload = queue.shift()) {
+      await uploadFileResumable(upload, byName.get(upload.filename)!);
+    }
+  };
+  await Promise.all(Array.from({ length: 3 }, worker));
+
+  const complete = await fetch(`${API_URL}/upload-complete/`, {
+    method: "POST",
+    headers,
+    body: JSON.stringify({
+      sessionId,
+      filenames: uploads.map((upload) => upload.filename),
+      duplicates,
+    }),
+  });
+  if (!complete.ok) {
+    throw new Error(`HTTP error! status: ${complete.status}`);
+  }
+  return complete.json();
+};
@@ -5,8 +5,9 @@ import EmptyState from "../components/EmptyState";
 import DashboardHeader from "../components/DashboardHeader";
 import ImageViewer from "../components/ImageViewer";
 import ResultsSidebar from "../components/ResultsSidebar";
+import type { TileManifest } from "../components/TiledImage";
 import { useImageStore } from "../store/image";
-import { useAuthStore } from "../store/auth";
+import { useAuthStore, authHeaders } from "../store/auth";
 import { useUploadStore } from "../store/upload";
 import { useState, useEffect } from "react";
 import axios from "axios";
@@ -21,6 +22,7 @@ const DashboardPage = () => {
     setApiResponse,
     handlePrevious,
     handleNext,
+    setCurrentImage,
     getCurrentImageData,
   } = useImageStore();
 
@@ -45,13 +47,19 @@ const DashboardPage = () => {
     calfCount?: number;
     imageClass?: string;
     imageUrl?: string;
+    previewUrl?: string | null;
+    thumbnailUrl?: string | null;
+    tiles?: TileManifest | null;
+    labelUrl?: string | null;
+    annotated?: boolean;
   };
 
   // Fetch full session metadata and update image store
   const fetchSessionMetadata = async (sessionId: string) => {
     try {
       const response = await axios.get(
-        `${API_URL}/session-status/${sessionId}`
+        `${API_URL}/session-status/${sessionId}`,
+        { headers: authHeaders() }
       );
       if (response.data && response.data.success) {
         setApiResponse({
@@ -59,6 +67,11 @@ const DashboardPage = () => {
             (file: SessionFile, idx: number) => ({
               imageId: idx,
               imageUrl: file.imageUrl || "",
+              previewUrl: file.previewUrl || undefined,
+              thumbnailUrl: file.thumbnailUrl || undefined,
+              tiles: file.tiles || undefined,
+              labelUrl: file.labelUrl || undefined,
+              annotated: file.annotated ?? true,
               createdAt: file.createdAt || response.data.lastActivity || "",
               dugongCount: file.dugongCount ?? 0,
               calfCount: file.calfCount ?? 0,
@@ -66,6 +79,10 @@ const DashboardPage = () => {
             })
           ),
         });
+        // Some signed URLs were still being refreshed; fetch them shortly
+        if (response.data.urlsPending > 0) {
+          setTimeout(() => fetchSessionMetadata(sessionId), 2000);
+        }
         // setLastImageCount(response.data.files.length);
         return response.data.files.length;
       }
@@ -107,7 +124,9 @@ const DashboardPage = () => {
     if (uploadSessionId) {
       try {
         await axios.post(
-          `${API_URL}/backfill-detections/${uploadSessionId}`
+          `${API_URL}/backfill-detections/${uploadSessionId}`,
+          null,
+          { headers: authHeaders() }
         );
       } catch (err) {
         // console.error("Failed to backfill detection results", err);
@@ -162,6 +181,9 @@ const DashboardPage = () => {
             currentImageData={currentImageData}
             markedPoorImages={markedPoorImages}
             onMarkPoor={handleMarkPoor}
+            images={apiResponse.results}
+            currentImage={currentImage}
+            onSelectImage={setCurrentImage}
           />
         </div>
       </div>
@@ -48,3 +48,9 @@ export const useAuthStore = create<AuthState>()(
     }
   )
 );
+
+// Bearer header for API calls; empty when not logged in
+export const authHeaders = (): Record<string, string> => {
+  const token = useAuthStore.getState().token;
+  return token ? { Authorization: `Bearer ${token}` } : {};
+};
@@ -24,21 +24,56 @@ mv /tmp/nginx.conf /etc/nginx/conf.d/default.conf
 # Validate nginx configuration
 nginx -t
 
-# Start FastAPI backend in background (disable uvloop explicitly)
-echo "Starting FastAPI backend on port 8000 (without uvloop)..."
+# Serving topology: with API_WORKERS > 1 (or INFERENCE_SOCKET set) the models
+# run in one inference server process and the API workers call it over a
+# Unix socket, so the weights are loaded once rather than per worker
+API_WORKERS=${API_WORKERS:-1}
+if [ "$API_WORKERS" -gt 1 ]; then
+    export INFERENCE_SOCKET=${INFERENCE_SOCKET:-/tmp/dugong-inference.sock}
+fi
+if [ -n "$INFERENCE_SOCKET" ] && [ -z "$INFERENCE_AUTHKEY" ]; then
+    # Shared secret for the socket, new on every start
+    export INFERENCE_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+fi
+
 cd /app/backend
-uvicorn main:app --host 0.0.0.0 --port 8000 --loop asyncio --http h11 &
-BACKEND_PID=$!
+INFERENCE_PID=""
+if [ -n "$INFERENCE_SOCKET" ]; then
+    echo "Starting inference server on $INFERENCE_SOCKET..."
+    python -m services.inference_server &
+    INFERENCE_PID=$!
+fi
 
-# Wait a moment for backend to start
-echo "Waiting for backend to start..."
-sleep 5
+# Start FastAPI backend in background (disable uvloop explicitly)
+echo "Starting FastAPI backend on port 8000 with $API_WORKERS worker(s) (without uvloop)..."
+uvicorn main:app --host 0.0.0.0 --port 8000 --loop asyncio --http h11 --workers $API_WORKERS &
+BACKEND_PID=$!
 
-# Check if backend is running
-if ! kill -0 $BACKEND_PID 2>/dev/null; then
-    echo "ERROR: Backend failed to start"
-    exit 1
-fi
+# Wait until the backend reports ready (models warmed, storage and DB reachable)
+READY_TIMEOUT=${READY_TIMEOUT:-300}
+echo "Waiting up to ${READY_TIMEOUT}s for backend readiness..."
+WAITED=0
+until curl -sf -o /dev/null http://127.0.0.1:8000/ready; do
+    if ! kill -0 $BACKEND_PID 2>/dev/null; then
+        echo "ERROR: Backend failed to start"
+        exit 1
+    fi
+    if [ -n "$INFERENCE_PID" ] && ! kill -0 $INFERENCE_PID 2>/dev/null; then
+        echo "ERROR: Inference server failed to start"
+        kill $BACKEND_PID 2>/dev/null || true
+        exit 1
+    fi
+    if [ "$WAITED" -ge "$READY_TIMEOUT" ]; then
+        echo "ERROR: Backend not ready after ${READY_TIMEOUT}s"
+        curl -s http://127.0.0.1:8000/ready || true
+        echo
+        kill $BACKEND_PID 2>/dev/null || true
+        [ -n "$INFERENCE_PID" ] && kill $INFERENCE_PID 2>/dev/null || true
+        exit 1
+    fi
+    sleep 1
+    WAITED=$((WAITED + 1))
+done
 
 echo "Backend started successfully (PID: $BACKEND_PID)"
 
@@ -49,6 +84,7 @@ echo "Starting Nginx server on port $PORT..."
 cleanup() {
     echo "Shutting down services..."
     kill $BACKEND_PID 2>/dev/null || true
+    [ -n "$INFERENCE_PID" ] && kill $INFERENCE_PID 2>/dev/null || true
     nginx -s quit 2>/dev/null || true
     exit 0
 }